@@ -1,11 +1,13 @@
 from copy import copy
-from dataclasses import dataclass, field
+from dataclasses import InitVar, dataclass, field
 
 from types import NoneType
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import ast_visitor
 import json_constructors
 import type_checking
 from enum import Enum
+from source_index import LINE_NUMBERS, SourceIndex
 
 
 # class BXTypes(Enum):
@@ -15,58 +17,114 @@ from enum import Enum
 #     VOID = 3
 
 class BXTypes:
-    pass
+    """Types are hash-consed: every distinct type exists exactly once, so two types are
+    equal iff they are the same object and hashing is by identity. Constructing a type
+    that already exists returns the existing instance."""
+    __slots__ = ()
+    _interned: Dict[tuple, 'BXTypes'] = {}
+
+    def __new__(cls, *args, **kwargs):
+        key = cls._key(*args, **kwargs)
+        ty = BXTypes._interned.get((cls, key))
+        if ty is None:
+            ty = object.__new__(cls)
+            for name, value in zip(cls.__slots__, key):
+                object.__setattr__(ty, name, value)
+            ty = BXTypes._interned.setdefault((cls, key), ty)
+        return ty
+
+    @classmethod
+    def _key(cls) -> tuple:
+        # canonical constructor arguments, in the order of __slots__
+        return ()
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __reduce__(self):
+        # unpickling and copying go through __new__ and get the canonical instance back
+        return type(self), tuple(getattr(self, name) for name in type(self).__slots__)
 
 
-@dataclass
 class BXTypesInt(BXTypes):
-    pass
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "int"
 
 
-@dataclass
 class BXTypesBool(BXTypes):
-    pass
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "bool"
 
 
-@dataclass
 class BXTypesVoid(BXTypes):
-    pass
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "void"
 
 
-@dataclass
 class BXTypesNull(BXTypes):
-    pass
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "null"
 
 
-@dataclass
 class BXTypesPointer(BXTypes):
-    def __init__(self, ty: BXTypes):
-        self.ty = ty
+    __slots__ = ("ty",)
+    ty: BXTypes
+
+    @classmethod
+    def _key(cls, ty: BXTypes) -> tuple:
+        return (ty,)
+
+    def __repr__(self) -> str:
+        return f"{self.ty}*"
 
 
-@dataclass
 class BXTypesListType(BXTypes):
-    def __init__(self, length: int, ty: BXTypes):
-        self.length = length
-        self.ty = ty
+    __slots__ = ("length", "ty")
+    length: int
+    ty: BXTypes
 
+    @classmethod
+    def _key(cls, length: int, ty: BXTypes) -> tuple:
+        return int(length), ty
 
-@dataclass
+    def __repr__(self) -> str:
+        return f"{self.ty}[{self.length}]"
+
+
+@dataclass(frozen=True, slots=True)
 class StructField:
-    def __init__(self, name: str, ty: BXTypes):
-        self.name = name
-        self.ty = ty
+    name: str
+    ty: BXTypes
+
+    def __repr__(self) -> str:
+        return f"{self.name} : {self.ty}"
 
 
-@dataclass
 class BXTypesStruct(BXTypes):
-    def __init__(self, fields: List[StructField]):
-        self.fields = fields
+    __slots__ = ("fields",)
+    fields: tuple
+
+    @classmethod
+    def _key(cls, fields: List[StructField]) -> tuple:
+        return (tuple(fields),)
+
+    def __repr__(self) -> str:
+        return "struct {" + ", ".join(repr(f) for f in self.fields) + "}"
 
 
 class BXTypesUnresolved(BXTypes):
-    pass
+    __slots__ = ()
 
+    def __repr__(self) -> str:
+        return "unresolved"
 
 
 @dataclass
@@ -77,24 +135,53 @@ class ProcType:
     def __hash__(self) -> int:
         return hash(tuple(self.args_ty + [self.return_ty]))
 
+    def __repr__(self) -> str:
+        return f"({', '.join(map(repr, self.args_ty))}) -> {self.return_ty}"
+
+
+RESERVED_FUNCTIONS = {"bx_print_int": ProcType([BXTypesInt()], BXTypesVoid()),
+                      "bx_print_bool": ProcType([BXTypesBool()], BXTypesVoid())}
+
+
+# Abstract node classes declare empty __slots__ and concrete ones use slots=True, so every
+# field gets exactly one slot in the concrete class and no node has a __dict__.
+
 
-RESERVED_FUNCTIONS = {"bx_print_int": ProcType([BXTypesInt], BXTypesVoid),
-                      "bx_print_bool": ProcType([BXTypesBool()], BXTypesVoid)}
+@dataclass
+class Located:
+    __slots__ = ()
+    # offset into the source; lines and columns are only computed when asked for
+    pos: int = field(default=0, kw_only=True)
+    source: SourceIndex = field(default=LINE_NUMBERS, kw_only=True, repr=False, compare=False)
+    # nodes used to be built with a line number and no offset; lineno=n still does that
+    lineno: InitVar[Optional[int]] = field(default=None, kw_only=True)
+
+    def __post_init__(self, lineno: Optional[int]):
+        if lineno is not None:
+            self.pos, self.source = lineno, LINE_NUMBERS
+
+    @property
+    def column(self) -> int:
+        return self.source.column(self.pos)
+
+
+# after the class, where the name no longer stands for the lineno argument
+Located.lineno = property(lambda self: self.source.line(self.pos))
 
 ########## LValue ##########
 
 
-@ dataclass
-class LValue:
+@dataclass
+class LValue(Located):
+    __slots__ = ()
     symbol: str
-    lineno: int
 
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         return json_constructors.lvalue_constructor(node)
 
 
-@ dataclass
+@dataclass(slots=True)
 class LValueVar(LValue):
     pass
 
@@ -104,27 +191,23 @@ class LValueVar(LValue):
 ########## Expressions ##########
 
 
-@ dataclass
-class Expression:
-    lineno: int
-
-    def __init__(self):
-        self.ty: BXTypes = BXTypesUnresolved
-        self.block: Optional['StatementBlock'] = None
+@dataclass
+class Expression(Located):
+    __slots__ = ()
+    # set by the type checker
+    ty: BXTypes = field(default=BXTypesUnresolved(), kw_only=True, repr=False, compare=False)
+    block: Optional['StatementBlock'] = field(default=None, kw_only=True, repr=False, compare=False)
 
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         return json_constructors.expression_constructor(node)
 
 
-@ dataclass
+@dataclass(slots=True)
 class Param(Expression):
     symbol: str
 
-    def __post_init__(self):
-        super().__init__()
-
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         pass
 
@@ -132,67 +215,55 @@ class Param(Expression):
         return f"{self.symbol} : {self.ty}"
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionVar(Expression):
     symbol: str
 
-    def __post_init__(self):
-        super().__init__()
-
     def __repr__(self):
         return self.symbol
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionUniOp(Expression):
     op: str
     argument: Expression
 
-    def __post_init__(self):
-        super().__init__()
-
-    def __repr__(self):
-        return f"{self.op}({self.argument})"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionBinOp(Expression):
     op: str
     left: Expression
     right: Expression
 
-    def __post_init__(self):
-        super().__init__()
-
-    def __repr__(self):
-        return f"({self.left} {self.op} {self.right})"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionCall(Expression):
     target: str
     args: List[Expression]
 
-    def __post_init__(self):
-        super().__init__()
-
-    def __repr__(self):
-        return f"{self.target}({', '.join(str(arg) for arg in self.args)})"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionInt(Expression):
     value: int
-    ty: BXTypes = BXTypesInt()
+    ty: BXTypes = field(default=BXTypesInt(), kw_only=True, repr=False, compare=False)
 
     def __repr__(self) -> str:
         return f"{self.value}"
 
 
-@ dataclass
+@dataclass(slots=True)
 class ExpressionBool(Expression):
     value: bool
-    ty: BXTypes = BXTypesBool()
+    ty: BXTypes = field(default=BXTypesBool(), kw_only=True, repr=False, compare=False)
 
     def __repr__(self) -> str:
         return f"{self.value}"
@@ -200,88 +271,139 @@ class ExpressionBool(Expression):
 
 @dataclass
 class ExpressionAccess(Expression):  # either index access of a list, or access by . or ->
+    __slots__ = ()
     obj: Expression
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionAccessIndex(ExpressionAccess):
     index: Expression
 
-    def __repr__(self):
-        return f"{self.obj}[{self.index}]"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionAccessPoint(ExpressionAccess):
     index: ExpressionVar
 
-    def __repr__(self):
-        return f"{self.obj}.{self.index}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionAccessArrow(ExpressionAccess):
     index: ExpressionVar
-    def __repr__(self):
-        return f"{self.obj}->{self.index}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionAddress(Expression):
     obj: Expression
 
-    def __repr__(self):
-        return f"&{self.obj}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionDeref(Expression):
     obj: Expression
 
-    def __repr__(self):
-        return f"*{self.obj}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 ########## Statements ##########
 
 
-@ dataclass
-class Statement:
-    lineno: int
+@dataclass
+class Statement(Located):
+    __slots__ = ()
+    block: Optional['StatementBlock'] = field(default=None, kw_only=True, repr=False, compare=False)
 
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         return json_constructors.statement_constructor(node)
 
 
-@dataclass
+@dataclass(slots=True)
 class SymbolRecord:
     ty: BXTypes
     temp: Optional[str] = None
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementBlock(Statement):
+    """A block and its scope.
+
+    Each block only owns the symbols it defines and points to its parent, so entering
+    a block is O(1). Symbols found in an enclosing scope are memoized in the block, which
+    makes repeated lookups O(1) and pins them to the binding visible when first resolved."""
     statements: List[Statement]
-    proc_scope: Dict[str, List[ProcType]] = field(default_factory=dict)
-    scopes: List[Dict[str, SymbolRecord]] = field(default_factory=lambda: [{}])
+    proc_scope: Dict[str, Dict[Tuple[BXTypes, ...], ProcType]] = field(default_factory=dict)
+    scope: Dict[str, SymbolRecord] = field(default_factory=dict)
+    parent: Optional['StatementBlock'] = field(default=None, repr=False, compare=False)
+    root: Optional['StatementBlock'] = field(default=None, repr=False, compare=False)
+    resolved: Optional[Dict[str, SymbolRecord]] = field(default=None, repr=False, compare=False)
+    # the list of scopes, outermost first, that blocks kept before they were chained
+    scopes: InitVar[Optional[List[Dict[str, SymbolRecord]]]] = field(default=None, kw_only=True)
+
+    def __post_init__(self, lineno: Optional[int], scopes: Optional[List[Dict[str, SymbolRecord]]]):
+        Located.__post_init__(self, lineno)
+        if scopes is not None:
+            self._set_scopes(scopes)
+
+    def _get_scopes(self) -> List[Dict[str, SymbolRecord]]:
+        scopes, block = [], self
+        while block is not None:
+            scopes.append(block.scope)
+            block = block.parent
+        return scopes[::-1]
+
+    def _set_scopes(self, scopes: List[Dict[str, SymbolRecord]]):
+        # the last scope is the block's own; the others become a chain of parent blocks
+        parent = None
+        for scope in scopes[:-1]:
+            parent = StatementBlock(statements=[], pos=self.pos, source=self.source, proc_scope=self.proc_scope,
+                                    scope=scope, parent=parent, root=None if parent is None else parent.root or parent)
+        self.scope, self.parent, self.resolved = scopes[-1], parent, None
+        self.root = None if parent is None else parent.root or parent
 
     def inherit_scopes(self, child: 'StatementBlock'):
-        child.scopes = self.scopes.copy() + [{}]
+        child.parent = self
+        child.root = self.root or self
+        child.scope = {}
+        child.resolved = None
         child.proc_scope = self.proc_scope
 
     def define_type(self, symbol: str, ty: BXTypes):
-        assert symbol not in self.scopes[-1], f"Symbol {symbol} already defined in this scope."
-        self.scopes[-1][symbol] = SymbolRecord(ty)
+        assert symbol not in self.scope, f"Symbol {symbol} already defined in this scope."
+        self.scope[symbol] = SymbolRecord(ty)
 
     def define_temp(self, symbol: str, temp: str, global_def=False):
         if global_def:
-            self.scopes[0][symbol].temp = temp
+            (self.root or self).scope[symbol].temp = temp
         else:
             record = self.get_record(symbol)
             assert record.temp is None, f"Temporary for the symbol {symbol} is already set."
             record.temp = temp
 
     def get_record(self, symbol: str) -> SymbolRecord:
-        for scope in reversed(self.scopes):
-            if symbol in scope:
-                return scope[symbol]
+        record = self.scope.get(symbol)
+        if record is not None:
+            return record
+        if self.resolved is not None:
+            record = self.resolved.get(symbol)
+            if record is not None:
+                return record
+        block = self.parent
+        while block is not None:
+            record = block.scope.get(symbol)
+            if record is None and block.resolved is not None:
+                record = block.resolved.get(symbol)
+            if record is not None:
+                if self.resolved is None:
+                    self.resolved = {}
+                self.resolved[symbol] = record
+                return record
+            block = block.parent
         raise Exception(f"Error on line {self.lineno}: Symbol {symbol} not defined.")
 
     def get_type(self, symbol: str) -> BXTypes:
@@ -293,93 +415,89 @@ class StatementBlock(Statement):
         return temp
 
     def define_proc(self, name: str, proc_type: ProcType):
-        # Function polymorphism
-        if name in self.proc_scope:
-            for signature in self.proc_scope[name]:
-                if len(proc_type.args_ty) == len(signature.args_ty):
-                    for param_i in range(len(proc_type.args_ty)):
-                        if proc_type.args_ty[param_i] != signature.args_ty[param_i]:
-                            break
-                    else:
-                        raise TypeError(f"Function {name} is already defined.")
-            else:
-                self.proc_scope[name].append(proc_type)
-        else:
-            self.proc_scope[name] = [proc_type]
+        # Function polymorphism: overloads are indexed by their argument types, which are
+        # interned, so the tuple is a canonical key and its length is the arity
+        overloads = self.proc_scope.setdefault(name, {})
+        key = tuple(proc_type.args_ty)
+        if key in overloads:
+            raise TypeError(f"Function {name}{overloads[key]} is already defined.")
+        overloads[key] = proc_type
 
     def recognize_proc(self, symbol: str, args: List[BXTypes]) -> ProcType:
-        if symbol not in self.proc_scope:
+        overloads = self.proc_scope.get(symbol)
+        if overloads is None:
             raise Exception(f"Symbol {symbol} not defined.")
-        for proc in self.proc_scope[symbol]:
-            if proc.args_ty == args:
-                return proc
-        raise Exception(f"Symbol {symbol} not defined with args {args}.")
+        proc = overloads.get(tuple(args))
+        if proc is None:
+            candidates = "; ".join(f"{symbol}{signature}" for signature in overloads.values())
+            raise Exception(f"Symbol {symbol} not defined with args ({', '.join(map(repr, args))}). "
+                            f"Candidates are: {candidates}.")
+        return proc
 
     def __repr__(self) -> str:
-        return '\n'.join(repr(stmt) for stmt in self.statements)
+        return ast_visitor.render(self)
 
 
-@ dataclass
+# after the class, where the name no longer stands for the scopes argument
+StatementBlock.scopes = property(StatementBlock._get_scopes, StatementBlock._set_scopes)
+
+
+@dataclass(slots=True)
 class StatementVarDecl(Statement):
     vars: List[ExpressionVar]
     rvalues: List[Expression]
     typehint: BXTypes
-    block: Optional[StatementBlock] = None
 
-    def __repr__(self):
-        return f"var {', '.join(str(var) for var in self.vars)} = {self.rvalues}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class StatementTyDecl(Statement):
     var: ExpressionVar
     ty: BXTypes
 
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
-@ dataclass
+
+@dataclass(slots=True)
 class StatementAssign(Statement):
     lvalue: LValue
     rvalue: Expression
-    block: Optional[StatementBlock] = None
 
-    def __repr__(self):
-        return f"{self.lvalue} = {self.rvalue};"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementEval(Statement):
     call: ExpressionCall
-    block: Optional[StatementBlock] = None
 
-    def __repr__(self):
-        return f"{self.call};"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementIfElse(Statement):
     condition: Expression
     body: StatementBlock
     optelse: Optional[StatementBlock]
-    block: Optional[StatementBlock] = None
 
-    def __repr__(self):
-        if self.optelse is None:
-            return f"if ({self.condition})" + " {\n" + repr(self.body) + "\n}"
-        else:
-            return f"if ({self.condition})" + " {\n" + repr(self.body) + "\n}" + "else" + "{\n" + repr(self.optelse) + "\n}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementWhile(Statement):
     condition: Expression
     body: StatementBlock
-    block: Optional[StatementBlock] = None
 
-    def __repr__(self):
-        return f"while ({self.condition})" + " {\n" + repr(self.body) + "\n}"
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementJump(Statement):
     jump: str
 
@@ -387,60 +505,59 @@ class StatementJump(Statement):
         return f"{self.jump};"
 
 
-@ dataclass
+@dataclass(slots=True)
 class StatementReturn(Statement):
     return_expr: Optional[Expression] = None
-    block: Optional[StatementBlock] = None
 
     def __repr__(self) -> str:
-        return f"return {self.return_expr};"
+        return ast_visitor.render(self)
 
 ########## Procedure ##########
 
 
-@ dataclass
+@dataclass(slots=True)
 class ControlStacks:
     break_stack: List[int] = field(default_factory=list)
     continue_stack: List[int] = field(default_factory=list)
 
 
-@ dataclass
-class Procedure:
+@dataclass(slots=True)
+class Procedure(Located):
     name: str
     params: List[Param]
     block: StatementBlock
-    lineno: int
-    return_ty: BXTypes = BXTypesVoid
+    return_ty: BXTypes = BXTypesVoid()
     control_stacks: ControlStacks = field(default_factory=ControlStacks)
 
-    def __post_init__(self):
+    def __post_init__(self, lineno: Optional[int]):
+        Located.__post_init__(self, lineno)
         param_names = [param.symbol for param in self.params]
         if len(param_names) != len(set(param_names)):
             raise ValueError("Procedure has double parameters.")
 
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         return json_constructors.procedure_constructor(node)
 
     def __repr__(self) -> str:
-        return f"{self.name}({self.params}) -> {self.return_ty}" + " {\n" + repr(self.block) + "\n}"
+        return ast_visitor.render(self)
 
 
 ########## Program ##########
 
 
-@ dataclass
-class Program:
+@dataclass(slots=True)
+class Program(Located):
     procedures: List[Procedure]
     global_block: StatementBlock
-    lineno: int
 
-    def __post_init__(self):
+    def __post_init__(self, lineno: Optional[int]):
+        Located.__post_init__(self, lineno)
         # check that there is exactly one main
         main_count = sum(1 for proc in self.procedures if proc.name == "main")
         assert main_count == 1, "There must be exactly one main procedure."
 
-    @ classmethod
+    @classmethod
     def from_node(cls, node: dict):
         return json_constructors.program_constructor(node)
 
@@ -448,5 +565,5 @@ class Program:
         line = type_checking.program_resolver(self)
         return line
 
-    def __repr__(self):
-        return "\n\n".join(repr(proc) for proc in self.procedures)
+    def __repr__(self) -> str:
+        return ast_visitor.render(self)
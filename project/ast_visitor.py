@@ -0,0 +1,200 @@
+"""Traversal of ast_types trees without recursion.
+
+Every walker here keeps its own work stack, so arbitrarily deep trees (say a
+left-associated sum of a million terms) neither hit the recursion limit nor pay
+for a Python call per level."""
+from __future__ import annotations
+
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import ast_types
+
+_child_fields: Dict[type, Tuple[str, ...]] = {}
+
+
+def child_fields(cls: type) -> Tuple[str, ...]:
+    """Fields of a node class that can hold child nodes.
+
+    Back references (source, ty, block, parent scopes) are declared with
+    compare=False and are not part of the tree."""
+    names = _child_fields.get(cls)
+    if names is None:
+        scalars = (str, int, bool, ast_types.BXTypes)
+        names = tuple(f.name for f in fields(cls) if f.compare and f.name != "pos" and f.type not in scalars)
+        _child_fields[cls] = names
+    return names
+
+
+def children(node: ast_types.Located) -> List[ast_types.Located]:
+    """Direct children of a node, in source order. Call arguments are (name, expression) pairs."""
+    found = []
+    for name in child_fields(type(node)):
+        value = getattr(node, name)
+        if isinstance(value, ast_types.Located):
+            found.append(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ast_types.Located):
+                    found.append(item)
+                elif isinstance(item, tuple):
+                    found.extend(part for part in item if isinstance(part, ast_types.Located))
+    return found
+
+
+def walk(root: ast_types.Located) -> Iterator[ast_types.Located]:
+    """All nodes of a tree in pre-order."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        kids = children(node)
+        kids.reverse()
+        stack.extend(kids)
+
+
+def _patch(node: ast_types.Located, replaced: Dict[int, Any]):
+    # swap the children of node that were replaced by a post hook
+    for name in child_fields(type(node)):
+        value = getattr(node, name)
+        if isinstance(value, ast_types.Located):
+            if id(value) in replaced:
+                setattr(node, name, replaced.pop(id(value)))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, ast_types.Located):
+                    if id(item) in replaced:
+                        value[i] = replaced.pop(id(item))
+                elif isinstance(item, tuple) and any(id(part) in replaced for part in item):
+                    value[i] = tuple(replaced.pop(id(part)) if id(part) in replaced else part for part in item)
+
+
+class Visitor:
+    """Visits a tree with an explicit stack.
+
+    For every node, pre_<ClassName>(node) (or pre(node) when there is none) runs before
+    its children and post_<ClassName>(node) (or post(node)) after them. A pre hook
+    returning False skips the children. A post hook returning another node replaces
+    the visited one in its parent; visit() returns the root, possibly replaced."""
+
+    def __init__(self):
+        self._hooks: Dict[Tuple[str, type], Callable] = {}
+
+    def pre(self, node: ast_types.Located) -> Optional[bool]:
+        return None
+
+    def post(self, node: ast_types.Located) -> Optional[Any]:
+        return None
+
+    def _hook(self, kind: str, cls: type) -> Callable:
+        hook = self._hooks.get((kind, cls))
+        if hook is None:
+            hook = getattr(self, f"{kind}_{cls.__name__}", None) or getattr(self, kind)
+            self._hooks[(kind, cls)] = hook
+        return hook
+
+    def visit(self, root: ast_types.Located) -> Any:
+        replaced: Dict[int, Any] = {}
+        stack: List[Tuple[Any, bool]] = [(root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            cls = type(node)
+            if leaving:
+                if replaced:
+                    _patch(node, replaced)
+                new = self._hook("post", cls)(node)
+                if new is not None and new is not node:
+                    replaced[id(node)] = new
+                continue
+            stack.append((node, True))
+            if self._hook("pre", cls)(node) is not False:
+                kids = children(node)
+                kids.reverse()
+                stack.extend((kid, False) for kid in kids)
+        return replaced.get(id(root), root)
+
+
+########## Printing ##########
+
+# Every printer maps a node to its pieces: text, or nodes that are printed in
+# their place. Building one string per node would copy the text of a deep tree
+# once per level.
+
+def _sep(items: list, sep: str) -> list:
+    pieces = []
+    for i, item in enumerate(items):
+        if i:
+            pieces.append(sep)
+        pieces.append(item)
+    return pieces
+
+
+def _call(node) -> list:
+    pieces = [f"{node.target}("]
+    for i, arg in enumerate(node.args):
+        if i:
+            pieces.append(", ")
+        if isinstance(arg, tuple):
+            pieces += [f"{arg[0]} = ", arg[1]]
+        else:
+            pieces.append(arg)
+    return pieces + [")"]
+
+
+def _vardecl(node) -> list:
+    pieces = ["var "]
+    for i, (var, value) in enumerate(zip(node.vars, node.rvalues)):
+        pieces += [", " if i else "", f"{var} = ", value]
+    return pieces + [f" : {node.typehint};"]
+
+
+def _ifelse(node) -> list:
+    pieces = ["if (", node.condition, ") {\n", node.body, "\n}"]
+    if node.optelse is not None:
+        pieces += ["else{\n", node.optelse, "\n}"]
+    return pieces
+
+
+def _procedure(node) -> list:
+    return [f"{node.name}("] + _sep(node.params, ", ") + [f") -> {node.return_ty}" + " {\n", node.block, "\n}"]
+
+
+_PRINTERS: Dict[str, Callable[[Any], list]] = {
+    "ExpressionUniOp": lambda n: [f"{n.op}(", n.argument, ")"],
+    "ExpressionBinOp": lambda n: ["(", n.left, f" {n.op} ", n.right, ")"],
+    "ExpressionCall": _call,
+    "ExpressionAccessIndex": lambda n: [n.obj, "[", n.index, "]"],
+    "ExpressionAccessPoint": lambda n: [n.obj, ".", n.index],
+    "ExpressionAccessArrow": lambda n: [n.obj, "->", n.index],
+    "ExpressionAddress": lambda n: ["&", n.obj],
+    "ExpressionDeref": lambda n: ["*", n.obj],
+    "StatementBlock": lambda n: _sep(n.statements, "\n"),
+    "StatementVarDecl": _vardecl,
+    "StatementTyDecl": lambda n: ["type ", n.var, f" = {n.ty};"],
+    "StatementAssign": lambda n: [n.lvalue, " = ", n.rvalue, ";"],
+    "StatementEval": lambda n: [n.call, ";"],
+    "StatementIfElse": _ifelse,
+    "StatementWhile": lambda n: ["while (", n.condition, ") {\n", n.body, "\n}"],
+    "StatementReturn": lambda n: ["return;"] if n.return_expr is None else ["return ", n.return_expr, ";"],
+    "Procedure": _procedure,
+    "Program": lambda n: _sep(n.procedures, "\n\n"),
+}
+
+
+def render(root: Any) -> str:
+    """Source-like text of a tree; what the __repr__ of composite nodes returns."""
+    out: List[str] = []
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        printer = _PRINTERS.get(type(item).__name__)
+        if printer is None:
+            out.append(repr(item))  # leaves print themselves
+        else:
+            pieces = printer(item)
+            pieces.reverse()
+            stack.extend(pieces)
+    return "".join(out)
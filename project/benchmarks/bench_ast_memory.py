@@ -0,0 +1,71 @@
+"""Bytes per AST node on a large synthetic program.
+
+Reports the shallow size of ExpressionBinOp, ExpressionVar and StatementAssign
+nodes and the memory retained by the whole parsed program.
+
+    python benchmarks/bench_ast_memory.py [statements]
+"""
+import dataclasses
+import gc
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_types  # noqa: E402
+import bxparser  # noqa: E402
+import bxscanner  # noqa: E402
+
+REPORTED = (ast_types.ExpressionBinOp, ast_types.ExpressionVar, ast_types.StatementAssign)
+
+
+def source(statements: int) -> str:
+    lines = ["def main() {", "    var a = 1, b = 2, c = 3 : int;"]
+    for i in range(statements):
+        lines.append(f"    a = (a + b) * (c - {i % 97}) ^ b;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def nodes(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif isinstance(node, (ast_types.Located, ast_types.ControlStacks)):
+            yield node
+            # compare=False marks the back references: source index, type and enclosing block
+            stack.extend(getattr(node, f.name) for f in dataclasses.fields(node) if f.compare)
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    text = source(statements)
+    bxparser.get_parser()
+    lexer = bxscanner.create_lexer()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    program = bxparser.parse(text, lexer=lexer)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    counts, sizes = Counter(), Counter()
+    for node in nodes(program):
+        counts[type(node)] += 1
+        sizes[type(node)] += sys.getsizeof(node)
+        if hasattr(node, "__dict__"):
+            sizes[type(node)] += sys.getsizeof(node.__dict__)
+    total = sum(counts.values())
+    print(f"{statements} statements, {total} nodes, {retained / total:.1f} retained bytes per node overall")
+    for cls in REPORTED:
+        print(f"{cls.__name__:>16}: {counts[cls]:>8} nodes, {sizes[cls] / counts[cls]:6.1f} bytes per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""bxbatch over a directory of files, against one bx2tac.py process per file.
+
+The files are bench_branches programs, plus one with a syntax error that both
+must report. The outputs must be the same. Also times what a file saves by
+cloning the lexer instead of calling create_lexer() again.
+
+    python benchmarks/bench_batch.py [files]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_branches  # noqa: E402
+import bxbatch  # noqa: E402
+import bxscanner  # noqa: E402
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def per_call(fn, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rng = random.Random(302)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            Path(tmp, f"f{i:04}.bx").write_text(bench_branches.program(rng, 10))
+        Path(tmp, "broken.bx").write_text("def main() {\n  var x = : int;\n}\n")
+        paths = bxbatch.expand([os.path.join(tmp, "*.bx")])
+
+        start = time.perf_counter()
+        failed = 0
+        for path in paths:
+            failed += subprocess.run([sys.executable, "bx2tac.py", path, "-o", path + ".single.json"],
+                                     cwd=PROJECT_DIR, capture_output=True).returncode != 0
+        single = time.perf_counter() - start
+
+        batch_dir = os.path.join(tmp, "batch")
+        os.mkdir(batch_dir)
+        result = bxbatch.compile_files(paths, outdir=batch_dir)
+        assert failed == len(result.failures) == 1, (failed, result.failures)
+        for path in paths:
+            if path == result.failures[0][0]:
+                continue
+            assert Path(path + ".single.json").read_bytes() == \
+                Path(bxbatch.output_path(path, batch_dir, bxbatch.common_root(paths))).read_bytes()
+        lines = result.lines
+
+    print(f"{len(paths)} files, {lines} lines, 1 with a syntax error: {result.failures[0][1]}")
+    print(f"{'':>22} {'seconds':>8} {'files/s':>8} {'lines/s':>9}")
+    for name, seconds in (("process per file", single), ("bxbatch", result.seconds)):
+        print(f"{name:>22} {seconds:8.2f} {len(paths) / seconds:8.1f} {lines / seconds:9.0f}")
+    template = bxscanner.create_lexer()
+    print(f"create_lexer() {per_call(bxscanner.create_lexer) * 1e3:.3f} ms, "
+          f"clone() {per_call(template.clone) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
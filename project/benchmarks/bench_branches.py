@@ -0,0 +1,85 @@
+"""Branches and instructions with if/while conditions lowered to jumps, against tested values.
+
+The programs are loops over if statements whose conditions mix &&, ||, ! and
+comparisons. Each is lowered by bx2tac with the conditions lowered as values
+then tested (jumps=False) and straight to jumps, and run by tac_interp, which
+must print the same thing. Both are shown without and with tac_opt's passes.
+
+    python benchmarks/bench_branches.py [programs] [iterations]
+"""
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bx2tac  # noqa: E402
+import bxparser  # noqa: E402
+import tac  # noqa: E402
+import tac_interp  # noqa: E402
+import tac_opt  # noqa: E402
+
+NAMES = ("a", "b", "c")
+COMPARISONS = ("==", "!=", "<", "<=", ">", ">=")
+BRANCHES = tac.JUMPS
+
+
+def condition(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        left, right = rng.sample(NAMES, 2)
+        return f"{left} {rng.choice(COMPARISONS)} {right} + {rng.randrange(-3, 4)}"
+    if rng.random() < 0.15:
+        return f"!({condition(rng, depth - 1)})"
+    return f"({condition(rng, depth - 1)}) {rng.choice(('&&', '||'))} ({condition(rng, depth - 1)})"
+
+
+def program(rng: random.Random, iterations: int) -> str:
+    lines = ["def main() {", "  var a = 0 : int;", "  var b = 7 : int;", "  var c = -3 : int;",
+             "  var n = 0 : int;", f"  while (n < {iterations} && a != 1000000) {{"]
+    for _ in range(8):
+        x, y = rng.sample(NAMES, 2)
+        lines.append(f"    if ({condition(rng, 3)}) {{ {x} = ({x} + {y} + n) % 17; }} else {{ {y} = {y} - 1; }}")
+    lines += ["    n = n + 1;", "  }", "  bx_print_int(x = a);", "  bx_print_int(x = b);",
+              "  bx_print_int(x = c);", "}"]
+    return "\n".join(lines)
+
+
+def measure(source: str, jumps: bool, optimize: bool):
+    decls = bx2tac.program_to_tac(bxparser.parse(source), jumps=jumps)
+    if optimize:
+        tac_opt.optimize_program(decls)
+    body = [instr for decl in decls if isinstance(decl, tac.Proc) for instr in decl.body]
+    out, stats = io.StringIO(), tac_interp.Stats()
+    tac_interp.run(decls, out=out, stats=stats)
+    executed_branches = sum(count for op, count in stats.opcodes.items() if op in BRANCHES)
+    return out.getvalue(), (len(body), sum(instr.op in BRANCHES for instr in body),
+                            stats.instructions, executed_branches)
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(302)
+    sources = [program(rng, iterations) for _ in range(programs)]
+    print(f"{programs} programs, {iterations} iterations each")
+    print(f"{'':>18} {'static':>9} {'branches':>9} {'executed':>10} {'branches':>10}")
+    for optimize in (False, True):
+        totals = {}
+        for jumps in (False, True):
+            totals[jumps] = [0, 0, 0, 0]
+            for source in sources:
+                output, counts = measure(source, jumps, optimize)
+                if jumps:
+                    assert output == measure(source, False, optimize)[0]
+                totals[jumps] = [total + count for total, count in zip(totals[jumps], counts)]
+        suffix = " + tac_opt" if optimize else ""
+        for jumps, name in ((False, "values"), (True, "jumps")):
+            print(f"{name + suffix:>18} " + " ".join(f"{count:>{width}}" for count, width in
+                                                      zip(totals[jumps], (9, 9, 10, 10))))
+        print(f"{'saved':>18} " + " ".join(f"{1 - after / before:>{width}.1%}" for before, after, width in
+                                          zip(totals[False], totals[True], (9, 9, 10, 10))))
+
+
+if __name__ == "__main__":
+    main()
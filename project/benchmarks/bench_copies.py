@@ -0,0 +1,129 @@
+"""Instructions and interpreter time saved by tac_opt's copy propagation.
+
+Two workloads: a straight-line tutorial1 program (whose lowering copies every
+variable it reads and every value it assigns), and BX programs with nested
+loops lowered by bx2tac, which only copies on assignments and global reads.
+Both are run by tac_interp (best of 3) before and after the passes, and must print
+the same.
+
+    python benchmarks/bench_copies.py [tutorial statements] [loop iterations]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "project"))
+sys.path.insert(0, os.path.join(ROOT, "tutorial1"))
+
+import ast2tac  # noqa: E402
+import bx2tac  # noqa: E402
+import bxparser  # noqa: E402
+import classes  # noqa: E402
+import fold  # noqa: E402
+import tac  # noqa: E402
+import tac_interp  # noqa: E402
+import tac_opt  # noqa: E402
+
+
+def tutorial_program(statements: int):
+    rng = random.Random(302)
+    names = ["a", "b", "c", "d"]
+    stmts = [classes.StatementVarDecl(name, "int", rng.randrange(1, 10)) for name in names]
+
+    def expr(depth):
+        if depth == 0:
+            return classes.ExpressionVar(rng.choice(names)) if rng.random() < 0.7 \
+                else classes.ExpressionInt(rng.randrange(1, 10))
+        return classes.ExpressionBinOp(rng.choice(("addition", "subtraction", "multiplication")),
+                                       expr(depth - 1), expr(depth - 1))
+    for _ in range(statements):
+        if rng.random() < 0.8:
+            stmts.append(classes.StatementAssign(classes.ExpressionVar(rng.choice(names)), expr(2)))
+        else:
+            stmts.append(classes.StatementPrint(expr(1)))
+    proc = tac.Proc("@main")
+    variables = {}
+    for stmt in stmts:
+        ast2tac.stmt_to_tac(stmt, proc, variables)
+    proc.emit(tac.RET)
+    return [proc]
+
+
+def loops_source(iterations: int) -> str:
+    return f"""
+var total = 0 : int;
+def step(x : int, y : int) : int {{
+  var s = x * 3 : int;
+  var t = s + y : int;
+  var u = t : int;
+  return u ^ s;
+}}
+def main() {{
+  var i = 0 : int;
+  var acc = 1 : int;
+  while (i < {iterations}) {{
+    var j = 0 : int;
+    var k = i : int;
+    while (j < 10) {{
+      var m = acc : int;
+      acc = m + k * j;
+      k = k + 1;
+      j = j + 1;
+    }}
+    acc = step(x = acc, y = k) & 65535;
+    total = total + acc;
+    i = i + 1;
+  }}
+  bx_print_int(x = acc);
+  bx_print_int(x = total);
+}}
+"""
+
+
+def lower_bx(source: str):
+    program = bxparser.parse(source)
+    fold.fold_program(program)
+    return bx2tac.program_to_tac(program)
+
+
+def run(decls, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        out, stats = io.StringIO(), tac_interp.Stats()
+        start = time.perf_counter()
+        tac_interp.run(decls, out=out, stats=stats)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out.getvalue(), stats.instructions, best
+
+
+def compare(name: str, make):
+    before = make()
+    after = make()
+    start = time.perf_counter()
+    counts = tac_opt.optimize_program(after)
+    elapsed = time.perf_counter() - start
+    size = [sum(len(decl) for decl in decls if isinstance(decl, tac.Proc)) for decls in (before, after)]
+    (out, executed_before, time_before), (check, executed_after, time_after) = run(before), run(after)
+    assert out == check
+    print(f"{name}: {counts['propagated']} reads propagated, {counts['removed copies']} copies removed "
+          f"in {elapsed:.2f} s")
+    print(f"  {'':>8} {'static':>10} {'executed':>12} {'run s':>8}")
+    print(f"  {'before':>8} {size[0]:10} {executed_before:12} {time_before:8.2f}")
+    print(f"  {'after':>8} {size[1]:10} {executed_after:12} {time_after:8.2f}")
+    print(f"  {'saved':>8} {1 - size[1] / size[0]:10.1%} {1 - executed_after / executed_before:12.1%} "
+          f"{1 - time_after / time_before:8.1%}")
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    compare("tutorial1", lambda: tutorial_program(statements))
+    compare("bx loops", lambda: lower_bx(loops_source(iterations)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""TAC instructions saved by constant folding on a corpus of generated programs.
+
+Every program is lowered by bx2tac with and without fold, and both versions
+are run by tac_interp to check they print the same thing. Reports the static
+instruction count (the size of the TAC) and the number of instructions executed.
+
+    python benchmarks/bench_fold.py [programs] [statements per program]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bx2tac  # noqa: E402
+import bxparser  # noqa: E402
+import fold  # noqa: E402
+import tac  # noqa: E402
+import tac_interp  # noqa: E402
+
+INT_OPS = ("+", "-", "*", "/", "%", "&", "|", "^", "<<", ">>")
+COMPARISONS = ("==", "!=", "<", "<=", ">", ">=")
+
+
+class Generator:
+    """Random programs mixing literal subexpressions, identities and variables."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def int_expr(self, depth: int, names) -> str:
+        rng = self.rng
+        if depth == 0 or rng.random() < 0.2:
+            if names and rng.random() < 0.5:
+                return rng.choice(names)
+            return str(rng.randrange(-50, 50))
+        op = rng.choice(INT_OPS)
+        left, right = self.int_expr(depth - 1, names), self.int_expr(depth - 1, names)
+        if op in ("/", "%"):
+            right = str(rng.randrange(1, 9))
+        elif op in ("<<", ">>"):
+            right = str(rng.randrange(0, 8))
+        elif rng.random() < 0.15:
+            right = {"+": "0", "-": "0", "*": "1", "|": "0", "^": left, "&": "0"}[op]
+        if rng.random() < 0.1:
+            return f"-(-({left} {op} {right}))"
+        return f"({left} {op} {right})"
+
+    def bool_expr(self, depth: int, names) -> str:
+        rng = self.rng
+        if depth == 0 or rng.random() < 0.3:
+            choice = rng.random()
+            if choice < 0.3:
+                return rng.choice(("true", "false"))
+            return f"({self.int_expr(2, names)} {rng.choice(COMPARISONS)} {self.int_expr(2, names)})"
+        if rng.random() < 0.2:
+            return f"!!{self.bool_expr(depth - 1, names)}"
+        op = rng.choice(("&&", "||"))
+        return f"({self.bool_expr(depth - 1, names)} {op} {self.bool_expr(depth - 1, names)})"
+
+    def program(self, statements: int) -> str:
+        rng = self.rng
+        lines = ["def mix(a : int, b : int) : int {",
+                 f"  return {self.int_expr(3, ['a', 'b'])};", "}", "def main() {"]
+        names = []
+        for i in range(statements):
+            choice = rng.random()
+            if choice < 0.35 or not names:
+                lines.append(f"  var v{i} = {self.int_expr(3, names)} : int;")
+                names.append(f"v{i}")
+            elif choice < 0.6:
+                lines.append(f"  {rng.choice(names)} = {self.int_expr(3, names)};")
+            elif choice < 0.75:
+                lines.append(f"  if ({self.bool_expr(2, names)}) {{ {rng.choice(names)} = "
+                             f"mix(a = {rng.choice(names)}, b = {self.int_expr(2, names)}); }}")
+            elif choice < 0.85:
+                lines.append(f"  bx_print_bool(b = {self.bool_expr(3, names)});")
+            else:
+                lines.append(f"  bx_print_int(x = {self.int_expr(3, names)});")
+        lines += [f"  bx_print_int(x = {name});" for name in names[-5:]]
+        lines.append("}")
+        return "\n".join(lines)
+
+
+def measure(source: str, optimize: bool):
+    program = bxparser.parse(source)
+    folded = fold.fold_program(program) if optimize else 0
+    decls = bx2tac.program_to_tac(program)
+    out, stats = io.StringIO(), tac_interp.Stats()
+    try:
+        tac_interp.run(decls, out=out, stats=stats)
+    except tac_interp.TACRuntimeError as e:
+        out.write(f"error: {e}\n")
+    return sum(len(decl) for decl in decls if isinstance(decl, tac.Proc)), stats.instructions, \
+        out.getvalue(), folded
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    generator = Generator(random.Random(302))
+    totals = {False: [0, 0], True: [0, 0]}
+    nodes = 0
+    start = time.perf_counter()
+    for _ in range(programs):
+        source = generator.program(statements)
+        static, executed, output, _ = measure(source, False)
+        totals[False][0] += static
+        totals[False][1] += executed
+        static, executed, folded_output, folded = measure(source, True)
+        assert folded_output == output, source
+        totals[True][0] += static
+        totals[True][1] += executed
+        nodes += folded
+    elapsed = time.perf_counter() - start
+    print(f"{programs} programs of {statements} statements, {nodes} nodes folded ({elapsed:.1f} s)")
+    print(f"{'':>10} {'static':>10} {'executed':>10}")
+    for optimize, name in ((False, "no fold"), (True, "fold")):
+        print(f"{name:>10} {totals[optimize][0]:10} {totals[optimize][1]:10}")
+    static = 1 - totals[True][0] / totals[False][0]
+    executed = 1 - totals[True][1] / totals[False][1]
+    print(f"{'saved':>10} {static:10.1%} {executed:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Rebuilds through bxbuild's cache after typical edits, against compiling from scratch.
+
+The program is bench_parallel's, plus a global used by every 50th procedure.
+Each step edits that source and rebuilds it through the same cache,
+in a temporary directory. The TAC must equal bx2tac.compile_source's.
+
+    python benchmarks/bench_incremental.py [procedures]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_parallel  # noqa: E402
+import bx2tac  # noqa: E402
+import bxbuild  # noqa: E402
+import tac  # noqa: E402
+
+
+def with_mask(text: str) -> str:
+    # every 50th procedure ands its result with the global mask
+    return "var mask = 255 : int;\n" + re.sub(r"(def p(\d*0)\(.*?)return x", lambda m: m.group(1) + (
+        "return (x & mask)" if int(m.group(2)) % 50 == 0 else "return x"), text, flags=re.S)
+
+
+def main():
+    procedures = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    middle = procedures // 2
+    text = with_mask(bench_parallel.source(procedures))
+    overload = f"def p{middle}(a : bool, b : int) : int {{ return b; }}\n"
+    steps = [
+        ("cold", text),
+        ("unchanged", text),
+        ("comments, spaces", text.replace("{\n", "{ // edited\n  ")),
+        ("one body", text.replace(f"def p{middle}(a : int, b : int) : int {{",
+                                  f"def p{middle}(a : int, b : int) : int {{ a = a + 1;")),
+        ("overload", text + overload),
+        ("global value", text.replace("var mask = 255", "var mask = 127")),
+        ("global type", text.replace("var mask = 255 : int", "var mask = true : bool")),
+    ]
+    start = time.perf_counter()
+    bx2tac.compile_source(text)
+    print(f"{procedures} procedures, compile_source {time.perf_counter() - start:.2f}s")
+    print(f"{'step':>17} {'seconds':>8} {'cached':>7} {'lowered':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = bxbuild.BuildCache(tmp)
+        for name, source in steps:
+            hits, misses = cache.hits, cache.misses
+            start = time.perf_counter()
+            decls = cache.compile(source)
+            elapsed = time.perf_counter() - start
+            assert tac.to_json(decls) == tac.to_json(bx2tac.compile_source(source)), name
+            print(f"{name:>17} {elapsed:8.2f} {cache.hits - hits:7} {cache.misses - misses:8}")
+
+
+if __name__ == "__main__":
+    main()
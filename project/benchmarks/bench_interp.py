@@ -0,0 +1,111 @@
+"""Instructions per second of tac_interp against interpreting the JSON form directly.
+
+Runs a recursive fib and a counting loop. The baseline walks the JSON
+instructions and compares opcode names on every step, which is what running
+the generators' output looked like without tac_interp.
+
+    python benchmarks/bench_interp.py [fib argument] [loop iterations]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tac  # noqa: E402
+import tac_interp  # noqa: E402
+
+I = tac.Instr
+
+
+def program(n: int, iterations: int):
+    fib = tac.Proc("@fib", [0], [
+        I(tac.CONST, 1, 2), I(tac.SUB, 2, 0, 1), I(tac.JL, None, 2, 0),
+        I(tac.CONST, 3, 1), I(tac.SUB, 4, 0, 3), I(tac.PARAM, None, 1, 4), I(tac.CALL, 5, "@fib", 1),
+        I(tac.SUB, 6, 4, 3), I(tac.PARAM, None, 1, 6), I(tac.CALL, 7, "@fib", 1),
+        I(tac.ADD, 8, 5, 7), I(tac.RET, None, 8),
+        I(tac.LABEL, None, 0), I(tac.RET, None, 0)], 9, 1)
+    main = tac.Proc("@main", [], [
+        I(tac.CONST, 0, n), I(tac.PARAM, None, 1, 0), I(tac.CALL, 1, "@fib", 1), I(tac.PRINT, None, 1),
+        I(tac.CONST, 2, 0), I(tac.CONST, 3, 1), I(tac.CONST, 4, iterations), I(tac.CONST, 5, 0),
+        I(tac.LABEL, None, 0), I(tac.SUB, 6, 4, 2), I(tac.JZ, None, 6, 1),
+        I(tac.MUL, 7, 2, 2), I(tac.XOR, 5, 5, 7), I(tac.ADD, 2, 2, 3), I(tac.JMP, None, 0),
+        I(tac.LABEL, None, 1), I(tac.PRINT, None, 5), I(tac.RET)], 8, 2)
+    return [fib, main]
+
+
+def naive(js_obj, out):
+    # one dict per frame, opcode names compared on every instruction
+    procs = {proc["proc"]: proc for proc in js_obj}
+    count = 0
+
+    def call(name, args):
+        nonlocal count
+        proc = procs[name]
+        body = proc["body"]
+        labels = {instr["args"][0]: i for i, instr in enumerate(body) if instr["opcode"] == "label"}
+        temps = dict(zip(proc["args"], args))
+        params = {}
+        pc = 0
+        while pc < len(body):
+            instr = body[pc]
+            op, args_, result = instr["opcode"], instr["args"], instr["result"]
+            pc += 1
+            count += 1
+            if op == "const":
+                temps[result] = args_[0]
+            elif op == "add":
+                temps[result] = tac_interp.wrap(temps[args_[0]] + temps[args_[1]])
+            elif op == "sub":
+                temps[result] = tac_interp.wrap(temps[args_[0]] - temps[args_[1]])
+            elif op == "mul":
+                temps[result] = tac_interp.wrap(temps[args_[0]] * temps[args_[1]])
+            elif op == "xor":
+                temps[result] = temps[args_[0]] ^ temps[args_[1]]
+            elif op == "jmp":
+                pc = labels[args_[0]]
+            elif op == "jz":
+                if temps[args_[0]] == 0:
+                    pc = labels[args_[1]]
+            elif op == "jl":
+                if temps[args_[0]] < 0:
+                    pc = labels[args_[1]]
+            elif op == "param":
+                params[args_[0]] = temps[args_[1]]
+            elif op == "call":
+                value = call(args_[0], [params.pop(i) for i in range(1, args_[1] + 1)])
+                if result is not None:
+                    temps[result] = value
+            elif op == "print":
+                out.write(f"{temps[args_[0]]}\n")
+            elif op == "ret":
+                return temps[args_[0]] if args_ else None
+            elif op == "label":
+                count -= 1
+        return None
+
+    call("@main", [])
+    return count
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    procs = program(n, iterations)
+
+    out = io.StringIO()
+    start = time.perf_counter()
+    count = naive(tac.to_json(procs), out)
+    elapsed = time.perf_counter() - start
+    print(f"{'json':>11}: {count} instructions in {elapsed:.2f} s ({count / elapsed:,.0f}/s)")
+
+    check = io.StringIO()
+    stats = tac_interp.Stats()
+    tac_interp.run(procs, out=check, stats=stats)
+    assert check.getvalue() == out.getvalue()
+    print(f"{'tac_interp':>11}: {stats.report()}")
+
+
+if __name__ == "__main__":
+    main()
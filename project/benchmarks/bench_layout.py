@@ -0,0 +1,85 @@
+"""Field lookups and layouts of struct types: layout's cache against recomputing every time.
+
+A struct of n fields, some of them nested structs and arrays, is parsed from
+BX. Every field is then resolved the old way: a linear search of the field
+list for the name, with the offset summed over the fields before it. It is
+also resolved through layout.field, a dict lookup in a layout computed once.
+The offsets of both must agree. Also times layout.offset on a deep path.
+
+    python benchmarks/bench_layout.py [fields...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_types  # noqa: E402
+import ast_visitor  # noqa: E402
+import bxparser  # noqa: E402
+import layout  # noqa: E402
+
+FIELD_TYPES = ("int", "bool", "int[4]", "struct {x : int, y : bool[2]}", "int*")
+
+
+def struct_type(fields: int) -> ast_types.BXTypesStruct:
+    members = ", ".join(f"f{i} : {FIELD_TYPES[i % len(FIELD_TYPES)]}" for i in range(fields))
+    program = bxparser.parse(f"def main() {{ type t = struct {{{members}}}; }}")
+    decl = next(node for node in ast_visitor.walk(program) if isinstance(node, ast_types.StatementTyDecl))
+    return decl.ty
+
+
+def size(ty) -> int:
+    # recomputed from scratch, as before layout
+    if isinstance(ty, ast_types.BXTypesListType):
+        return ty.length * size(ty.ty)
+    if isinstance(ty, ast_types.BXTypesStruct):
+        return sum(size(f.ty) for f in ty.fields)
+    return 8
+
+
+def search(ty, name: str):
+    total = 0
+    for f in ty.fields:
+        if f.name == name:
+            return total, f.ty
+        total += size(f.ty)
+    raise KeyError(name)
+
+
+def per_lookup(fn, names, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            fn(name)
+    return (time.perf_counter() - start) / (repeat * len(names))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4, 16, 64, 256, 1024]
+    print(f"{'fields':>7} {'search ns':>10} {'layout ns':>10} {'speedup':>8} {'first layout us':>16}")
+    for n in sizes:
+        ty = struct_type(n)
+        names = [f.name for f in ty.fields]
+        assert names == [f"f{i}" for i in range(n)], "fields out of declaration order"
+        start = time.perf_counter()
+        layout.layout(ty)
+        first = time.perf_counter() - start
+        for name in names:
+            slot = layout.field(ty, name)
+            assert (slot.offset, slot.ty) == search(ty, name)
+        repeat = max(1, 20000 // n)
+        old = per_lookup(lambda name: search(ty, name), names, max(1, repeat // n))
+        new = per_lookup(lambda name: layout.field(ty, name), names, repeat)
+        print(f"{n:7} {old * 1e9:10.0f} {new * 1e9:10.0f} {old / new:8.1f} {first * 1e6:16.1f}")
+    ty = struct_type(1024)
+    path = ("f1023", "y", 1)
+    start = time.perf_counter()
+    for _ in range(10000):
+        layout.offset(ty, path)
+    print(f"offset of {'.'.join(map(str, path))}: {layout.offset(ty, path)[0]} bytes, "
+          f"{(time.perf_counter() - start) / 10000 * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Lowering a program of thousands of procedures serially and with 1, 2, 4... worker processes.
+
+Every procedure has a few loops and ifs over its parameters and a global, and
+calls the one before it. Parsing is done once and not timed; each run gets its
+own copy of the tree, since folding rewrites it. The TAC of every parallel run
+must equal the serial one.
+
+    python benchmarks/bench_parallel.py [procedures] [max workers]
+"""
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bx2tac  # noqa: E402
+import bxparser  # noqa: E402
+import fold  # noqa: E402
+import tac  # noqa: E402
+import tac_opt  # noqa: E402
+
+
+def source(procedures: int) -> str:
+    rng = random.Random(302)
+    lines = ["var total = 0 : int;"]
+    for i in range(procedures):
+        lines.append(f"def p{i}(a : int, b : int) : int {{")
+        lines.append("  var i = 0 : int; var x = a * 2 + 1 : int;")
+        for _ in range(rng.randrange(2, 6)):
+            op = rng.choice(("+", "-", "^", "&", "|"))
+            lines.append(f"  while (i < b) {{ if (x > {rng.randrange(100)} && i != 3) "
+                         f"{{ x = (x {op} i) % 1000; }} else {{ x = x + {rng.randrange(1, 9)}; }} i = i + 1; }}")
+            lines.append("  i = 0; total = total + x;")
+        lines.append(f"  return x + p{i - 1}(a = a, b = b - 1);" if i else "  return x;")
+        lines.append("}")
+    lines.append(f"def main() {{ bx_print_int(x = p{procedures - 1}(a = 1, b = 3)); bx_print_int(x = total); }}")
+    return "\n".join(lines)
+
+
+def serial(program):
+    fold.fold_program(program)
+    decls = bx2tac.program_to_tac(program)
+    tac_opt.optimize_program(decls)
+    return decls
+
+
+def main():
+    procedures = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count() or 1)
+    text = source(procedures)
+    program = bxparser.parse(text)
+    print(f"{procedures} procedures, {text.count(chr(10)) + 1} lines, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+    tree = copy.deepcopy(program)
+    start = time.perf_counter()
+    decls = serial(tree)
+    base = time.perf_counter() - start
+    expected = tac.to_json(decls)
+    print(f"{'serial':>8} {base:8.3f} {1:8.2f}")
+    workers = 1
+    while workers <= max_workers:
+        tree = copy.deepcopy(program)
+        start = time.perf_counter()
+        decls = bx2tac.lower_parallel(tree, workers)
+        elapsed = time.perf_counter() - start
+        assert tac.to_json(decls) == expected
+        print(f"{workers:8} {elapsed:8.3f} {base / elapsed:8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Cold vs warm start of the BX parser.
+
+Every sample runs in a fresh interpreter. Cold samples point BXC_CACHE_DIR at an
+empty directory so the LALR tables are built; warm samples reuse a populated one.
+
+    python benchmarks/bench_parser_cache.py [repeats]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = ("import time; t = time.perf_counter(); import bxparser; bxparser.get_parser(); "
+         "print(time.perf_counter() - t)")
+
+
+def sample(cache_dir: str) -> float:
+    env = dict(os.environ, BXC_CACHE_DIR=cache_dir)
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=PROJECT_DIR, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return float(out.split()[-1])
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as warm_dir:
+        sample(warm_dir)  # populate
+        for _ in range(repeats):
+            with tempfile.TemporaryDirectory() as cold_dir:
+                cold.append(sample(cold_dir))
+            warm.append(sample(warm_dir))
+    for name, times in (("cold", cold), ("warm", warm)):
+        print(f"{name}: median {statistics.median(times) * 1000:8.2f} ms  "
+              f"min {min(times) * 1000:8.2f} ms  ({repeats} runs)")
+    print(f"speedup: {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compile time of each front-end phase on bxgen workloads, with JSON baselines.
+
+The phases are timed apart, best of --repeat, with the garbage collector off:
+- scanning: the PLY lexer running over the whole source;
+- parsing: tokens from the scan, replayed to the parser;
+- lowering: bx2tac.program_to_tac, without the optimizations.
+Type checking (Program.resolve) is not timed: compile_source does not run it,
+and the type_checking module it calls is not part of this tree.
+Each is reported per KLOC and per AST node. --save writes the results as a
+baseline. --compare checks them against a saved baseline and exits with 1 if
+some phase got slower per KLOC by more than --threshold (a fraction, 0.10 by
+default). Phases that took under 5 ms in the baseline are not judged.
+
+    python benchmarks/bench_phases.py [--repeat N] [--save BASELINE.json] [--compare BASELINE.json]
+                                      [--threshold 0.10]
+"""
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_visitor  # noqa: E402
+import bx2tac  # noqa: E402
+import bxgen  # noqa: E402
+import bxparser  # noqa: E402
+import passes  # noqa: E402
+
+WORKLOADS = {
+    "default": bxgen.Params(),
+    "wide": bxgen.Params(width=24, depth=1, statements=12),
+    "deep": bxgen.Params(depth=9, statements=2),
+    "procedures": bxgen.Params(procedures=400, overloads=4, depth=1, statements=3),
+    "types": bxgen.Params(procedures=150, struct_fields=60, array_dims=8, depth=1, statements=2),
+}
+PHASES = ("scan", "parse", "lower")
+MIN_SECONDS = 0.005  # phases faster than this in the baseline are within timer noise, and not compared
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def measure(source: str, repeat: int) -> dict:
+    best = dict.fromkeys(PHASES, float("inf"))
+    bxparser.get_parser()
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            times = {}
+            times["scan"], tokens = timed(lambda: passes.scan(source))
+            times["parse"], program = timed(lambda: bxparser.parse(source, lexer=passes.Replay(tokens)))
+            times["lower"], _ = timed(lambda: bx2tac.program_to_tac(program))
+        finally:
+            gc.enable()
+        best = {phase: min(best[phase], times[phase]) for phase in PHASES}
+    lines = source.count("\n")
+    nodes = sum(1 for _ in ast_visitor.walk(program))
+    return {"lines": lines, "tokens": len(tokens), "nodes": nodes,
+            "phases": {phase: {"seconds": seconds, "ms_per_kloc": seconds * 1e3 / (lines / 1000),
+                               "us_per_node": seconds * 1e6 / nodes}
+                       for phase, seconds in best.items()}}
+
+
+def option(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+def main():
+    repeat = int(option("--repeat", 3))
+    threshold = float(option("--threshold", 0.10))
+    baseline = None
+    if option("--compare"):
+        with open(option("--compare")) as f:
+            baseline = json.load(f)["workloads"]
+    results = {}
+    regressions = []
+    print(f"{'workload':>11} {'lines':>7} {'nodes':>8} {'phase':>8} {'ms/KLOC':>9} {'us/node':>8}"
+          + (f" {'baseline':>9} {'change':>7}" if baseline else ""))
+    for name, params in WORKLOADS.items():
+        result = results[name] = measure(bxgen.generate(params), repeat)
+        for phase, numbers in result["phases"].items():
+            line = (f"{name:>11} {result['lines']:7} {result['nodes']:8} {phase:>8} "
+                    f"{numbers['ms_per_kloc']:9.2f} {numbers['us_per_node']:8.3f}")
+            before = baseline.get(name, {}).get("phases", {}).get(phase) if baseline else None
+            if before and before["seconds"] >= MIN_SECONDS:
+                change = numbers["ms_per_kloc"] / before["ms_per_kloc"] - 1
+                line += f" {before['ms_per_kloc']:9.2f} {change:+7.1%}"
+                if change > threshold:
+                    regressions.append(f"{name}/{phase} {change:+.1%}")
+                    line += "  REGRESSION"
+            print(line)
+    if option("--save"):
+        with open(option("--save"), "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": repeat, "workloads": results}, f, indent=2)
+    if regressions:
+        print(f"slower than the baseline by more than {threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Temporaries before and after tac_opt.renumber_temps.
+
+Renumbers the procedures of bench_copies' tutorial1 program (one long
+straight-line procedure) and of bench_fold's generated BX programs, after copy
+propagation, and reports the temporary counts, the time the pass takes and the
+size of the JSON TAC, whose "%n" names get shorter.
+
+    python benchmarks/bench_renumber.py [tutorial statements] [bx programs]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_copies  # noqa: E402
+import bench_fold  # noqa: E402
+import bx2tac  # noqa: E402
+import bxparser  # noqa: E402
+import fold  # noqa: E402
+import tac  # noqa: E402
+import tac_opt  # noqa: E402
+
+
+def report(name: str, decls):
+    procs = [decl for decl in decls if isinstance(decl, tac.Proc)]
+    for proc in procs:
+        tac_opt.propagate_copies(proc)
+        tac_opt.remove_dead_copies(proc)
+    size_before = len(json.dumps(tac.to_json(decls)))
+    widest = max(proc.temps for proc in procs)
+    start = time.perf_counter()
+    counts = [tac_opt.renumber_temps(proc) for proc in procs]
+    elapsed = time.perf_counter() - start
+    before, after = sum(b for b, _ in counts), sum(a for _, a in counts)
+    size_after = len(json.dumps(tac.to_json(decls)))
+    print(f"{name}: {len(procs)} procedures, {sum(len(proc) for proc in procs)} instructions, "
+          f"renumbered in {elapsed:.2f} s")
+    print(f"  temps {before} -> {after} ({1 - after / before:.2%} fewer), "
+          f"largest frame {widest} -> {max(proc.temps for proc in procs)}")
+    print(f"  JSON {size_before / 2**20:.1f} -> {size_after / 2**20:.1f} MiB")
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    programs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    report("tutorial1", bench_copies.tutorial_program(statements))
+    generator = bench_fold.Generator(random.Random(302))
+    decls = []
+    for i in range(programs):
+        program = bxparser.parse(generator.program(40))
+        fold.fold_program(program)
+        for decl in bx2tac.program_to_tac(program):
+            decl.name = f"{decl.name}.{i}"
+            decls.append(decl)
+    report("generated bx", decls)
+
+
+if __name__ == "__main__":
+    main()
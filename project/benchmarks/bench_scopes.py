@@ -0,0 +1,64 @@
+"""Block entry and symbol lookup cost as blocks nest deeper.
+
+At every depth a block is entered, defines one local, and looks up a global, the
+parent's local and its own local, like the type checker does for generated code.
+The list-of-scopes implementation this replaced is timed alongside.
+
+    python benchmarks/bench_scopes.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_types  # noqa: E402
+
+INT = ast_types.BXTypesInt()
+
+
+class ListScopes:
+    # the previous StatementBlock scope handling
+    def __init__(self, scopes=None):
+        self.scopes = scopes or [{}]
+
+    def inherit_scopes(self, child):
+        child.scopes = self.scopes.copy() + [{}]
+
+    def define_type(self, symbol, ty):
+        self.scopes[-1][symbol] = ast_types.SymbolRecord(ty)
+
+    def get_type(self, symbol):
+        for scope in reversed(self.scopes):
+            if symbol in scope:
+                return scope[symbol].ty
+        raise KeyError(symbol)
+
+
+def nest(make, depth: int) -> float:
+    start = time.perf_counter()
+    block = make()
+    block.define_type("g", INT)
+    block.define_type("v0", INT)
+    for level in range(1, depth):
+        child = make()
+        block.inherit_scopes(child)
+        child.define_type(f"v{level}", INT)
+        child.get_type("g")
+        child.get_type(f"v{level - 1}")
+        child.get_type(f"v{level}")
+        block = child
+    return time.perf_counter() - start
+
+
+def main():
+    make_block = lambda: ast_types.StatementBlock(statements=[], pos=0, source=None)  # noqa: E731
+    print(f"{'depth':>7} {'list scopes':>12} {'chained':>10}   (seconds)")
+    for depth in (100, 1_000, 5_000, 20_000):
+        old = nest(ListScopes, depth) if depth <= 5_000 else float("nan")
+        new = nest(make_block, depth)
+        print(f"{depth:>7} {old:>12.4f} {new:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
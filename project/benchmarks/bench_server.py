@@ -0,0 +1,78 @@
+"""Compiling many small files: one bx2tac.py process each, against bxserver.
+
+The files are bench_branches programs. They are compiled three ways: by a
+fresh `python bx2tac.py` per file, by a fresh `python bxclient.py` per file
+talking to a running server, and by bxclient.request straight from this process,
+which leaves out the interpreter start. The outputs must match. Times are
+wall-clock per file, in milliseconds. The server's own percentiles, which leave
+out the socket round trip too, come last.
+
+    python benchmarks/bench_server.py [files]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_branches  # noqa: E402
+import bxclient  # noqa: E402
+import bxserver  # noqa: E402
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed_runs(paths, compile_one):
+    times = []
+    for path in paths:
+        start = time.perf_counter()
+        compile_one(path)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(302)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            paths.append(os.path.join(tmp, f"f{i}.bx"))
+            with open(paths[-1], "w") as f:
+                f.write(bench_branches.program(rng, 10))
+        sock = Path(tmp) / "bxserver.sock"
+        server = subprocess.Popen([sys.executable, "bxserver.py", "--socket", str(sock)], cwd=PROJECT_DIR,
+                                  stderr=subprocess.PIPE, text=True)
+        while not sock.exists():
+            time.sleep(0.01)
+
+        def run(*args):
+            subprocess.run([sys.executable, *args], cwd=PROJECT_DIR, check=True)
+
+        results = {
+            "cold process": timed_runs(paths, lambda p: run("bx2tac.py", p, "-o", p + ".cold.json")),
+            "bxclient process": timed_runs(paths, lambda p: run("bxclient.py", p, "-o", p + ".client.json",
+                                                                "--socket", str(sock))),
+            "in-process request": timed_runs(paths, lambda p: bxclient.request(
+                {"source": Path(p).read_text(), "name": p, "output": p + ".request.json"}, sock)),
+        }
+        bxclient.request({"op": "shutdown"}, sock)
+        summary = server.communicate()[1].strip()
+        for path in paths:
+            cold = Path(path + ".cold.json").read_bytes()
+            assert cold == Path(path + ".client.json").read_bytes() == Path(path + ".request.json").read_bytes()
+    print(f"{files} files, ms per file")
+    print(f"{'':>20} " + " ".join(f"{name:>8}" for name in ("p50", "p90", "p99", "max")))
+    for name, times in results.items():
+        print(f"{name:>20} " + " ".join(f"{ms:8.2f}" for ms in bxserver.percentiles(times).values()))
+    cold, warm = (bxserver.percentiles(results[name])["p50"] for name in ("cold process", "bxclient process"))
+    print(f"bxclient is {cold / warm:.1f}x faster at the median")
+    print(f"server side: {summary.splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Time of the CFG, dominator, frontier and SSA passes against procedure size.
+
+Lowers one BX procedure of n statement groups (ifs, loops and loops nested in
+ifs over a handful of variables) with bx2tac, for doubling n, and times every
+phase with the garbage collector off, then the whole round trip again with it
+on. The time per block should stay flat as the procedure grows; with the
+collector on it creeps up, since every full collection scans all the blocks and
+instructions alive. The largest size is also run through tac_interp before and
+after a round trip through SSA.
+
+    python benchmarks/bench_ssa.py [smallest groups] [doublings]
+"""
+import gc
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bx2tac  # noqa: E402
+import tac_cfg  # noqa: E402
+import tac_interp  # noqa: E402
+import tac_ssa  # noqa: E402
+
+NAMES = ("a", "b", "c", "d")
+
+
+def source(groups: int) -> str:
+    rng = random.Random(302)
+    lines = ["def main() {"] + [f"  var {name} = {i} : int;" for i, name in enumerate(NAMES)] + ["  var i = 0 : int;"]
+    for _ in range(groups):
+        x, y, z = rng.sample(NAMES, 3)
+        choice = rng.random()
+        if choice < 0.4:
+            lines.append(f"  if ({x} < {y}) {{ {x} = {x} + {z}; }} else {{ {y} = {y} - {x}; {z} = {z} ^ 1; }}")
+        elif choice < 0.7:
+            lines.append(f"  i = 0; while (i < 3) {{ {x} = {x} + {y}; {y} = {y} & 255; i = i + 1; }}")
+        else:
+            lines.append(f"  if ({z} > 0 && {x} != {y}) {{ i = 0; while (i < 2) {{ "
+                         f"if ({x} > {y}) {{ {x} = {y}; }} {z} = {z} + i; i = i + 1; }} }}")
+    lines += [f"  bx_print_int(x = {name});" for name in NAMES] + ["}"]
+    return "\n".join(lines)
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return elapsed, result
+
+
+def round_trip(proc):
+    start = time.perf_counter()
+    cfg = tac_cfg.CFG(proc)
+    tac_cfg.frontiers(cfg, tac_cfg.dominators(cfg))
+    tac_ssa.to_ssa(proc)
+    tac_ssa.from_ssa(proc)
+    return time.perf_counter() - start
+
+
+def main():
+    smallest = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    doublings = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{'blocks':>7} {'instrs':>7} {'phis':>6} {'cfg':>7} {'dom':>7} {'df':>7} {'to ssa':>7} "
+          f"{'from ssa':>8}  {'us/block':>8} {'with gc':>8}")
+    for step in range(doublings):
+        text = source(smallest << step)
+        with_gc = round_trip(bx2tac.compile_source(text, optimize=False)[0])
+        decls = bx2tac.compile_source(text, optimize=False)
+        proc = decls[0]
+        instrs = len(proc)
+        cfg_time, cfg = timed(lambda: tac_cfg.CFG(proc))
+        dom_time, idom = timed(lambda: tac_cfg.dominators(cfg))
+        df_time, _ = timed(lambda: tac_cfg.frontiers(cfg, idom))
+        to_time, phis = timed(lambda: tac_ssa.to_ssa(proc))
+        assert tac_ssa.is_ssa(proc)
+        from_time, _ = timed(lambda: tac_ssa.from_ssa(proc))
+        total = cfg_time + dom_time + df_time + to_time + from_time
+        print(f"{len(cfg):7} {instrs:7} {phis:6} {cfg_time:7.3f} {dom_time:7.3f} {df_time:7.3f} {to_time:7.3f} "
+              f"{from_time:8.3f}  {total / len(cfg) * 1e6:8.1f} {with_gc / len(cfg) * 1e6:8.1f}")
+    expected, actual = io.StringIO(), io.StringIO()
+    tac_interp.run(bx2tac.compile_source(source(smallest << (doublings - 1)), optimize=False), out=expected)
+    tac_interp.run(decls, out=actual)
+    assert expected.getvalue() == actual.getvalue()
+    print("output unchanged by the round trip")
+
+
+if __name__ == "__main__":
+    main()
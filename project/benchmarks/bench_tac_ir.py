@@ -0,0 +1,113 @@
+"""Lowering a 1M-instruction program to TAC: dicts per instruction against tac.Instr.
+
+The program is a tutorial1 AST of print statements over sums and products of
+three variables. The dict-based lowering that tutorial1/ast2tac.py used before
+tac.py is timed alongside the current one, with the memory the TAC holds and
+the time to serialize it to JSON.
+
+    python benchmarks/bench_tac_ir.py [instructions]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "project"))
+sys.path.insert(0, os.path.join(ROOT, "tutorial1"))
+
+import ast2tac  # noqa: E402
+import classes  # noqa: E402
+import tac  # noqa: E402
+
+OPS = {"addition": "add", "multiplication": "mul", "opposite": "neg"}
+
+
+def legacy_expr_to_tac(expr, body, counter, variables):
+    # the lowering tutorial1/ast2tac.py had before tac.py
+    stack = [(expr, False)]
+    results = []
+    while stack:
+        expr, children_done = stack.pop()
+        if isinstance(expr, classes.ExpressionVar):
+            body.append({"opcode": "copy", "args": [variables[expr.name]], "result": f'%{counter}'})
+        elif isinstance(expr, classes.ExpressionInt):
+            body.append({"opcode": "copy", "args": [expr.value], "result": f'%{counter}'})
+        elif isinstance(expr, classes.ExpressionUniOp):
+            if not children_done:
+                stack.extend(((expr, True), (expr.argument, False)))
+                continue
+            body.append({"opcode": OPS[expr.operator], "args": [f'%{results.pop()}'], "result": f'%{counter}'})
+        else:
+            if not children_done:
+                stack.extend(((expr, True), (expr.right_argument, False), (expr.left_argument, False)))
+                continue
+            right, left = results.pop(), results.pop()
+            body.append({"opcode": OPS[expr.operator], "args": [f'%{left}', f'%{right}'], "result": f'%{counter}'})
+        results.append(counter)
+        counter += 1
+    return counter
+
+
+def legacy(statements):
+    body = []
+    variables = {"a": "%0", "b": "%1", "c": "%2"}
+    counter = 3
+    for stmt in statements:
+        counter = legacy_expr_to_tac(stmt.argument, body, counter, variables)
+        body.append({"opcode": "print", "args": [f'%{counter - 1}'], "result": None})
+    return [{"proc": "@main", "body": body}]
+
+
+def current(statements):
+    proc = tac.Proc("@main")
+    variables = {name: proc.emit(tac.CONST, proc.new_temp(), 0) for name in "abc"}
+    for stmt in statements:
+        ast2tac.stmt_to_tac(stmt, proc, variables)
+    return proc
+
+
+def program(instructions: int):
+    # each statement lowers to 11 instructions
+    var = classes.ExpressionVar
+    statements = []
+    for i in range(instructions // 11):
+        product = classes.ExpressionBinOp("multiplication", var("a"), classes.ExpressionInt(i))
+        total = classes.ExpressionBinOp("addition", product, classes.ExpressionUniOp("opposite", var("b")))
+        total = classes.ExpressionBinOp("addition", total, classes.ExpressionBinOp("multiplication", var("c"), var("a")))
+        statements.append(classes.StatementPrint(total))
+    return statements
+
+
+def measure(label, lower, serialize, statements):
+    gc.collect()
+    start = time.perf_counter()
+    result = lower(statements)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    json.dumps(serialize(result))
+    dumped = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = lower(statements)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:>8}: lower {elapsed:5.2f} s, {held / 2**20:7.1f} MiB held, json {dumped:5.2f} s")
+    return result
+
+
+def main():
+    instructions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    statements = program(instructions)
+    old = measure("dicts", legacy, lambda tac_json: tac_json, statements)
+    count = len(old[0]["body"])
+    del old
+    new = measure("tac.py", current, lambda proc: tac.to_json([proc]), statements)
+    print(f"{count} instructions with dicts, {len(new)} with tac.py")
+
+
+if __name__ == "__main__":
+    main()
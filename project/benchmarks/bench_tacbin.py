@@ -0,0 +1,85 @@
+"""Size and load time of binary TAC files against JSON.
+
+Writes a synthetic program of P procedures with N instructions each in both
+formats, then times loading all of it and fetching a single procedure.
+
+    python benchmarks/bench_tacbin.py [procedures] [instructions per procedure]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tac  # noqa: E402
+import tacbin  # noqa: E402
+
+
+def program(procedures: int, instructions: int):
+    rng = random.Random(302)
+    procs = []
+    for p in range(procedures):
+        proc = tac.Proc(f"@proc{p}", [0, 1])
+        proc.temps = 2
+        while len(proc.body) < instructions:
+            choice = rng.random()
+            if choice < 0.3:
+                proc.emit(tac.CONST, proc.new_temp(), rng.randrange(-1000, 1000))
+            elif choice < 0.8:
+                proc.emit(rng.choice((tac.ADD, tac.SUB, tac.MUL, tac.XOR)), proc.new_temp(),
+                          rng.randrange(proc.temps), rng.randrange(proc.temps))
+            elif choice < 0.9:
+                proc.emit(tac.PARAM, None, 1, rng.randrange(proc.temps))
+                proc.emit(tac.CALL, proc.new_temp(), f"@proc{rng.randrange(procedures)}", 1)
+            else:
+                label = proc.new_label()
+                proc.emit(tac.JZ, None, rng.randrange(proc.temps), label)
+                proc.emit(tac.LABEL, None, label)
+        proc.emit(tac.RET, None, proc.temps - 1)
+        procs.append(proc)
+    return procs
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def load_json(path):
+    with open(path) as fp:
+        return tac.from_json(json.load(fp))
+
+
+def main():
+    procedures = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    instructions = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    procs = program(procedures, instructions)
+    total = sum(len(proc) for proc in procs)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, bin_path = os.path.join(tmp, "p.json"), os.path.join(tmp, "p.tacb")
+        write_json, _ = timed(lambda: tacbin.save(procs, json_path))
+        write_bin, _ = timed(lambda: tacbin.save(procs, bin_path))
+        print(f"{procedures} procedures, {total} instructions")
+        print(f"{'':>8} {'size MiB':>9} {'write s':>8} {'load all s':>11} {'open + one proc s':>18}")
+
+        load_all, loaded = timed(lambda: load_json(json_path))
+        assert loaded == procs
+        one, _ = timed(lambda: load_json(json_path)[procedures // 2])
+        print(f"{'json':>8} {os.path.getsize(json_path) / 2**20:9.1f} {write_json:8.2f} {load_all:11.2f} {one:18.3f}")
+
+        load_all, loaded = timed(lambda: tacbin.read(bin_path))
+        assert loaded == procs
+
+        def open_one():
+            with tacbin.TacFile(bin_path) as tac_file:
+                return tac_file[f"@proc{procedures // 2}"]
+        one, _ = timed(open_one)
+        print(f"{'binary':>8} {os.path.getsize(bin_path) / 2**20:9.1f} {write_bin:8.2f} {load_all:11.2f} {one:18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Walking, rewriting and printing a very deep expression.
+
+Builds a left-associated sum of N variables (depth N) and times walk(), a
+Visitor that replaces every variable by a constant, and render(). None of them
+recurse, so the depth is only limited by memory.
+
+    python benchmarks/bench_visitor.py [depth]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_types  # noqa: E402
+import ast_visitor  # noqa: E402
+
+
+class VarsToZero(ast_visitor.Visitor):
+    def post_ExpressionVar(self, node):
+        return ast_types.ExpressionInt(value=0, pos=node.pos, source=node.source)
+
+
+def chain(depth: int) -> ast_types.Expression:
+    expr = ast_types.ExpressionVar(symbol="x0", pos=0, source=None)
+    for i in range(1, depth):
+        expr = ast_types.ExpressionBinOp(op="addition", left=expr, right=ast_types.ExpressionVar(symbol=f"x{i}", pos=0, source=None), pos=0, source=None)
+    return expr
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:>8}: {time.perf_counter() - start:.3f} s")
+    return result
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    expr = timed("build", lambda: chain(depth))
+    count = timed("walk", lambda: sum(1 for _ in ast_visitor.walk(expr)))
+    expr = timed("rewrite", lambda: VarsToZero().visit(expr))
+    text = timed("render", lambda: ast_visitor.render(expr))
+    print(f"depth {depth}, {count} nodes, {len(text)} characters printed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Native code from tac2x64: linear-scan allocation against every temporary on the stack.
+
+Builds three BX programs with gcc, once with linear scan and once with naive
+allocation. The programs are a recursive fib, a loop nest and a loop keeping
+fourteen variables live across a call with eight arguments. Reports the
+assembly size, how many instructions touch the stack frame, and the run time
+(best of 3). The output must match tac_interp's on a smaller input. The scale
+multiplies the iterations of the two loops.
+
+    python benchmarks/bench_x64.py [scale]
+"""
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bx2tac  # noqa: E402
+import tac2x64  # noqa: E402
+import tac_interp  # noqa: E402
+
+
+def fib(n: int) -> str:
+    return f"""
+def fib(n : int) : int {{
+  if (n < 2) {{ return n; }}
+  return fib(n = n - 1) + fib(n = n - 2);
+}}
+def main() {{ bx_print_int(x = fib(n = {n})); }}
+"""
+
+
+def loops(n: int) -> str:
+    return f"""
+def main() {{
+  var i = 0 : int; var acc = 1 : int;
+  while (i < {n}) {{
+    var j = 0 : int; var k = i : int;
+    while (j < 100) {{ acc = (acc + k * j) ^ (acc >> 3); k = k + 1; j = j + 1; }}
+    i = i + 1;
+  }}
+  bx_print_int(x = acc);
+}}
+"""
+
+
+def pressure(n: int) -> str:
+    names = [f"v{i}" for i in range(14)]
+    updates = " ".join(f"{name} = {names[i - 1]} + {name} * 3 % 1001;" for i, name in enumerate(names))
+    args = ", ".join(f"{p} = {name}" for p, name in zip("abcdefgh", names))
+    return f"""
+def mix(a : int, b : int, c : int, d : int, e : int, f : int, g : int, h : int) : int {{
+  return a - b * 2 + c * 3 - d * 4 + e * 5 - f * 6 + g * 7 - h * 8;
+}}
+def main() {{
+  {" ".join(f"var {name} = {i} : int;" for i, name in enumerate(names))}
+  var k = 0 : int;
+  while (k < {n}) {{
+    {updates}
+    v0 = v0 + mix({args}) % 100;
+    k = k + 1;
+  }}
+  bx_print_int(x = {" + ".join(names)});
+}}
+"""
+
+
+def run(path: str, repeat: int = 3):
+    best, out = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([path], capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    workloads = [("fib", fib, 32, 15),("loops", loops, int(200000 * scale), 20),
+                 ("pressure", pressure, int(2000000 * scale), 20)]
+    print(f"{'':>9} {'allocation':>11} {'asm lines':>10} {'frame refs':>11} {'run s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make, n, small in workloads:
+            expected = io.StringIO()
+            tac_interp.run(bx2tac.compile_source(make(small)), out=expected)
+            times = {}
+            for naive in (True, False):
+                exe = os.path.join(tmp, f"{name}-{naive}")
+                tac2x64.build(bx2tac.compile_source(make(small)), exe, naive)
+                assert run(exe, 1)[0] == expected.getvalue(), name
+                asm = tac2x64.build(bx2tac.compile_source(make(n)), exe, naive)
+                with open(asm) as f:
+                    code = [line for line in f if line.startswith("\t") and not line.startswith("\t.")]
+                frame_refs = sum(bool(re.search(r"-\d+\(%rbp\)", line)) for line in code)
+                _, times[naive] = run(exe)
+                print(f"{name:>9} {'naive' if naive else 'linear scan':>11} {len(code):10} {frame_refs:11} "
+                      f"{times[naive]:8.3f}")
+            print(f"{'':>9} {'speedup':>11} {'':>10} {'':>11} {times[True] / times[False]:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Generator of large, valid BX programs for compile-time benchmarks.
+
+Every procedure comes in several overloads. Each one declares a struct type
+and an array type, some int locals, and a body of assignments, ifs and bounded
+whiles nested to a given depth. Expressions chain a given number of operands:
+locals, parameters, globals, literals and calls to earlier procedures. The
+output goes through bxparser and bx2tac. Calls only reach earlier procedures
+and loops are bounded, so the programs halt, though the values mean nothing.
+
+    python benchmarks/bxgen.py [--procedures N] [--overloads N] [--statements N] [--depth N]
+                               [--width N] [--struct-fields N] [--array-dims N] [--seed N] > program.bx
+"""
+import random
+import sys
+from dataclasses import dataclass, fields
+
+INT_OPS = ("+", "-", "*", "&", "|", "^")
+COMPARISONS = ("==", "!=", "<", "<=", ">", ">=")
+FIELD_TYPES = ("int", "bool", "int[3]", "int*", "struct {x : int, y : bool}")
+GLOBALS = 4
+
+
+@dataclass(slots=True)
+class Params:
+    procedures: int = 20
+    overloads: int = 2  # versions of every procedure, told apart by their parameter types
+    statements: int = 5  # per block; ifs and whiles each hold one or two blocks, so size grows as statements ** depth
+    depth: int = 3  # nesting of ifs and whiles
+    width: int = 4  # operands per expression
+    struct_fields: int = 4  # of the struct type declared in every procedure, 0 for none
+    array_dims: int = 2  # of the array type declared in every procedure, 0 for none
+    locals: int = 4
+    seed: int = 302
+
+
+def signature(overload: int):
+    """Parameter types of an overload: one more int every two overloads, and a bool on odd ones."""
+    return ["int"] * (overload // 2 + 1) + (["bool"] if overload % 2 else [])
+
+
+class Generator:
+    def __init__(self, params: Params):
+        self.params = params
+        self.rng = random.Random(params.seed)
+        self.lines = []
+
+    def call(self, proc: int) -> str:
+        rng = self.rng
+        types = signature(rng.randrange(self.params.overloads))
+        args = ", ".join(f"p{i} = {rng.randrange(-9, 10)}" if ty == "int" else f"p{i} = {rng.choice(('true', 'false'))}"
+                         for i, ty in enumerate(types))
+        return f"f{rng.randrange(proc)}({args})"
+
+    def int_expr(self, proc: int, names) -> str:
+        rng = self.rng
+        operands = []
+        for _ in range(self.params.width):
+            choice = rng.random()
+            if choice < 0.5:
+                operands.append(rng.choice(names))
+            elif choice < 0.6:
+                operands.append(f"g{rng.randrange(GLOBALS)}")
+            elif choice < 0.7 and proc > 0:
+                operands.append(self.call(proc))
+            elif choice < 0.8:
+                operands.append(f"-({rng.choice(names)} >> {rng.randrange(1, 5)})")
+            else:
+                operands.append(str(rng.randrange(0, 100)))
+        text = operands[0]
+        for operand in operands[1:]:
+            text = f"({text} {rng.choice(INT_OPS)} {operand})"
+        return text
+
+    def condition(self, proc: int, names, flag) -> str:
+        rng = self.rng
+        parts = [f"{rng.choice(names)} {rng.choice(COMPARISONS)} {rng.randrange(-50, 50)}"
+                 for _ in range(max(1, self.params.width // 2))]
+        if flag is not None:
+            parts.append(flag if rng.random() < 0.5 else f"!{flag}")
+        text = parts[0]
+        for part in parts[1:]:
+            text = f"({text} {rng.choice(('&&', '||'))} {part})"
+        return text
+
+    def block(self, proc: int, names, flag, depth: int, indent: str):
+        rng = self.rng
+        for _ in range(self.params.statements):
+            choice = rng.random() if depth > 0 else 0.0
+            if choice < 0.6:
+                self.lines.append(f"{indent}{rng.choice(names)} = {self.int_expr(proc, names)} % 1000;")
+            elif choice < 0.8:
+                self.lines.append(f"{indent}if ({self.condition(proc, names, flag)}) {{")
+                self.block(proc, names, flag, depth - 1, indent + "  ")
+                self.lines.append(f"{indent}}} else {{")
+                self.block(proc, names, flag, depth - 1, indent + "  ")
+                self.lines.append(f"{indent}}}")
+            else:
+                # the counter gets a block of its own, so sibling loops can reuse its name
+                counter = f"i{depth}"
+                self.lines.append(f"{indent}{{ var {counter} = 0 : int;")
+                self.lines.append(f"{indent}  while ({counter} < {rng.randrange(1, 4)}) {{")
+                self.block(proc, names, flag, depth - 1, indent + "    ")
+                self.lines.append(f"{indent}    {counter} = {counter} + 1;")
+                self.lines.append(f"{indent}  }}")
+                self.lines.append(f"{indent}}}")
+
+    def procedure(self, proc: int, overload: int):
+        params = self.params
+        types = signature(overload)
+        header = ", ".join(f"p{i} : {ty}" for i, ty in enumerate(types))
+        self.lines.append(f"def f{proc}({header}) : int {{")
+        if params.struct_fields:
+            members = ", ".join(f"m{i} : {FIELD_TYPES[i % len(FIELD_TYPES)]}" for i in range(params.struct_fields))
+            self.lines.append(f"  type s{proc} = struct {{{members}}};")
+        if params.array_dims:
+            dims = "".join(f"[{self.rng.randrange(2, 9)}]" for _ in range(params.array_dims))
+            self.lines.append(f"  type a{proc} = int{dims};")
+        names = [f"p{i}" for i, ty in enumerate(types) if ty == "int"]
+        local_names = [f"v{i}" for i in range(params.locals)]
+        self.lines.append("  var " + ", ".join(f"{name} = {i}" for i, name in enumerate(local_names)) + " : int;")
+        names += local_names
+        flag = f"p{len(types) - 1}" if types[-1] == "bool" else None
+        self.block(proc, names, flag, params.depth, "  ")
+        self.lines.append(f"  return {' + '.join(local_names)};")
+        self.lines.append("}")
+
+    def program(self) -> str:
+        self.lines = [f"var g{i} = {i + 1} : int;" for i in range(GLOBALS)]
+        for proc in range(self.params.procedures):
+            for overload in range(self.params.overloads):
+                self.procedure(proc, overload)
+        self.lines.append("def main() {")
+        self.lines.append(f"  bx_print_int(x = f{self.params.procedures - 1}(p0 = 1));")
+        self.lines.append("}")
+        return "\n".join(self.lines) + "\n"
+
+
+def generate(params: Params) -> str:
+    return Generator(params).program()
+
+
+def parse_args(argv) -> Params:
+    params = Params()
+    for f in fields(Params):
+        flag = "--" + f.name.replace("_", "-")
+        if flag in argv:
+            setattr(params, f.name, int(argv[argv.index(flag) + 1]))
+    return params
+
+
+if __name__ == "__main__":
+    sys.stdout.write(generate(parse_args(sys.argv)))
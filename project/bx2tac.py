@@ -0,0 +1,446 @@
+"""Lowering of a parsed BX program to TAC.
+
+Handles the scalar part of the language: int and bool variables, globals,
+arithmetic, comparisons, the logical operators (short-circuiting), calls,
+if/else, while, break/continue and return. Expressions and statements are
+lowered with explicit work stacks, so deep nesting does not recurse.
+
+The conditions of if and while are lowered straight to jumps: &&, || and !
+pick the label to jump to instead of computing a boolean that is then tested
+again. A comparison is a compare instruction (lt, eq, ...) followed by the
+jump on its result, which tac2x64 turns into a cmpq and a conditional jump.
+Comparisons never subtract, so they hold for operands whose difference
+overflows.
+
+With workers, globals and signatures are resolved once, then the procedures
+are folded, lowered and optimized by a pool of processes, in contiguous chunks
+that come back as binary TAC (tacbin.dumps) and are put back in source order.
+
+    python bx2tac.py program.bx [-o program.json|program.tacb] [-O0] [-j WORKERS]
+                     [--time-passes[=json]] [--trace-memory]
+
+-O0 turns off constant folding (fold) and the TAC passes (tac_opt).
+--time-passes prints the time and counts of every pass (see passes), --trace-memory
+adds the peak memory of each, at the price of much slower passes.
+"""
+import gc
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+import ast_types
+import fold
+import tac
+import tac_opt
+import tacbin
+
+# operator name in the AST -> opcode
+BINARY_OPS: Dict[str, int] = {
+    "addition": tac.ADD, "substraction": tac.SUB, "multiplication": tac.MUL, "division": tac.DIV,
+    "modulus": tac.MOD, "bitwise-and": tac.AND, "bitwise-or": tac.OR, "bitwise-xor": tac.XOR,
+    "bitwise-shift-left": tac.SHL, "bitwise-shift-right": tac.SHR,
+}
+UNARY_OPS: Dict[str, int] = {"opposite": tac.NEG, "bitwise-negation": tac.NOT}
+COMPARISONS: Dict[str, int] = {
+    "is-equal": tac.EQ, "is-not-equal": tac.NE, "is-less-than": tac.LT, "is-less-than-or-equal": tac.LE,
+    "is-greater-than": tac.GT, "is-greater-than-or-equal": tac.GE,
+}
+LOGICAL = ("logical-and", "logical-or")
+
+INT, BOOL, VOID = ast_types.BXTypesInt(), ast_types.BXTypesBool(), ast_types.BXTypesVoid()
+Value = Tuple[tac.Temp, ast_types.BXTypes]
+
+
+class LoweringError(Exception):
+    pass
+
+
+def _error(node: ast_types.Located, message: str) -> LoweringError:
+    return LoweringError(f"Error on line {node.lineno}: {message}")
+
+
+def arg_name(name) -> str:
+    # the first argument of a call is named by a str, the others by an ExpressionVar
+    return name if isinstance(name, str) else name.symbol
+
+
+def mangle(ty: ast_types.BXTypes) -> str:
+    """A type as part of a symbol, in [A-Za-z0-9_]: int, bool, Pint for int*, A3_int for int[3],
+    S1xint1ybool_E for struct {x : int, y : bool}. No code is a prefix of another, so the
+    codes of a parameter list can be told apart."""
+    if isinstance(ty, ast_types.BXTypesPointer):
+        return "P" + mangle(ty.ty)
+    if isinstance(ty, ast_types.BXTypesListType):
+        return f"A{ty.length}_{mangle(ty.ty)}"
+    if isinstance(ty, ast_types.BXTypesStruct):
+        return "S" + "".join(f"{len(f.name)}{f.name}{mangle(f.ty)}" for f in ty.fields) + "_E"
+    return repr(ty)
+
+
+class Signatures:
+    """Every procedure of a program in the overload index of a StatementBlock (define_proc and
+    recognize_proc), with the TAC name each overload gets."""
+
+    def __init__(self, program: ast_types.Program):
+        self.index = ast_types.StatementBlock(statements=[], pos=0, source=program.source)
+        # the declaration of every signature in the index
+        self.procs: Dict[Tuple[str, Tuple[ast_types.BXTypes, ...]], ast_types.Procedure] = {}
+        for proc in program.procedures:
+            key = tuple(param.ty for param in proc.params)
+            try:
+                self.index.define_proc(proc.name, ast_types.ProcType(list(key), proc.return_ty))
+            except TypeError as error:
+                raise _error(proc, str(error)) from None
+            self.procs[proc.name, key] = proc
+
+    def tac_name(self, proc: ast_types.Procedure) -> str:
+        if len(self.index.proc_scope[proc.name]) == 1:
+            return f"@{proc.name}"
+        return "@" + ".".join([proc.name] + [mangle(param.ty) for param in proc.params])
+
+    def resolve(self, node: ast_types.ExpressionCall, types: List[ast_types.BXTypes]) -> Tuple[str, ast_types.BXTypes]:
+        """TAC name and return type of the procedure a call reaches. Arguments are matched to the
+        parameters by position, as recognize_proc does."""
+        if node.target in ast_types.RESERVED_FUNCTIONS:
+            return f"@{node.target}", ast_types.RESERVED_FUNCTIONS[node.target].return_ty
+        try:
+            proc_type = self.index.recognize_proc(node.target, types)
+        except Exception as error:
+            raise _error(node, str(error)) from None
+        return self.tac_name(self.procs[node.target, tuple(types)]), proc_type.return_ty
+
+
+class ProcLowering:
+    def __init__(self, proc: ast_types.Procedure, signatures: Signatures, globals_: Dict[str, Value],
+                 jumps: bool = True):
+        self.signatures = signatures
+        self.jumps = jumps  # lower conditions to jumps, rather than test their value
+        self.scopes: List[Dict[str, Value]] = [globals_, {}]
+        self.loops: List[Tuple[int, int]] = []  # (continue label, break label)
+        self.out = tac.Proc(signatures.tac_name(proc))
+        for param in proc.params:
+            temp = self.out.new_temp()
+            self.scopes[-1][param.symbol] = (temp, param.ty)
+            self.out.params.append(temp)
+        self.proc = proc
+
+    def lookup(self, node: ast_types.Located, symbol: str) -> Value:
+        for scope in reversed(self.scopes):
+            if symbol in scope:
+                return scope[symbol]
+        raise _error(node, f"Symbol {symbol} not defined.")
+
+    ########## Expressions ##########
+
+    def expr(self, root: ast_types.Expression) -> Value:
+        """Lowers an expression and returns the temporary holding its value, with its type."""
+        out = self.out
+        # (node, state, data): state counts how many children have been lowered
+        stack: List[tuple] = [(root, 0, None)]
+        results: List[Value] = []
+        while stack:
+            node, state, data = stack.pop()
+            if isinstance(node, ast_types.ExpressionInt):
+                results.append((out.emit(tac.CONST, out.new_temp(), node.value), INT))
+            elif isinstance(node, ast_types.ExpressionBool):
+                results.append((out.emit(tac.CONST, out.new_temp(), int(node.value)), BOOL))
+            elif isinstance(node, ast_types.ExpressionVar):
+                temp, ty = self.lookup(node, node.symbol)
+                if isinstance(temp, str):
+                    # a global can change during the rest of the expression (in a call), read it now
+                    temp = out.emit(tac.COPY, out.new_temp(), temp)
+                results.append((temp, ty))
+            elif isinstance(node, ast_types.ExpressionUniOp):
+                if state == 0:
+                    stack += [(node, 1, None), (node.argument, 0, None)]
+                    continue
+                argument, ty = results.pop()
+                if node.op == "logical-negation":
+                    one = out.emit(tac.CONST, out.new_temp(), 1)
+                    results.append((out.emit(tac.XOR, out.new_temp(), argument, one), BOOL))
+                else:
+                    results.append((out.emit(UNARY_OPS[node.op], out.new_temp(), argument), INT))
+            elif isinstance(node, ast_types.ExpressionBinOp) and node.op in LOGICAL:
+                # result = left; if it decides, skip the right operand
+                if state == 0:
+                    stack += [(node, 1, None), (node.left, 0, None)]
+                elif state == 1:
+                    left, _ = results.pop()
+                    result, done = out.new_temp(), out.new_label()
+                    out.emit(tac.COPY, result, left)
+                    out.emit(tac.JZ if node.op == "logical-and" else tac.JNZ, None, result, done)
+                    stack += [(node, 2, (result, done)), (node.right, 0, None)]
+                else:
+                    right, _ = results.pop()
+                    result, done = data
+                    out.emit(tac.COPY, result, right)
+                    out.emit(tac.LABEL, None, done)
+                    results.append((result, BOOL))
+            elif isinstance(node, ast_types.ExpressionBinOp):
+                if state == 0:
+                    stack += [(node, 1, None), (node.right, 0, None), (node.left, 0, None)]
+                    continue
+                right, _ = results.pop()
+                left, _ = results.pop()
+                if node.op in COMPARISONS:
+                    results.append((out.emit(COMPARISONS[node.op], out.new_temp(), left, right), BOOL))
+                elif node.op in BINARY_OPS:
+                    results.append((out.emit(BINARY_OPS[node.op], out.new_temp(), left, right), INT))
+                else:
+                    raise _error(node, f"Unknown operator {node.op}.")
+            elif isinstance(node, ast_types.ExpressionCall):
+                if state == 0:
+                    stack.append((node, 1, None))
+                    stack += [(arg, 0, None) for _, arg in reversed(node.args)]
+                    continue
+                args = results[len(results) - len(node.args):]
+                del results[len(results) - len(node.args):]
+                name, return_ty = self.signatures.resolve(node, [ty for _, ty in args])
+                for position, (temp, _) in enumerate(args, 1):
+                    out.emit(tac.PARAM, None, position, temp)
+                result = None if return_ty == VOID else out.new_temp()
+                out.emit(tac.CALL, result, name, len(args))
+                results.append((result, return_ty))
+            elif isinstance(node, (ast_types.ExpressionAccess, ast_types.ExpressionAddress, ast_types.ExpressionDeref)):
+                raise _error(node, "Memory operations are not supported by the TAC lowering.")
+            else:
+                raise _error(root, f"Cannot lower expression {node!r}.")
+        return results[0]
+
+    def cond(self, root: ast_types.Expression, on_true: int, on_false: int, follows: Optional[int]) -> Set[int]:
+        """Lowers a condition to jumps to on_true or on_false, and returns the labels jumped to.
+        follows is the label placed right after the condition, reached by falling through."""
+        out = self.out
+        targets: Set[int] = set()
+        # conditions to lower, and labels to place between them
+        work: List[Union[tuple, int]] = [(root, on_true, on_false, follows)]
+        while work:
+            item = work.pop()
+            if isinstance(item, int):
+                out.emit(tac.LABEL, None, item)
+                continue
+            node, on_true, on_false, follows = item
+            if isinstance(node, ast_types.ExpressionBool):
+                target = on_true if node.value else on_false
+                if target != follows:
+                    out.emit(tac.JMP, None, target)
+                    targets.add(target)
+            elif isinstance(node, ast_types.ExpressionUniOp) and node.op == "logical-negation":
+                work.append((node.argument, on_false, on_true, follows))
+            elif isinstance(node, ast_types.ExpressionBinOp) and node.op in LOGICAL:
+                middle = out.new_label()
+                if node.op == "logical-and":
+                    left = (node.left, middle, on_false, middle)
+                else:
+                    left = (node.left, on_true, middle, middle)
+                work += [(node.right, on_true, on_false, follows), middle, left]
+            else:
+                tested = self.expr(node)[0]
+                if follows == on_true:
+                    out.emit(tac.JZ, None, tested, on_false)
+                    targets.add(on_false)
+                else:
+                    out.emit(tac.JNZ, None, tested, on_true)
+                    targets.add(on_true)
+                    if follows != on_false:
+                        out.emit(tac.JMP, None, on_false)
+                        targets.add(on_false)
+        return targets
+
+    def branch(self, condition: ast_types.Expression, on_false: int):
+        """Lowers condition so that control falls through when it holds and jumps to on_false otherwise."""
+        out = self.out
+        if not self.jumps:
+            out.emit(tac.JZ, None, self.expr(condition)[0], on_false)
+            return
+        on_true = out.new_label()
+        if on_true in self.cond(condition, on_true, on_false, on_true):
+            out.emit(tac.LABEL, None, on_true)
+
+    ########## Statements ##########
+
+    def lower(self) -> tac.Proc:
+        out = self.out
+        # statements, and callables that finish a statement once its body is lowered
+        work: List[Union[ast_types.Statement, Callable[[], None]]] = [self.proc.block]
+        while work:
+            item = work.pop()
+            if callable(item):
+                item()
+            elif isinstance(item, ast_types.StatementBlock):
+                self.scopes.append({})
+                work.append(self.scopes.pop)
+                work += reversed(item.statements)
+            elif isinstance(item, ast_types.StatementVarDecl):
+                for var, rvalue in zip(item.vars, item.rvalues):
+                    value, _ = self.expr(rvalue)
+                    temp = out.emit(tac.COPY, out.new_temp(), value)
+                    self.scopes[-1][arg_name(var)] = (temp, item.typehint)
+            elif isinstance(item, ast_types.StatementAssign):
+                target, _ = self.lookup(item, item.lvalue.symbol)
+                value, _ = self.expr(item.rvalue)
+                out.emit(tac.COPY, target, value)
+            elif isinstance(item, ast_types.StatementEval):
+                self.expr(item.call)
+            elif isinstance(item, ast_types.StatementIfElse):
+                otherwise = out.new_label()
+                self.branch(item.condition, otherwise)
+                if item.optelse is None:
+                    work.append(lambda otherwise=otherwise: out.emit(tac.LABEL, None, otherwise))
+                else:
+                    end = out.new_label()
+                    work.append(lambda end=end: out.emit(tac.LABEL, None, end))
+                    work.append(item.optelse)
+                    work.append(lambda otherwise=otherwise, end=end: (out.emit(tac.JMP, None, end),
+                                                                     out.emit(tac.LABEL, None, otherwise)))
+                work.append(item.body)
+            elif isinstance(item, ast_types.StatementWhile):
+                head, end = out.new_label(), out.new_label()
+                out.emit(tac.LABEL, None, head)
+                self.branch(item.condition, end)
+                self.loops.append((head, end))
+                work.append(lambda head=head, end=end: (self.loops.pop(), out.emit(tac.JMP, None, head),
+                                                        out.emit(tac.LABEL, None, end)))
+                work.append(item.body)
+            elif isinstance(item, ast_types.StatementJump):
+                if not self.loops:
+                    raise _error(item, f"{item.jump} outside of a loop.")
+                head, end = self.loops[-1]
+                out.emit(tac.JMP, None, head if item.jump == "continue" else end)
+            elif isinstance(item, ast_types.StatementReturn):
+                if item.return_expr is None:
+                    out.emit(tac.RET)
+                else:
+                    out.emit(tac.RET, None, self.expr(item.return_expr)[0])
+            elif isinstance(item, ast_types.StatementTyDecl):
+                pass
+            else:
+                raise _error(item, f"Cannot lower statement {item!r}.")
+        if not out.body or out.body[-1].op != tac.RET:
+            out.emit(tac.RET)
+        return out
+
+
+def global_value(decl: ast_types.StatementVarDecl, rvalue: ast_types.Expression) -> int:
+    """The initial value of a global, evaluated by the folder whether or not the procedures are optimized."""
+    rvalue = fold.fold(rvalue)
+    if isinstance(rvalue, (ast_types.ExpressionInt, ast_types.ExpressionBool)):
+        return int(rvalue.value)
+    raise _error(decl, "Global variables must be initialized with a constant.")
+
+
+def resolve_globals(program: ast_types.Program) -> Tuple[List[tac.GlobalVar], Dict[str, Value]]:
+    decls: List[tac.GlobalVar] = []
+    globals_: Dict[str, Value] = {}
+    for decl in program.global_block.statements:
+        if isinstance(decl, ast_types.StatementVarDecl):
+            for var, rvalue in zip(decl.vars, decl.rvalues):
+                name = arg_name(var)
+                decls.append(tac.GlobalVar(f"@{name}", global_value(decl, rvalue)))
+                globals_[name] = (f"@{name}", decl.typehint)
+    return decls, globals_
+
+
+def program_to_tac(program: ast_types.Program, jumps: bool = True) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    signatures = Signatures(program)
+    decls, globals_ = resolve_globals(program)
+    return decls + [ProcLowering(proc, signatures, globals_, jumps).lower() for proc in program.procedures]
+
+
+# what every worker of lower_parallel shares: procedures, signatures, globals and whether to optimize
+_shared: Optional[tuple] = None
+
+
+def _init_worker(shared: tuple):
+    global _shared
+    _shared = shared
+
+
+def lower_procedure(proc: ast_types.Procedure, signatures: Signatures, globals_: Dict[str, Value],
+                    optimize: bool = True) -> tac.Proc:
+    """compile_source's work on a single procedure."""
+    if optimize:
+        fold.Folder().visit(proc)
+    out = ProcLowering(proc, signatures, globals_).lower()
+    if optimize:
+        tac_opt.optimize(out)
+    return out
+
+
+def _lower_chunk(bounds: Tuple[int, int]) -> bytes:
+    procedures, signatures, globals_, optimize = _shared
+    return tacbin.dumps([lower_procedure(proc, signatures, globals_, optimize)
+                         for proc in procedures[bounds[0]:bounds[1]]])
+
+
+def lower_parallel(program: ast_types.Program, workers: int, optimize: bool = True,
+                   chunks_per_worker: int = 4) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    """compile_source's work on a parsed program, with the procedures spread over worker processes."""
+    signatures = Signatures(program)
+    decls, globals_ = resolve_globals(program)
+    count = len(program.procedures)
+    size = max(1, -(-count // (workers * chunks_per_worker)))
+    bounds = [(start, min(start + size, count)) for start in range(0, count, size)]
+    # forked workers inherit the program instead of unpickling a copy of it; freezing the heap keeps
+    # their garbage collector from walking (and so copying the pages of) everything they inherited
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    gc.freeze()
+    try:
+        with ProcessPoolExecutor(workers, context, _init_worker,
+                                 ((program.procedures, signatures, globals_, optimize),)) as pool:
+            for data in pool.map(_lower_chunk, bounds):
+                decls += tacbin.loads(data)
+    finally:
+        gc.unfreeze()
+    return decls
+
+
+def compile_source(source: str, name: str = "<input>", optimize: bool = True,
+                   workers: int = 0, lexer=None, timer=None) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    """timer, a passes.Passes, records every pass; scanning is then done ahead of parsing."""
+    import bxparser
+    import passes
+    if timer is None:
+        timer = passes.UNTIMED
+        program = bxparser.parse(source, lexer=lexer, name=name)
+    else:
+        tokens = timer.call("scan", passes.scan, source, lexer, name, count=passes.count_tokens)
+        program = timer.call("parse", bxparser.parse, source, lexer=passes.Replay(tokens), name=name,
+                             count=passes.count_nodes)
+    if workers:
+        return timer.call("lower -j", lower_parallel, program, workers, optimize, count=passes.count_tac)
+    if optimize:
+        timer.call("fold", fold.fold_program, program, count=lambda folded: {"folded": folded})
+    decls = timer.call("lower", program_to_tac, program, count=passes.count_tac)
+    if optimize:
+        timer.call("optimize", tac_opt.optimize_program, decls, count=lambda stats: {**stats, **passes.count_tac(decls)})
+    return decls
+
+
+def report_passes(timer):
+    """Prints what --time-passes asked for to stderr: a table, or JSON with --time-passes=json."""
+    import json
+    print(json.dumps(timer.to_json(), indent=2) if "--time-passes=json" in sys.argv else timer.table(),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bx2tac.py PROGRAM.bx [-o OUTPUT] [-O0] [-j WORKERS] [--time-passes[=json]] "
+              "[--trace-memory]", file=sys.stderr)
+        sys.exit(1)
+    path = sys.argv[1]
+    output = sys.argv[sys.argv.index("-o") + 1] if "-o" in sys.argv else path.rsplit(".", 1)[0] + ".tac.json"
+    workers = int(sys.argv[sys.argv.index("-j") + 1]) if "-j" in sys.argv else 0
+    timer = None
+    if any(arg.startswith("--time-passes") for arg in sys.argv):
+        import passes
+        timer = passes.Passes(trace_memory="--trace-memory" in sys.argv)
+    with open(path) as f:
+        decls = compile_source(f.read(), path, optimize="-O0" not in sys.argv, workers=workers, timer=timer)
+    if timer is None:
+        tacbin.save(decls, output)
+    else:
+        timer.call("save", tacbin.save, decls, output)
+        report_passes(timer)
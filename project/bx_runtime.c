@@ -0,0 +1,11 @@
+/* Runtime of the programs built by tac2x64.py. */
+#include <inttypes.h>
+#include <stdio.h>
+
+void bx_print_int(int64_t x) {
+  printf("%" PRId64 "\n", x);
+}
+
+void bx_print_bool(int64_t b) {
+  puts(b ? "true" : "false");
+}
@@ -0,0 +1,97 @@
+"""Compiles many BX files in one process.
+
+One lexer is built by bxscanner.create_lexer() and cloned for every file. The
+yacc parser is built once too. A file that fails to compile is reported with
+its error and the others go on. Each output lands next to its source, as with
+bx2tac.py, or in --outdir, at the source's path relative to the deepest
+directory holding all the inputs, so that a/x.bx and b/x.bx do not collide.
+
+    python bxbatch.py FILE_OR_GLOB... [-O0] [--outdir DIR]
+
+Prints the throughput at the end and exits with 1 if any file failed.
+"""
+import glob
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import bx2tac
+import bxparser
+import bxscanner
+import tacbin
+
+
+@dataclass(slots=True)
+class BatchResult:
+    files: int = 0
+    lines: int = 0
+    seconds: float = 0.0
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (path, message)
+
+
+def expand(patterns: List[str]) -> List[str]:
+    """Paths matching the patterns, in order and without repeats. A pattern without matches is kept
+    as it is, so that it is reported as a missing file."""
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else []
+        paths += matches or [pattern]
+    return list(dict.fromkeys(paths))
+
+
+def common_root(paths: List[str]) -> str:
+    """The deepest directory holding every path."""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else ""
+
+
+def output_path(path: str, outdir: Optional[str], root: Optional[str] = None) -> str:
+    output = path.rsplit(".", 1)[0] + ".tac.json"
+    if outdir is None:
+        return output
+    return os.path.join(outdir, os.path.relpath(os.path.abspath(output), root or common_root([path])))
+
+
+def compile_files(paths: List[str], optimize: bool = True, outdir: Optional[str] = None) -> BatchResult:
+    result = BatchResult()
+    start = time.perf_counter()
+    template = bxscanner.create_lexer()
+    bxparser.get_parser()
+    root = common_root(paths)
+    for path in paths:
+        result.files += 1
+        try:
+            with open(path) as f:
+                source = f.read()
+            result.lines += source.count("\n") + 1
+            decls = bx2tac.compile_source(source, path, optimize, lexer=template.clone())
+            output = output_path(path, outdir, root)
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            tacbin.save(decls, output)
+        except Exception as error:
+            result.failures.append((path, str(error) or type(error).__name__))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    outdir = None
+    if "--outdir" in args:
+        i = args.index("--outdir")
+        outdir = args[i + 1]
+        del args[i:i + 2]
+        os.makedirs(outdir, exist_ok=True)
+    optimize = "-O0" not in args
+    patterns = [arg for arg in args if arg != "-O0"]
+    if not patterns:
+        print("usage: python bxbatch.py FILE_OR_GLOB... [-O0] [--outdir DIR]", file=sys.stderr)
+        sys.exit(1)
+    result = compile_files(expand(patterns), optimize, outdir)
+    for path, message in result.failures:
+        print(f"{path}: {message}", file=sys.stderr)
+    seconds = max(result.seconds, 1e-9)
+    print(f"{result.files - len(result.failures)}/{result.files} files compiled in {result.seconds:.2f}s, "
+          f"{result.files / seconds:.1f} files/s, {result.lines / seconds:.0f} lines/s", file=sys.stderr)
+    sys.exit(1 if result.failures else 0)
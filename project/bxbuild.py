@@ -0,0 +1,201 @@
+"""Incremental compilation: an on-disk cache of lowered procedures, keyed by content.
+
+The source is first split into its top-level declarations by the lexer alone.
+A procedure's key hashes several things together:
+- its tokens, so whitespace and comments do not count;
+- the headers of every procedure it calls or shares its name with, since
+  signatures and overloading decide the types and TAC names;
+- the declarations of the globals it mentions;
+- the options and the code of the compiler.
+Procedures found in the cache are not parsed. Their bodies are blanked out,
+keeping offsets and line numbers, and the rest of the source goes through
+bxparser and bx2tac as usual.
+
+Nothing here type-checks. Lowering only checks what it needs: names are
+defined, every call reaches an overload, break and continue are in loops.
+The types of operands, assignments and returns are not checked, in cached
+procedures or others; that is Program.resolve's job, and it is not run. A
+cached procedure passed the checks of lowering on the same key, so skipping
+it skips nothing that would fail.
+
+    python bxbuild.py program.bx [-o program.json|program.tacb] [-O0]
+"""
+import hashlib
+import importlib
+import struct
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+import bx2tac
+import bxcache
+import bxparser
+import passes
+import py.ply.lex as lex  # type: ignore
+import tac
+import tacbin
+
+# modules whose code decides the TAC of a procedure
+COMPILER = ("ast_types", "ast_visitor", "bx2tac", "bxparser", "bxscanner", "fold", "tac", "tac_cfg", "tac_opt")
+
+
+@dataclass(slots=True)
+class Decl:
+    """A top-level declaration. body is the index in tokens of a procedure's '{', None for globals."""
+    names: List[str]
+    tokens: List[lex.LexToken]
+    body: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(token.value for token in self.tokens)
+
+    @property
+    def header(self) -> str:
+        return " ".join(token.value for token in self.tokens[:self.body])
+
+    def idents(self) -> Set[str]:
+        return {token.value for token in self.tokens[self.body:] if token.type == "IDENT"}
+
+
+def split(source: str) -> List[Decl]:
+    """Top-level declarations of a source, from its tokens: procedures end at their closing brace,
+    the others at a semicolon outside braces."""
+    tokens = passes.scan(source)
+    decls: List[Decl] = []
+    i = 0
+    while i < len(tokens):
+        is_proc = tokens[i].type == "DEF"
+        depth, after_struct, body = 0, False, None
+        j = i
+        while j < len(tokens):
+            kind = tokens[j].type
+            j += 1
+            if kind == "LCPAREN":
+                if depth == 0 and is_proc and not after_struct and body is None:
+                    body = j - 1 - i
+                depth += 1
+            elif kind == "RCPAREN":
+                depth -= 1
+                if depth == 0 and body is not None:
+                    break
+            elif kind == "SEMICOLON" and depth == 0 and not is_proc:
+                break
+            after_struct = kind == "STRUCT"
+        chunk = tokens[i:j]
+        if is_proc:
+            names = [chunk[1].value] if len(chunk) > 1 else []
+        else:
+            # var a = 1, b = 2 : int;
+            names = [token.value for prev, token, next_ in zip(chunk, chunk[1:], chunk[2:])
+                     if prev.type in ("VARDECL", "COMMA", "TYPE") and token.type == "IDENT" and next_.type == "EQUALS"]
+        decls.append(Decl(names, chunk, body))
+        i = j
+    return decls
+
+
+_fingerprint: Optional[bytes] = None
+
+
+def compiler_fingerprint() -> bytes:
+    global _fingerprint
+    if _fingerprint is None:
+        h = hashlib.sha256()
+        for name in COMPILER:
+            h.update(Path(importlib.import_module(name).__file__).read_bytes())
+        _fingerprint = h.digest()
+    return _fingerprint
+
+
+def keys(decls: List[Decl], optimize: bool) -> Dict[int, str]:
+    """Cache key of every procedure, by its index in decls."""
+    headers: Dict[str, List[str]] = {}
+    globals_: Dict[str, str] = {}
+    for decl in decls:
+        if decl.body is not None:
+            headers.setdefault(decl.names[0], []).append(decl.header)
+        else:
+            for name in decl.names:
+                globals_[name] = decl.text
+    result = {}
+    for i, decl in enumerate(decls):
+        if decl.body is None:
+            continue
+        h = hashlib.sha256(compiler_fingerprint())
+        h.update(b"O1" if optimize else b"O0")
+        h.update(decl.text.encode())
+        idents = decl.idents()
+        for name in sorted(idents & headers.keys() | set(decl.names)):
+            h.update(b"\0proc\0" + name.encode() + b"\0" + "\0".join(headers[name]).encode())
+        for name in sorted(idents & globals_.keys()):
+            h.update(b"\0var\0" + name.encode() + b"\0" + globals_[name].encode())
+        result[i] = h.hexdigest()
+    return result
+
+
+class BuildCache:
+    """Lowered procedures by key, one binary TAC file each. hits and misses count procedures."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory is not None else bxcache.user_cache_dir() / "procs"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[tac.Proc]:
+        try:
+            return tacbin.loads((self.directory / key).read_bytes())[0]
+        except FileNotFoundError:
+            return None
+        except (ValueError, IndexError, struct.error):
+            return None  # unreadable entry, lowered and written again
+
+    def put(self, key: str, proc: tac.Proc):
+        bxcache.atomic_write_bytes(self.directory / key, tacbin.dumps([proc]))
+
+    def compile(self, source: str, name: str = "<input>",
+                optimize: bool = True) -> List[Union[tac.GlobalVar, tac.Proc]]:
+        """bx2tac.compile_source, reusing the procedures of earlier builds that did not change."""
+        decls = split(source)
+        proc_keys = keys(decls, optimize)
+        cached: Dict[int, tac.Proc] = {}
+        for i, key in proc_keys.items():
+            proc = self.get(key)
+            if proc is not None:
+                cached[i] = proc
+        # blank out the bodies of cached procedures, keeping their braces and newlines
+        pieces, pos = [], 0
+        for i in cached:
+            tokens, body = decls[i].tokens, decls[i].body
+            start, end = tokens[body].lexpos + 1, tokens[-1].lexpos
+            pieces += [source[pos:start], "".join(c if c == "\n" else " " for c in source[start:end])]
+            pos = end
+        pieces.append(source[pos:])
+        program = bxparser.parse("".join(pieces), name=name)
+
+        signatures = bx2tac.Signatures(program)
+        global_vars, globals_ = bx2tac.resolve_globals(program)
+        result: List[Union[tac.GlobalVar, tac.Proc]] = list(global_vars)
+        for i, proc in zip(proc_keys, program.procedures):
+            if i in cached:
+                self.hits += 1
+                result.append(cached[i])
+            else:
+                self.misses += 1
+                result.append(bx2tac.lower_procedure(proc, signatures, globals_, optimize))
+                self.put(proc_keys[i], result[-1])
+        return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bxbuild.py PROGRAM.bx [-o OUTPUT] [-O0]", file=sys.stderr)
+        sys.exit(1)
+    path = sys.argv[1]
+    output = sys.argv[sys.argv.index("-o") + 1] if "-o" in sys.argv else path.rsplit(".", 1)[0] + ".tac.json"
+    cache = BuildCache()
+    with open(path) as f:
+        decls = cache.compile(f.read(), path, optimize="-O0" not in sys.argv)
+    tacbin.save(decls, output)
+    print(f"{cache.hits} cached, {cache.misses} lowered", file=sys.stderr)
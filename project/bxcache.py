@@ -0,0 +1,36 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+def user_cache_dir() -> Path:
+    """Per-user cache directory of the BX compiler.
+
+    BXC_CACHE_DIR wins, then $XDG_CACHE_HOME/bxc, then ~/.cache/bxc. Created if missing; raises
+    OSError when it cannot be, so that callers treating the cache as optional can go on without it."""
+    override = os.environ.get("BXC_CACHE_DIR")
+    if override:
+        path = Path(override)
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        path = Path(base) / "bxc"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def temp_path(directory: Path, suffix: str = "") -> Path:
+    # created in the target directory so that os.replace() stays on one filesystem
+    fd, name = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=suffix)
+    os.close(fd)
+    return Path(name)
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    tmp = temp_path(path.parent)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
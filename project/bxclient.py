@@ -0,0 +1,57 @@
+"""Command line client of bxserver. It imports nothing of the compiler, so it starts fast.
+
+    python bxclient.py PROGRAM.bx [-o OUTPUT] [-O0] [--socket PATH]
+    python bxclient.py --stats | --stop [--socket PATH]
+
+The output is written by the server, to the same default path as bx2tac.py's.
+"""
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+import bxcache
+
+
+def default_socket() -> Path:
+    return bxcache.user_cache_dir() / "bxserver.sock"
+
+
+def request(message: dict, path: Path) -> dict:
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(path))
+        sock.sendall(json.dumps(message).encode())
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(1 << 16):
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+
+def main(argv) -> int:
+    path = Path(argv[argv.index("--socket") + 1]) if "--socket" in argv else default_socket()
+    if "--stats" in argv or "--stop" in argv:
+        reply = request({"op": "stats" if "--stats" in argv else "shutdown"}, path)
+        if "--stats" in argv:
+            print(" ".join(f"{name} {value:.2f}" if isinstance(value, float) else f"{name} {value}"
+                           for name, value in reply.items() if name != "ok"))
+        return 0
+    source_path = argv[1]
+    output = argv[argv.index("-o") + 1] if "-o" in argv else source_path.rsplit(".", 1)[0] + ".tac.json"
+    with open(source_path) as f:
+        source = f.read()
+    reply = request({"op": "compile", "source": source, "name": source_path,
+                     "output": os.path.abspath(output), "optimize": "-O0" not in argv}, path)
+    if not reply["ok"]:
+        print(reply["error"], file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bxclient.py PROGRAM.bx [-o OUTPUT] [-O0] [--socket PATH]\n"
+              "       python bxclient.py --stats | --stop [--socket PATH]", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(main(sys.argv))
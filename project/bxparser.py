@@ -1,7 +1,13 @@
+import contextlib
+import hashlib
+import os
 from types import NoneType
 from typing import List
 import ast_types
+import bxcache
+import bxscanner
 from bxscanner import tokens
+from source_index import SourceIndex
 import py.ply.yacc as yacc  # type: ignore
 
 precedence = (
@@ -38,7 +44,7 @@ def p_error(p):
     if p is None:
         raise SyntaxError("Syntax error at EOF.")
     else:
-        raise SyntaxError(f"Error on line {p.lineno}: Syntax error at {p.value[0]}.")
+        raise SyntaxError(f"Error on line {p.lexer.source.line(p.lexpos)}: Syntax error at {p.value[0]}.")
 
 
 def p_empty(p):
@@ -51,14 +57,14 @@ def p_expr_number(p):
     """expr : NUM"""
     num = int(p[1])
     if not -2**31 <= num <= 2**31 - 1:
-        raise ValueError(f"Number {num} on line {p.lexer.lineno} is out of range.")
-    p[0] = ast_types.ExpressionInt(value=num, lineno=p.lexer.lineno)
+        raise ValueError(f"Number {num} on line {p.lexer.source.line(p.lexpos(1))} is out of range.")
+    p[0] = ast_types.ExpressionInt(value=num, pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_expr_bool(p):
     """expr : TRUE
             | FALSE"""
-    p[0] = ast_types.ExpressionBool(value=(p[1] == 'true'), lineno=p.lexer.lineno)
+    p[0] = ast_types.ExpressionBool(value=(p[1] == 'true'), pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_expr_brackets(p):
@@ -70,7 +76,7 @@ def p_expr_uniop(p):
     """expr : MINUS expr %prec UMINUS
             | BINNEG expr
             | NOT expr"""
-    p[0] = ast_types.ExpressionUniOp(op=uniOps[p[1]], argument=p[2], lineno=p.lexer.lineno)
+    p[0] = ast_types.ExpressionUniOp(op=uniOps[p[1]], argument=p[2], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_expr_binop(p):
@@ -92,7 +98,7 @@ def p_expr_binop(p):
             | expr GT expr
             | expr LTE expr
             | expr GTE expr"""
-    p[0] = ast_types.ExpressionBinOp(op=binOps[p[2]], left=p[1], right=p[3], lineno=p.lexer.lineno)
+    p[0] = ast_types.ExpressionBinOp(op=binOps[p[2]], left=p[1], right=p[3], pos=p.lexpos(2), source=p.lexer.source)
 
 
 def p_other_inline_param(p):
@@ -102,7 +108,7 @@ def p_other_inline_param(p):
         p[0] = []
     else:
         p[0] = p[1]
-        p[0].append((ast_types.ExpressionVar(symbol=p[3], lineno = p.lexer.lineno), p[5]))
+        p[0].append((ast_types.ExpressionVar(symbol=p[3], pos=p.lexpos(3), source=p.lexer.source), p[5]))
 
 
 def p_inline_param_block(p):
@@ -116,7 +122,7 @@ def p_inline_param_block(p):
 
 def p_exprstar(p):
     """expr : IDENT LPAREN inline_param_block RPAREN"""
-    p[0] = ast_types.ExpressionCall(target=p[1], args=p[3], lineno=p.lexer.lineno)
+    p[0] = ast_types.ExpressionCall(target=p[1], args=p[3], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_assignable(p):
@@ -126,17 +132,19 @@ def p_assignable(p):
                     | expr POINT IDENT
                     | expr ARROW IDENT"""
     if len(p) == 2:
-        p[0] = ast_types.ExpressionVar(symbol=p[1], lineno=p.lexer.lineno)
+        p[0] = ast_types.ExpressionVar(symbol=p[1], pos=p.lexpos(1), source=p.lexer.source)
     elif p[1] == '*':
-        p[0] = ast_types.ExpressionDeref(obj=p[2], lineno=p.lexer.lineno)
+        p[0] = ast_types.ExpressionDeref(obj=p[2], pos=p.lexpos(1), source=p.lexer.source)
     elif p[2] == '[':
-        p[0] = ast_types.ExpressionAccessIndex(obj=p[1], index=p[3], lineno=p.lexer.lineno)
+        p[0] = ast_types.ExpressionAccessIndex(obj=p[1], index=p[3], pos=p.lexpos(2), source=p.lexer.source)
     elif p[2] == '.':
-        p[0] = ast_types.ExpressionAccessPoint(obj=p[1], index=ast_types.ExpressionVar(symbol=p[3], lineno=p.lexer.lineno), lineno=p.lexer.lineno)
+        field = ast_types.ExpressionVar(symbol=p[3], pos=p.lexpos(3), source=p.lexer.source)
+        p[0] = ast_types.ExpressionAccessPoint(obj=p[1], index=field, pos=p.lexpos(2), source=p.lexer.source)
     elif p[2] == '->':
-        p[0] = ast_types.ExpressionAccessArrow(obj=p[1], index=ast_types.ExpressionVar(symbol=p[3], lineno=p.lexer.lineno), lineno=p.lexer.lineno)
+        field = ast_types.ExpressionVar(symbol=p[3], pos=p.lexpos(3), source=p.lexer.source)
+        p[0] = ast_types.ExpressionAccessArrow(obj=p[1], index=field, pos=p.lexpos(2), source=p.lexer.source)
     else:
-        raise NotImplementedError(f"Unknown assignable expression {p} in line {p.lexer.lineno}")
+        raise NotImplementedError(f"Unknown assignable expression {p} in line {p.lexer.source.line(p.lexpos(2))}")
 
 def p_expr_assignable(p):
     """expr : assignable
@@ -144,7 +152,7 @@ def p_expr_assignable(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = ast_types.ExpressionAddress(obj=p[2], lineno=p.lexer.lineno)
+        p[0] = ast_types.ExpressionAddress(obj=p[2], pos=p.lexpos(1), source=p.lexer.source)
 
 def p_expr_null(p):
     """expr : NULL"""
@@ -165,11 +173,11 @@ def p_ty(p):
     elif p[1] == "void":
         p[0] = ast_types.BXTypesVoid()
     elif p[1] == "struct":
-        p[0] = ast_types.BXTypesStruct(fields=[p[3]] + p[4])
+        p[0] = ast_types.BXTypesStruct(fields=[p[3], *reversed(p[4])])
     elif isinstance(p[1], ast_types.BXTypes):
         if len(p) == 3:
             p[0] = ast_types.BXTypesPointer(ty=p[1])
-        elif len(p) == 4:
+        elif len(p) == 5:
             p[0] = ast_types.BXTypesListType(length=p[3], ty=p[1])
     else:
         raise ValueError("Unknown type.")
@@ -177,25 +185,25 @@ def p_ty(p):
 
 def p_stmt_vardecl(p):
     """stmt_vardecl : VARDECL inline_param_block COLON ty SEMICOLON"""
-    p[0] = ast_types.StatementVarDecl(vars=[var[0] for var in p[2]], rvalues=[value[1] for value in p[2]], typehint=p[4], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementVarDecl(vars=[var[0] for var in p[2]], rvalues=[value[1] for value in p[2]], typehint=p[4], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_stmt_tydecl(p):
     """stmt_tydecl : TYPE expr EQUALS ty SEMICOLON"""
     if not isinstance(p[2], ast_types.ExpressionVar):
-        raise TypeError(f"Cannot assign type to expression {p[2]} in line {p.lineno}.")
+        raise TypeError(f"Cannot assign type to expression {p[2]} in line {p.lexer.source.line(p.lexpos(1))}.")
     else:
-        p[0] = ast_types.StatementTyDecl(var=p[2], ty=p[4], lineno=p.lexer.lineno)
+        p[0] = ast_types.StatementTyDecl(var=p[2], ty=p[4], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_stmt_eval(p):
     """stmt_eval : expr SEMICOLON"""
-    p[0] = ast_types.StatementEval(call=p[1], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementEval(call=p[1], pos=getattr(p[1], "pos", p.lexpos(2)), source=p.lexer.source)
 
 
 def p_ifelse(p):
     """ifelse : IF LPAREN expr RPAREN block optelse"""
-    p[0] = ast_types.StatementIfElse(condition=p[3], body=p[5], optelse=p[6], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementIfElse(condition=p[3], body=p[5], optelse=p[6], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_optelse(p):
@@ -207,38 +215,39 @@ def p_optelse(p):
     elif isinstance(p[2], ast_types.StatementBlock):
         p[0] = p[2]
     else:
-        p[0] = ast_types.StatementBlock(statements=[p[2]], lineno=p.lexer.lineno)
+        p[0] = ast_types.StatementBlock(statements=[p[2]], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_while(p):
     """while : WHILE LPAREN expr RPAREN block"""
-    p[0] = ast_types.StatementWhile(condition=p[3], body=p[5], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementWhile(condition=p[3], body=p[5], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_jump(p):
     """jump : BREAK SEMICOLON
             | CONTINUE SEMICOLON"""
-    p[0] = ast_types.StatementJump(jump=p[1], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementJump(jump=p[1], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_return(p):
     """return : RETURN expr SEMICOLON
               | RETURN SEMICOLON"""
     if len(p) == 4:
-        p[0] = ast_types.StatementReturn(return_expr=p[2], lineno=p.lexer.lineno)
+        p[0] = ast_types.StatementReturn(return_expr=p[2], pos=p.lexpos(1), source=p.lexer.source)
     else:
-        p[0] = ast_types.StatementReturn(lineno=p.lexer.lineno)
+        p[0] = ast_types.StatementReturn(pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_block(p):
     """block : LCPAREN stmtstar RCPAREN"""
-    p[0] = ast_types.StatementBlock(statements=p[2], lineno=p.lexer.lineno)
+    p[0] = ast_types.StatementBlock(statements=p[2], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_stmt_assign(p):
     """stmt_assign : IDENT EQUALS expr SEMICOLON"""
     p[0] = ast_types.StatementAssign(lvalue=ast_types.LValueVar(
-        symbol=p[1], lineno=p.lexer.lineno), rvalue=p[3], lineno=p.lexer.lineno)
+        symbol=p[1], pos=p.lexpos(1), source=p.lexer.source),
+        rvalue=p[3], pos=p.lexpos(1), source=p.lexer.source)
 
 
 def p_stmt(p):
@@ -282,12 +291,12 @@ def p_other_param(p):
     if len(p) == 2:
         p[0] = []
     else:
-        p[0] = [ast_types.Param(symbol=p[2], lineno=p.lexer.lineno)] + p[3]
+        p[0] = [ast_types.Param(symbol=p[2], pos=p.lexpos(2), source=p.lexer.source)] + p[3]
 
 
 def p_param(p):
     """param : IDENT other_param COLON ty """
-    untyped_params = [ast_types.Param(symbol=p[1], lineno=p.lexer.lineno)] + p[2]
+    untyped_params = [ast_types.Param(symbol=p[1], pos=p.lexpos(1), source=p.lexer.source)] + p[2]
     for param in untyped_params:
         param.ty = p[4]
     p[0] = untyped_params
@@ -313,7 +322,7 @@ def p_param_block(p):
 
 def p_procedure(p):
     """procedure : DEF IDENT LPAREN param_block RPAREN proc_ty block"""
-    p[0] = ast_types.Procedure(name=p[2], params=p[4], return_ty=p[6], block=p[7], lineno=p.lexer.lineno)
+    p[0] = ast_types.Procedure(name=p[2], params=p[4], return_ty=p[6], block=p[7], pos=p.lexpos(2), source=p.lexer.source)
 
 
 def p_decl(p):
@@ -335,7 +344,7 @@ def p_declstar(p):
 def p_structfield(p):
     """structfield : expr COLON ty"""
     if not isinstance(p[1], ast_types.ExpressionVar):
-        raise TypeError(f"Name of a struct field cannot be expression {p[1]} in line {p.lineno}")
+        raise TypeError(f"Name of a struct field cannot be expression {p[1]} in line {p[1].lineno}")
     else:
         p[0] = ast_types.StructField(name=p[1].symbol, ty=p[3])
         
@@ -343,12 +352,13 @@ def p_structfield(p):
 def p_structfieldstar(p):
     """structfieldstar : empty
                  | COMMA structfield structfieldstar"""
+    # built last field first, appending being cheaper than prepending; p_ty puts it back in order
     if len(p) == 2:
         p[0] = []
     else:
         p[0] = p[3]
         p[0].append(p[2])
-    
+
 
 
 def p_program(p):
@@ -364,14 +374,71 @@ def p_program(p):
         else:
             raise ValueError("Unknown declaration type.")
 
-    global_block = ast_types.StatementBlock(statements=global_decl, lineno=p.lexer.lineno)
+    global_block = ast_types.StatementBlock(statements=global_decl, pos=0, source=p.lexer.source)
     p[0] = ast_types.Program(procedures=procedures,
-                             global_block=global_block, lineno=p.lexer.lineno)
+                             global_block=global_block, pos=0, source=p.lexer.source)
+
+
+def grammar_hash() -> str:
+    """Hash of everything the LALR tables depend on: the rule docstrings, precedence and tokens."""
+    rules = sorted((f for name, f in globals().items() if name.startswith("p_") and callable(f)),
+                   key=lambda f: f.__code__.co_firstlineno)
+    h = hashlib.sha256()
+    h.update(getattr(yacc, "__tabversion__", "").encode())
+    h.update(repr(precedence).encode())
+    h.update(repr(tokens).encode())
+    for rule in rules:
+        h.update(rule.__name__.encode())
+        h.update((rule.__doc__ or "").encode())
+    return h.hexdigest()[:32]
 
 
 def create_parser():
-    parser = yacc.yacc(start='program')
+    """Builds the parser, loading the LALR tables from the per-user cache when they are there.
+
+    Tables are built into a temporary file and renamed into place, so concurrent
+    builds never see a half-written table. Without a writable cache directory
+    (a read-only home, a sandbox) they are built in memory and not kept."""
+    try:
+        cache_dir = bxcache.user_cache_dir()
+    except OSError:
+        return yacc.yacc(start='program', write_tables=False, debug=False)
+    table = cache_dir / f"parsetab-{grammar_hash()}.pickle"
+    if table.exists():
+        try:
+            return yacc.yacc(start='program', picklefile=str(table), write_tables=False, debug=False)
+        except Exception:
+            pass  # unreadable table, rebuild it below
+    if not os.access(cache_dir, os.W_OK):
+        return yacc.yacc(start='program', write_tables=False, debug=False)
+    # PLY treats a missing picklefile as "no tables", so the temporary name must not exist yet
+    tmp = cache_dir / f".{table.name}.{os.getpid()}.tmp"
+    try:
+        parser = yacc.yacc(start='program', picklefile=str(tmp), debug=False)
+        if tmp.exists() and tmp.stat().st_size > 0:
+            tmp.replace(table)
+    except OSError:
+        parser = yacc.yacc(start='program', write_tables=False, debug=False)
+    finally:
+        with contextlib.suppress(OSError):
+            tmp.unlink(missing_ok=True)
     return parser
 
 
-create_parser()
+_parser = None
+
+
+def get_parser():
+    # built on the first parse rather than at import time
+    global _parser
+    if _parser is None:
+        _parser = create_parser()
+    return _parser
+
+
+def parse(source: str, lexer=None, name: str = "<input>") -> ast_types.Program:
+    if lexer is None:
+        lexer = bxscanner.create_lexer()
+    # built once per file; nodes only keep offsets into it
+    lexer.source = SourceIndex(source, name)
+    return get_parser().parse(source, lexer=lexer)
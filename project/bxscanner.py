@@ -1,5 +1,6 @@
 # type: ignore
 import py.ply.lex as lex
+from source_index import SourceIndex
 
 
 reserved = {"def": "DEF", "var": "VARDECL", "int": "INT", "bool": "BOOL", "true": "TRUE", "false": "FALSE",
@@ -10,7 +11,6 @@ tokens = ('PLUS', 'MINUS', 'STAR', 'SLASH', 'PERCENT', 'AND', 'OR', 'XOR', 'LBIT
           'NOT', 'LT', 'GT', 'LTE', 'GTE', 'EQ', 'NEQ', 'BINAND', 'BINOR', 'LSPAREN', 'RSPAREN', 'POINT', 'ARROW'
           ) + tuple(reserved.values())
 
-t_INT = r"int"
 t_PLUS = r"\+"
 t_MINUS = r"-"
 t_SEMICOLON = r";"
@@ -34,8 +34,6 @@ t_COMMA = r","
 t_SLASH = r"/"
 t_STAR = r"\*"
 t_BINNEG = r"~"
-t_DEF = r"def"
-t_VARDECL = r"var"
 t_NOT = r"!"
 t_LT = r"<"
 t_GT = r">"
@@ -43,15 +41,6 @@ t_LTE = r"<="
 t_GTE = r">="
 t_EQ = r"=="
 t_NEQ = r"!="
-t_BOOL = r"bool"
-t_TRUE = r"true"
-t_FALSE = r"false"
-t_IF = r"if"
-t_ELSE = r"else"
-t_WHILE = r"while"
-t_BREAK = r"break"
-t_CONTINUE = r"continue"
-t_RETURN = r"return"
 t_POINT = r"\."
 t_ARROW = r"->"
 
@@ -73,18 +62,17 @@ def t_IDENT(t):
 
 
 def t_error(t):
-    line = t.lexer.lexdata.splitlines()[t.lexer.lineno - 1]
-    underline = " " * (t.lexpos - line.rfind("\t", 0, t.lexpos)) + "^"
-    print(f"Illegal character {t.value[0]} at line {t.lexer.lineno}: \n {line}\n {underline}")
+    source = getattr(t.lexer, "source", None) or SourceIndex(t.lexer.lexdata)
+    lineno, column = source.location(t.lexpos)
+    line = source.line_text(lineno)
+    underline = "".join(c if c == "\t" else " " for c in line[:column - 1]) + "^"
+    print(f"Illegal character {t.value[0]} at line {lineno}: \n {line}\n {underline}")
     raise SyntaxError(f"Illegal character {t.value[0]}.")  # skip one character
 
 
-t_ignore = " \t\f\v"
+# positions are resolved through the lexer's SourceIndex, so newlines are not counted here
+t_ignore = " \t\f\v\n"
 
 
-def t_newline(t):
-    r"\n"
-    t.lexer.lineno += 1
-
 def create_lexer() -> lex.Lexer:
     return lex.lex()
@@ -0,0 +1,114 @@
+"""A resident BX compiler that answers bxclient over a Unix socket.
+
+Starting a compiler costs more than compiling a small file: importing bxparser
+and loading its tables, and lex.lex() reflecting over bxscanner for every new
+lexer. The server pays for these once. It keeps the parser and a template lexer,
+cloned for each request, and compiles requests one at a time. It records how
+long each one took.
+
+A request is one JSON object, sent before the client shuts down its side of
+the connection. The reply is one JSON object too.
+
+    {"op": "compile", "source": ..., "name": ..., "output": ..., "optimize": true}
+        -> {"ok": true, "procs": 3} or {"ok": false, "error": "Error on line 2: ..."}
+    {"op": "stats"}     -> {"ok": true, "requests": 120, "p50": ..., "p90": ..., "p99": ..., "max": ...} (ms)
+    {"op": "shutdown"}  -> {"ok": true}, then the server exits
+
+    python bxserver.py [--socket PATH]
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import bx2tac
+import bxclient
+import bxparser
+import bxscanner
+import tac
+import tacbin
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """p50, p90, p99 and max of latencies in seconds, in milliseconds."""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    result = {f"p{q}": ordered[min(len(ordered) - 1, len(ordered) * q // 100)] * 1000 for q in (50, 90, 99)}
+    result["max"] = ordered[-1] * 1000
+    return result
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        start = time.perf_counter()
+        op = None
+        try:
+            request = json.loads(self.rfile.read())
+            if not isinstance(request, dict):
+                raise ValueError(f"A request is a JSON object, not {type(request).__name__}.")
+            op = request.get("op", "compile")
+            reply = self.server.dispatch(request)
+        except Exception as error:  # a failed compile or a malformed request, reported to the client
+            reply = {"ok": False, "error": str(error)}
+        self.wfile.write(json.dumps(reply).encode())
+        if op == "compile":
+            self.server.latencies.append(time.perf_counter() - start)
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    def __init__(self, path: Path):
+        self.lexer = bxscanner.create_lexer()
+        bxparser.get_parser()
+        self.latencies: List[float] = []
+        self.done = False
+        super().__init__(str(path), Handler)
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op", "compile")
+        if op == "compile":
+            decls = bx2tac.compile_source(request["source"], request.get("name", "<input>"),
+                                          request.get("optimize", True), lexer=self.lexer.clone())
+            tacbin.save(decls, request["output"])
+            return {"ok": True, "procs": sum(isinstance(decl, tac.Proc) for decl in decls)}
+        if op == "stats":
+            return {"ok": True, "requests": len(self.latencies), **percentiles(self.latencies)}
+        if op == "shutdown":
+            self.done = True
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown request {op}."}
+
+    def serve(self):
+        while not self.done:
+            self.handle_request()
+
+
+def serve(path: Path):
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()  # left behind by a server that died
+        else:
+            raise SystemExit(f"A server is already listening on {path}.")
+        finally:
+            probe.close()
+    with CompileServer(path) as server:
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+        stats = percentiles(server.latencies)
+        print(f"{len(server.latencies)} requests" + "".join(f", {name} {ms:.2f} ms" for name, ms in stats.items()),
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    serve(Path(sys.argv[sys.argv.index("--socket") + 1]) if "--socket" in sys.argv else bxclient.default_socket())
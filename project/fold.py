@@ -0,0 +1,176 @@
+"""Constant folding and algebraic simplification of expressions.
+
+Runs after type checking: operators over int and bool literals are evaluated
+with the machine's semantics (64-bit wrapping, division truncating towards
+zero), and identities such as x*1, x+0, x&0, x^x and !!b are applied. Division
+and modulus by zero are left for the program to fail on at run time, and an
+operand is only dropped when it cannot have side effects (contains no call).
+"""
+from typing import Callable, Dict, Optional
+
+import ast_types
+import ast_visitor
+from tac import wrap
+
+Int, Bool = ast_types.ExpressionInt, ast_types.ExpressionBool
+
+
+def _div(x: int, y: int) -> int:
+    q = abs(x) // abs(y)
+    return wrap(q if (x < 0) == (y < 0) else -q)
+
+
+def _mod(x: int, y: int) -> int:
+    m = abs(x) % abs(y)
+    return -m if x < 0 else m
+
+
+INT_OPS: Dict[str, Callable[[int, int], int]] = {
+    "addition": lambda x, y: wrap(x + y),
+    "substraction": lambda x, y: wrap(x - y),
+    "multiplication": lambda x, y: wrap(x * y),
+    "division": _div,
+    "modulus": _mod,
+    "bitwise-and": lambda x, y: x & y,
+    "bitwise-or": lambda x, y: x | y,
+    "bitwise-xor": lambda x, y: x ^ y,
+    "bitwise-shift-left": lambda x, y: wrap(x << (y & 63)),
+    "bitwise-shift-right": lambda x, y: x >> (y & 63),
+}
+COMPARISONS: Dict[str, Callable[[int, int], bool]] = {
+    "is-equal": lambda x, y: x == y,
+    "is-not-equal": lambda x, y: x != y,
+    "is-less-than": lambda x, y: x < y,
+    "is-less-than-or-equal": lambda x, y: x <= y,
+    "is-greater-than": lambda x, y: x > y,
+    "is-greater-than-or-equal": lambda x, y: x >= y,
+}
+UNI_OPS: Dict[str, Callable] = {
+    "opposite": lambda x: wrap(-x),
+    "bitwise-negation": lambda x: ~x,
+    "logical-negation": lambda x: not x,
+}
+# x op e == x for every x
+RIGHT_IDENTITY = {"addition": 0, "substraction": 0, "multiplication": 1, "division": 1, "bitwise-or": 0,
+                  "bitwise-xor": 0, "bitwise-shift-left": 0, "bitwise-shift-right": 0}
+LEFT_IDENTITY = {"addition": 0, "multiplication": 1, "bitwise-or": 0, "bitwise-xor": 0}
+# x op z == z for every x
+RIGHT_ZERO = {"multiplication": 0, "bitwise-and": 0, "modulus": 1}
+LEFT_ZERO = {"multiplication": 0, "bitwise-and": 0}
+# x op x
+SELF_INVERSE = {"substraction": 0, "bitwise-xor": 0}
+
+
+def pure(node: ast_types.Expression) -> bool:
+    """Whether evaluating node can have no side effect (it calls nothing)."""
+    return not any(isinstance(sub, ast_types.ExpressionCall) for sub in ast_visitor.walk(node))
+
+
+def same(a: ast_types.Expression, b: ast_types.Expression) -> bool:
+    """Structural equality, ignoring positions."""
+    pairs = [(a, b)]
+    while pairs:
+        a, b = pairs.pop()
+        if type(a) is not type(b):
+            return False
+        if isinstance(a, ast_types.ExpressionVar):
+            if a.symbol != b.symbol:
+                return False
+        elif isinstance(a, (Int, Bool)):
+            if a.value != b.value:
+                return False
+        elif isinstance(a, (ast_types.ExpressionUniOp, ast_types.ExpressionBinOp)):
+            if a.op != b.op:
+                return False
+            pairs += zip(ast_visitor.children(a), ast_visitor.children(b))
+        else:
+            return False
+    return True
+
+
+class Folder(ast_visitor.Visitor):
+    """Replaces foldable operator nodes, bottom up; folded counts the replacements."""
+
+    def __init__(self):
+        super().__init__()
+        self.folded = 0
+
+    def _int(self, node: ast_types.Expression, value: int) -> Int:
+        self.folded += 1
+        return Int(value=value, pos=node.pos, source=node.source, block=node.block)
+
+    def _bool(self, node: ast_types.Expression, value: bool) -> Bool:
+        self.folded += 1
+        return Bool(value=bool(value), pos=node.pos, source=node.source, block=node.block)
+
+    def _keep(self, operand: ast_types.Expression) -> ast_types.Expression:
+        self.folded += 1
+        return operand
+
+    def post_ExpressionUniOp(self, node: ast_types.ExpressionUniOp) -> Optional[ast_types.Expression]:
+        argument = node.argument
+        if isinstance(argument, Int) and node.op != "logical-negation":
+            return self._int(node, UNI_OPS[node.op](argument.value))
+        if isinstance(argument, Bool) and node.op == "logical-negation":
+            return self._bool(node, not argument.value)
+        if isinstance(argument, ast_types.ExpressionUniOp) and argument.op == node.op:
+            return self._keep(argument.argument)  # --x, ~~x, !!b
+        return None
+
+    def post_ExpressionBinOp(self, node: ast_types.ExpressionBinOp) -> Optional[ast_types.Expression]:
+        op, left, right = node.op, node.left, node.right
+        if isinstance(left, Int) and isinstance(right, Int):
+            if op in INT_OPS:
+                if op in ("division", "modulus") and right.value == 0:
+                    return None
+                return self._int(node, INT_OPS[op](left.value, right.value))
+            if op in COMPARISONS:
+                return self._bool(node, COMPARISONS[op](left.value, right.value))
+        if isinstance(left, Bool) and isinstance(right, Bool):
+            if op == "logical-and":
+                return self._bool(node, left.value and right.value)
+            if op == "logical-or":
+                return self._bool(node, left.value or right.value)
+            if op in ("is-equal", "is-not-equal"):
+                return self._bool(node, COMPARISONS[op](left.value, right.value))
+        if op in ("logical-and", "logical-or"):
+            return self._logical(node)
+
+        if isinstance(right, Int):
+            if RIGHT_IDENTITY.get(op, None) == right.value:
+                return self._keep(left)
+            if RIGHT_ZERO.get(op, None) == right.value and pure(left):
+                return self._int(node, 0)
+        if isinstance(left, Int):
+            if LEFT_IDENTITY.get(op, None) == left.value:
+                return self._keep(right)
+            if LEFT_ZERO.get(op, None) == left.value and pure(right):
+                return self._int(node, 0)
+        if op in SELF_INVERSE and same(left, right) and pure(left):
+            return self._int(node, SELF_INVERSE[op])
+        return None
+
+    def _logical(self, node: ast_types.ExpressionBinOp) -> Optional[ast_types.Expression]:
+        # the right operand is only evaluated when the left one does not decide
+        left, right = node.left, node.right
+        absorbing = node.op == "logical-or"  # true || e, false && e
+        if isinstance(left, Bool):
+            return self._bool(node, absorbing) if left.value == absorbing else self._keep(right)
+        if isinstance(right, Bool):
+            if right.value != absorbing:
+                return self._keep(left)  # e && true, e || false
+            if pure(left):
+                return self._bool(node, absorbing)
+        return None
+
+
+def fold(node):
+    """Folds the expressions under node (any tree) and returns it, or its replacement."""
+    return Folder().visit(node)
+
+
+def fold_program(program: ast_types.Program) -> int:
+    """Folds every expression of a program in place; returns how many nodes were folded."""
+    folder = Folder()
+    folder.visit(program)
+    return folder.folded
@@ -0,0 +1,98 @@
+"""Memory layout of BX types: size, alignment, and the offset of every struct field.
+
+Types are interned (see ast_types.BXTypes), so a layout is computed once per
+distinct type and cached by the type itself. Nested structs and arrays reuse
+the layouts of their parts. int, bool and pointers take 8 bytes, aligned on 8.
+Arrays are their elements back to back. Struct fields are laid out in
+declaration order, each at the next multiple of its alignment, and the struct
+is padded to a multiple of its own alignment, as in C.
+
+Code generation computes an address from these. For a field, add the constant
+field(ty, name).offset to the address of the struct. For an array, add index
+times stride(ty) to the address of the array. offset() folds a whole path of
+field names and constant indices into one constant.
+"""
+from dataclasses import dataclass, field as dataclass_field
+from typing import Dict, Iterable, Tuple, Union
+
+import ast_types
+
+WORD = 8
+
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    offset: int
+    ty: ast_types.BXTypes
+
+
+@dataclass(frozen=True, slots=True)
+class Layout:
+    size: int
+    align: int
+    fields: Dict[str, Slot] = dataclass_field(default_factory=dict)  # of structs, by name
+
+
+_layouts: Dict[ast_types.BXTypes, Layout] = {}
+
+
+def layout(ty: ast_types.BXTypes) -> Layout:
+    found = _layouts.get(ty)
+    if found is not None:
+        return found
+    if isinstance(ty, (ast_types.BXTypesInt, ast_types.BXTypesBool, ast_types.BXTypesPointer)):
+        result = Layout(WORD, WORD)
+    elif isinstance(ty, ast_types.BXTypesListType):
+        element = layout(ty.ty)
+        result = Layout(element.size * ty.length, element.align)
+    elif isinstance(ty, ast_types.BXTypesStruct):
+        fields: Dict[str, Slot] = {}
+        size, align = 0, 1
+        for f in ty.fields:
+            if f.name in fields:
+                raise TypeError(f"Field {f.name} appears twice in {ty}.")
+            part = layout(f.ty)
+            size = -(-size // part.align) * part.align
+            fields[f.name] = Slot(size, f.ty)
+            size += part.size
+            align = max(align, part.align)
+        result = Layout(-(-size // align) * align, align, fields)
+    else:
+        raise TypeError(f"Values of type {ty} have no layout.")
+    _layouts[ty] = result
+    return result
+
+
+def sizeof(ty: ast_types.BXTypes) -> int:
+    return layout(ty).size
+
+
+def field(ty: ast_types.BXTypes, name: str) -> Slot:
+    """Offset and type of a field of a struct type."""
+    try:
+        return layout(ty).fields[name]
+    except KeyError:
+        raise TypeError(f"Type {ty} has no field {name}.") from None
+
+
+def stride(ty: ast_types.BXTypes) -> int:
+    """Distance between consecutive elements of an array, or of the values a pointer points to."""
+    if isinstance(ty, (ast_types.BXTypesListType, ast_types.BXTypesPointer)):
+        return layout(ty.ty).size
+    raise TypeError(f"Type {ty} cannot be indexed.")
+
+
+def offset(ty: ast_types.BXTypes, path: Iterable[Union[str, int]]) -> Tuple[int, ast_types.BXTypes]:
+    """Constant offset and type of ty.a[2].b and the like, given as ("a", 2, "b")."""
+    total = 0
+    for step in path:
+        if isinstance(step, str):
+            slot = field(ty, step)
+            total, ty = total + slot.offset, slot.ty
+        elif isinstance(ty, ast_types.BXTypesListType):
+            if not 0 <= step < ty.length:
+                raise IndexError(f"Index {step} is out of bounds for {ty}.")
+            total, ty = total + step * stride(ty), ty.ty
+        else:
+            raise TypeError(f"Type {ty} cannot be indexed.")
+    return total, ty
@@ -0,0 +1,139 @@
+"""Timing and memory of the compiler passes, for --time-passes.
+
+Passes.call runs one pass and records its wall and CPU time and, with
+trace_memory, the peak of the memory it allocated as tracemalloc sees it. It
+also records counts taken from the result after the clock stops: tokens, AST
+nodes by class, TAC instructions. Hooks run around every pass, e.g. to attach
+a profiler:
+
+    profiler = cProfile.Profile()
+    passes.add_hooks(pre=lambda name: profiler.enable(), post=lambda record: profiler.disable())
+
+tracemalloc makes every allocation several times slower, so times taken with
+trace_memory are inflated, the allocation-heavy passes the most.
+"""
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import ast_visitor
+import bxscanner
+import tac
+from source_index import SourceIndex
+
+
+@dataclass(slots=True)
+class PassRecord:
+    name: str
+    wall: float = 0.0  # seconds
+    cpu: float = 0.0
+    peak: Optional[int] = None  # bytes allocated at the peak of the pass, above what was live before it
+    counts: Dict[str, int] = field(default_factory=dict)
+    nodes: Dict[str, int] = field(default_factory=dict)  # AST nodes by class, after the passes that build trees
+
+
+class Passes:
+    def __init__(self, trace_memory: bool = False):
+        self.records: List[PassRecord] = []
+        self.trace_memory = trace_memory
+        self.pre_hooks: List[Callable[[str], None]] = []
+        self.post_hooks: List[Callable[[PassRecord], None]] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_hooks(self, pre: Optional[Callable[[str], None]] = None,
+                  post: Optional[Callable[[PassRecord], None]] = None):
+        if pre is not None:
+            self.pre_hooks.append(pre)
+        if post is not None:
+            self.post_hooks.append(post)
+
+    def call(self, name: str, fn: Callable, /, *args, count: Optional[Callable] = None, **kwargs):
+        """fn(*args, **kwargs), recorded as the pass name. count(result) gives the counts to record,
+        as a dict of ints plus, optionally, "nodes" mapping AST classes to counts."""
+        record = PassRecord(name)
+        for hook in self.pre_hooks:
+            hook(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = fn(*args, **kwargs)
+        record.wall, record.cpu = time.perf_counter() - wall, time.process_time() - cpu
+        if self.trace_memory:
+            record.peak = tracemalloc.get_traced_memory()[1] - before
+        if count is not None:
+            counts = count(result)
+            record.nodes = counts.pop("nodes", {})
+            record.counts = counts
+        self.records.append(record)
+        for hook in self.post_hooks:
+            hook(record)
+        return result
+
+    def to_json(self) -> List[dict]:
+        return [asdict(record) for record in self.records]
+
+    def table(self, classes: int = 10) -> str:
+        """The records as a table, then the most frequent AST node classes."""
+        lines = [f"{'pass':<10} {'wall ms':>9} {'cpu ms':>9} {'peak KiB':>9}  counts"]
+        for r in self.records:
+            peak = "" if r.peak is None else f"{r.peak / 1024:9.1f}"
+            counts = ", ".join(f"{name} {value}" for name, value in r.counts.items())
+            lines.append(f"{r.name:<10} {r.wall * 1e3:9.2f} {r.cpu * 1e3:9.2f} {peak:>9}  {counts}")
+        wall, cpu = sum(r.wall for r in self.records), sum(r.cpu for r in self.records)
+        lines.append(f"{'total':<10} {wall * 1e3:9.2f} {cpu * 1e3:9.2f}")
+        for r in self.records:
+            if r.nodes:
+                lines.append(f"AST nodes after {r.name}:")
+                lines += [f"  {count:>9}  {name}" for name, count in Counter(r.nodes).most_common(classes)]
+                if len(r.nodes) > classes:
+                    lines.append(f"  {sum(sorted(r.nodes.values())[:-classes]):>9}  ({len(r.nodes) - classes} more classes)")
+        return "\n".join(lines)
+
+
+class Untimed:
+    """Stands in for Passes when nothing is recorded."""
+
+    def call(self, name: str, fn: Callable, /, *args, count: Optional[Callable] = None, **kwargs):
+        return fn(*args, **kwargs)
+
+
+UNTIMED = Untimed()
+
+
+class Replay:
+    """Hands the parser tokens scanned beforehand, so that parsing is timed without scanning."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def input(self, data: str):
+        self.token = partial(next, iter(self.tokens), None)
+
+
+def scan(source: str, lexer=None, name: str = "<input>") -> list:
+    """All the tokens of a source, for Replay."""
+    if lexer is None:
+        lexer = bxscanner.create_lexer()
+    lexer.input(source)
+    # tokens made by rule functions point back to this lexer, which parse errors read positions from
+    lexer.source = SourceIndex(source, name)
+    return list(iter(lexer.token, None))
+
+
+def count_tokens(tokens: list) -> Dict[str, int]:
+    return {"tokens": len(tokens)}
+
+
+def count_nodes(root) -> dict:
+    nodes = Counter(type(node).__name__ for node in ast_visitor.walk(root))
+    return {"ast nodes": sum(nodes.values()), "nodes": dict(nodes)}
+
+
+def count_tac(decls) -> Dict[str, int]:
+    procs = [decl for decl in decls if isinstance(decl, tac.Proc)]
+    return {"procs": len(procs), "instructions": sum(len(proc) for proc in procs)}
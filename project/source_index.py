@@ -0,0 +1,65 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Tuple
+
+
+class SourceIndex:
+    """Maps offsets in one source file to lines and columns.
+
+    AST nodes and tokens only keep their offset; the line start table is built on
+    the first lookup and every lookup after that is a bisection."""
+
+    def __init__(self, text: str, name: str = "<input>"):
+        self.text = text
+        self.name = name
+        self._line_starts: Optional[array] = None
+
+    @property
+    def line_starts(self) -> array:
+        if self._line_starts is None:
+            starts = array("q", [0])
+            starts.extend(accumulate(len(line) + 1 for line in self.text.split("\n")[:-1]))
+            self._line_starts = starts
+        return self._line_starts
+
+    def line(self, pos: int) -> int:
+        return bisect_right(self.line_starts, pos)
+
+    def column(self, pos: int) -> int:
+        return pos - self.line_starts[self.line(pos) - 1] + 1
+
+    def location(self, pos: int) -> Tuple[int, int]:
+        line = self.line(pos)
+        return line, pos - self.line_starts[line - 1] + 1
+
+    def line_text(self, line: int) -> str:
+        starts = self.line_starts
+        end = starts[line] - 1 if line < len(starts) else len(self.text)
+        return self.text[starts[line - 1]:end]
+
+    def __repr__(self) -> str:
+        return f"SourceIndex({self.name})"
+
+
+class LineNumbers(SourceIndex):
+    """The source of nodes built from a line number alone (lineno=3): their offset is the
+    line, and the text and columns are unknown."""
+
+    def __init__(self):
+        super().__init__("", "<lines>")
+
+    def line(self, pos: int) -> int:
+        return pos
+
+    def column(self, pos: int) -> int:
+        return 0
+
+    def location(self, pos: int) -> Tuple[int, int]:
+        return pos, 0
+
+    def line_text(self, line: int) -> str:
+        return ""
+
+
+LINE_NUMBERS = LineNumbers()
@@ -0,0 +1,229 @@
+"""Three-address code.
+
+Opcodes are small ints, temporaries are int ids and labels are int ids; the
+JSON form (opcodes by name, "%3" temporaries, "%.L2" labels) only exists at
+serialization time.
+
+An instruction has a destination and up to two operands; what the operands
+mean depends on the opcode:
+
+    const   dst <- a                      a is the literal value
+    copy    dst <- a
+    add ... dst <- a op b                 binary arithmetic, bitwise and shifts
+    eq ...  dst <- 1 if a cmp b else 0    comparisons of the two values, which cannot overflow
+    neg/not dst <- op a
+    print   print a
+    label   a is the label
+    jmp     jump to label a
+    jz ...  conditional jumps on temporary a to label b
+    param   a is the position (from 1), b the temporary
+    call    dst <- call a (the name of a procedure) with b parameters; dst may be None
+    ret     return a, which may be None
+    phi     dst <- the temporary paired with the label of the block control came from,
+            a is a list of (label, temporary) pairs; only in SSA form (tac_ssa)
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+OPCODE_NAMES = (
+    "nop", "const", "copy",
+    "add", "sub", "mul", "div", "mod", "and", "or", "xor", "shl", "shr",
+    "neg", "not",
+    "print", "label", "jmp", "jz", "jnz", "jl", "jle", "jnl", "jnle",
+    "param", "call", "ret", "phi",
+    "eq", "ne", "lt", "le", "gt", "ge",
+)
+OPCODES: Dict[str, int] = {name: code for code, name in enumerate(OPCODE_NAMES)}
+
+NOP, CONST, COPY = 0, 1, 2
+ADD, SUB, MUL, DIV, MOD, AND, OR, XOR, SHL, SHR = range(3, 13)
+NEG, NOT = 13, 14
+PRINT, LABEL, JMP, JZ, JNZ, JL, JLE, JNL, JNLE = range(15, 24)
+PARAM, CALL, RET, PHI = 24, 25, 26, 27
+EQ, NE, LT, LE, GT, GE = range(28, 34)
+
+COMPARISONS = frozenset(range(EQ, GE + 1))
+BINARY = frozenset(range(ADD, SHR + 1)) | COMPARISONS
+UNARY = frozenset((NEG, NOT))
+CONDITIONAL_JUMPS = frozenset(range(JZ, JNLE + 1))
+JUMPS = CONDITIONAL_JUMPS | {JMP}
+
+# operators as the AST names them
+AST_OPERATORS: Dict[str, int] = {
+    "addition": ADD, "subtraction": SUB, "multiplication": MUL, "division": DIV, "modulus": MOD,
+    "bitwise-and": AND, "bitwise-or": OR, "bitwise-xor": XOR,
+    "left-shift": SHL, "right-shift": SHR,
+    "opposite": NEG, "bitwise-negation": NOT,
+}
+
+MIN_INT, MAX_INT = -(1 << 63), (1 << 63) - 1
+
+
+def wrap(value: int) -> int:
+    """value reduced to a signed 64-bit integer, like the machine does."""
+    return ((value - MIN_INT) & 0xFFFFFFFFFFFFFFFF) + MIN_INT
+
+
+# a temporary is an int id, or a name for the globals ("@x") and named temporaries ("%x") read from JSON
+Temp = Union[int, str]
+
+
+@dataclass(slots=True)
+class Instr:
+    op: int
+    dst: Optional[Temp] = None
+    a: Any = None
+    b: Any = None
+
+    def uses(self) -> List[Temp]:
+        """Temporaries read by the instruction."""
+        op = self.op
+        if op in BINARY:
+            return [self.a, self.b]
+        if op == COPY or op in UNARY or op == PRINT or op in CONDITIONAL_JUMPS:
+            return [self.a]
+        if op == PARAM:
+            return [self.b]
+        if op == RET and self.a is not None:
+            return [self.a]
+        if op == PHI:
+            return [temp for _, temp in self.a]
+        return []
+
+    def rename_uses(self, renamed: Dict[Temp, Temp]):
+        """Replaces the temporaries read by the instruction that are keys of renamed."""
+        op = self.op
+        if op in BINARY:
+            self.a, self.b = renamed.get(self.a, self.a), renamed.get(self.b, self.b)
+        elif op == COPY or op in UNARY or op == PRINT or op in CONDITIONAL_JUMPS or op == RET:
+            if self.a is not None:
+                self.a = renamed.get(self.a, self.a)
+        elif op == PARAM:
+            self.b = renamed.get(self.b, self.b)
+        elif op == PHI:
+            self.a = [(label, renamed.get(temp, temp)) for label, temp in self.a]
+
+    def to_json(self) -> dict:
+        return {"opcode": OPCODE_NAMES[self.op], "args": _JSON_ARGS[self.op](self),
+                "result": None if self.dst is None else temp_name(self.dst)}
+
+    @staticmethod
+    def from_json(instr: dict) -> "Instr":
+        op = OPCODES[instr["opcode"]]
+        args = instr["args"]
+        dst = None if instr.get("result") is None else parse_temp(instr["result"])
+        if op == CONST or op == CALL:
+            return Instr(op, dst, *args)
+        if op == LABEL or op == JMP:
+            return Instr(op, dst, parse_label(args[0]))
+        if op in CONDITIONAL_JUMPS:
+            return Instr(op, dst, parse_temp(args[0]), parse_label(args[1]))
+        if op == PARAM:
+            return Instr(op, dst, args[0], parse_temp(args[1]))
+        if op == PHI:
+            return Instr(op, dst, [(parse_label(label), parse_temp(temp)) for label, temp in args])
+        return Instr(op, dst, *(parse_temp(arg) for arg in args))
+
+    def __repr__(self) -> str:
+        js = self.to_json()
+        text = f"{js['opcode']} {', '.join(str(arg) for arg in js['args'])}".rstrip()
+        return text if js["result"] is None else f"{js['result']} = {text}"
+
+
+def temp_name(temp: Temp) -> str:
+    return f"%{temp}" if isinstance(temp, int) else temp
+
+
+def label_name(label: int) -> str:
+    return f"%.L{label}"
+
+
+def parse_temp(name: str) -> Temp:
+    return int(name[1:]) if name[1:].isdigit() else name
+
+
+def parse_label(name: str) -> int:
+    return int(name[3:])
+
+
+def _temps_json(instr: Instr) -> list:
+    a, b = instr.a, instr.b
+    if b is not None:
+        return [f"%{a}" if type(a) is int else a, f"%{b}" if type(b) is int else b]
+    return [f"%{a}" if type(a) is int else a] if a is not None else []
+
+
+# opcode -> JSON args of an instruction
+_JSON_ARGS = [_temps_json] * len(OPCODE_NAMES)
+_JSON_ARGS[NOP] = lambda instr: []
+_JSON_ARGS[CONST] = lambda instr: [instr.a]
+_JSON_ARGS[CALL] = lambda instr: [instr.a, instr.b]
+_JSON_ARGS[LABEL] = _JSON_ARGS[JMP] = lambda instr: [f"%.L{instr.a}"]
+_JSON_ARGS[PARAM] = lambda instr: [instr.a, temp_name(instr.b)]
+_JSON_ARGS[PHI] = lambda instr: [[label_name(label), temp_name(temp)] for label, temp in instr.a]
+for _op in CONDITIONAL_JUMPS:
+    _JSON_ARGS[_op] = lambda instr: [temp_name(instr.a), f"%.L{instr.b}"]
+
+
+@dataclass(slots=True)
+class Proc:
+    """A procedure: its body and the counters its temporaries and labels come from."""
+    name: str
+    params: List[Temp] = field(default_factory=list)
+    body: List[Instr] = field(default_factory=list)
+    temps: int = 0
+    labels: int = 0
+
+    def new_temp(self) -> int:
+        self.temps += 1
+        return self.temps - 1
+
+    def new_label(self) -> int:
+        self.labels += 1
+        return self.labels - 1
+
+    def emit(self, op: int, dst: Optional[Temp] = None, a: Any = None, b: Any = None) -> Optional[Temp]:
+        self.body.append(Instr(op, dst, a, b))
+        return dst
+
+    def __iter__(self) -> Iterator[Instr]:
+        return iter(self.body)
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def to_json(self) -> dict:
+        return {"proc": self.name, "args": [temp_name(param) for param in self.params],
+                "body": [instr.to_json() for instr in self.body]}
+
+    @staticmethod
+    def from_json(proc: dict) -> "Proc":
+        result = Proc(proc["proc"], [parse_temp(arg) for arg in proc.get("args", [])],
+                      [Instr.from_json(instr) for instr in proc["body"]])
+        temps = [temp for instr in result.body for temp in (instr.dst, *instr.uses()) if isinstance(temp, int)]
+        temps += [param for param in result.params if isinstance(param, int)]
+        labels = [instr.a for instr in result.body if instr.op == LABEL]
+        result.temps = max(temps, default=-1) + 1
+        result.labels = max(labels, default=-1) + 1
+        return result
+
+
+@dataclass(slots=True)
+class GlobalVar:
+    name: str
+    init: int = 0
+
+    def to_json(self) -> dict:
+        return {"var": self.name, "init": self.init}
+
+    @staticmethod
+    def from_json(var: dict) -> "GlobalVar":
+        return GlobalVar(var["var"], var["init"])
+
+
+def to_json(decls: List[Union[GlobalVar, Proc]]) -> List[dict]:
+    return [decl.to_json() for decl in decls]
+
+
+def from_json(js_obj: List[dict]) -> List[Union[GlobalVar, Proc]]:
+    return [GlobalVar.from_json(decl) if "var" in decl else Proc.from_json(decl) for decl in js_obj]
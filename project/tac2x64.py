@@ -0,0 +1,378 @@
+"""x86-64 assembly (GNU syntax, System V calling convention) from TAC.
+
+Temporaries live in registers handed out by a linear scan over their live
+intervals (Poletto and Sarkar): intervals are taken in order of start, and
+when no register is free the one that ends last is spilled to the stack.
+Intervals that cross a call only get callee-saved registers, so nothing has to
+be saved around calls. rax, rcx, rdx and r11 are kept as scratch registers.
+With naive=True every temporary gets a stack slot instead.
+
+Globals go in .data, and bx_print_int / bx_print_bool come from bx_runtime.c.
+
+    python tac2x64.py PROGRAM.bx|PROGRAM.json|PROGRAM.tacb [-o PROGRAM.s] [--naive] [--exe PROGRAM]
+                      [--time-passes[=json]] [--trace-memory]
+"""
+import bisect
+import os
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+import tac
+import tac_cfg
+import tacbin
+from tac_cfg import defs, is_local
+
+CALLEE_SAVED = ("%rbx", "%r12", "%r13", "%r14", "%r15")
+CALLER_SAVED = ("%rsi", "%rdi", "%r8", "%r9", "%r10")
+ARGUMENTS = ("%rdi", "%rsi", "%rdx", "%rcx", "%r8", "%r9")
+SCRATCH = "%r11"
+RUNTIME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bx_runtime.c")
+
+ARITHMETIC = {tac.ADD: "addq", tac.SUB: "subq", tac.MUL: "imulq", tac.AND: "andq", tac.OR: "orq",
+              tac.XOR: "xorq"}
+SHIFTS = {tac.SHL: "salq", tac.SHR: "sarq"}
+JCC = {tac.JZ: "je", tac.JNZ: "jne", tac.JL: "jl", tac.JLE: "jle", tac.JNL: "jge", tac.JNLE: "jg"}
+# comparison -> condition code when it holds, and when it does not
+HOLDS = {tac.EQ: "e", tac.NE: "ne", tac.LT: "l", tac.LE: "le", tac.GT: "g", tac.GE: "ge"}
+FAILS = {tac.EQ: "ne", tac.NE: "e", tac.LT: "ge", tac.LE: "g", tac.GT: "le", tac.GE: "l"}
+
+
+class CodegenError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class Interval:
+    temp: tac.Temp
+    start: int
+    end: int
+    crosses_call: bool = False
+
+
+def intervals(proc: tac.Proc) -> List[Interval]:
+    """The live interval of every local temporary, in instruction positions. The parameters start
+    at -1, and the operand of a param instruction is read by the call that follows it."""
+    cfg = tac_cfg.CFG(proc)
+    live_in, live_out = tac_cfg.liveness(cfg)
+    found: Dict[tac.Temp, Interval] = {param: Interval(param, -1, -1) for param in proc.params}
+
+    def touch(temp, position):
+        interval = found.get(temp)
+        if interval is None:
+            found[temp] = Interval(temp, position, position)
+        else:
+            interval.start = min(interval.start, position)
+            interval.end = max(interval.end, position)
+
+    calls = []
+    position = 0
+    for block, entering, leaving in zip(cfg, live_in, live_out):
+        first = position
+        pending = []  # operands of params, read at the next call
+        for instr in block.body:
+            if instr.op == tac.PARAM:
+                pending.append(instr.b)
+            else:
+                for temp in instr.uses():
+                    if is_local(temp):
+                        touch(temp, position)
+                if instr.op in (tac.CALL, tac.PRINT):
+                    calls.append(position)
+                    for temp in pending:
+                        if is_local(temp):
+                            touch(temp, position)
+                    pending.clear()
+            dst = defs(instr)
+            if dst is not None:
+                touch(dst, position)
+            position += 1
+        for temp in entering:
+            touch(temp, first)
+        for temp in leaving:
+            touch(temp, position - 1)
+    for interval in found.values():
+        # a call strictly inside the interval
+        i = bisect.bisect_right(calls, interval.start)
+        interval.crosses_call = i < len(calls) and calls[i] < interval.end
+    return sorted(found.values(), key=lambda interval: interval.start)
+
+
+def linear_scan(proc: tac.Proc) -> Dict[tac.Temp, Optional[str]]:
+    """A register for every local temporary of proc, or None when it is spilled."""
+    assigned: Dict[tac.Temp, Optional[str]] = {}
+    free = list(CALLER_SAVED + CALLEE_SAVED)
+    active: List[Interval] = []  # sorted by end
+    for current in intervals(proc):
+        while active and active[0].end <= current.start:
+            free.append(assigned[active.pop(0).temp])
+        allowed = CALLEE_SAVED if current.crosses_call else CALLER_SAVED + CALLEE_SAVED
+        register = next((reg for reg in free if reg in allowed), None)
+        if register is not None:
+            free.remove(register)
+        else:
+            # spill whichever of the current interval and the active ones holding a usable register ends last
+            victims = [interval for interval in active if assigned[interval.temp] in allowed]
+            victim = victims[-1] if victims else None
+            if victim is None or victim.end <= current.end:
+                assigned[current.temp] = None
+                continue
+            register = assigned[victim.temp]
+            assigned[victim.temp] = None
+            active.remove(victim)
+        assigned[current.temp] = register
+        bisect.insort(active, current, key=lambda interval: interval.end)
+    return assigned
+
+
+def symbol(name: str) -> str:
+    return name[1:] if name.startswith("@") else name
+
+
+class ProcCodegen:
+    def __init__(self, proc: tac.Proc, naive: bool = False):
+        self.proc = proc
+        self.name = symbol(proc.name)
+        self.lines: List[str] = []
+        registers = {} if naive else linear_scan(proc)
+        temps = set(registers) | set(proc.params)
+        for instr in proc.body:
+            temps.update(temp for temp in (instr.dst, *instr.uses()) if is_local(temp))
+        self.locations: Dict[tac.Temp, str] = {}
+        slots = 0
+        for temp in sorted(temps, key=str):
+            if registers.get(temp) is not None:
+                self.locations[temp] = registers[temp]
+            else:
+                slots += 1
+                self.locations[temp] = f"-{8 * slots}(%rbp)"
+        self.saved = sorted({reg for reg in self.locations.values() if reg in CALLEE_SAVED})
+        self.save_slots = {reg: f"-{8 * (slots + i + 1)}(%rbp)" for i, reg in enumerate(self.saved)}
+        size = 8 * (slots + len(self.saved))
+        self.frame = size + size % 16
+        self.reads = Counter(temp for instr in proc.body for temp in instr.uses())
+
+    def emit(self, text: str):
+        self.lines.append(f"\t{text}")
+
+    def loc(self, temp: tac.Temp) -> str:
+        if not is_local(temp):
+            return f"{symbol(temp)}(%rip)"
+        return self.locations[temp]
+
+    def move(self, dst: str, src: str):
+        if dst == src:
+            return
+        if not dst.startswith("%") and not src.startswith("%"):
+            self.emit(f"movq {src}, {SCRATCH}")
+            src = SCRATCH
+        self.emit(f"movq {src}, {dst}")
+
+    def label(self, label: int) -> str:
+        return f".L{self.name}.{label}"
+
+    def generate(self) -> List[str]:
+        proc = self.proc
+        self.lines += ["", f"\t.globl {self.name}", f"\t.type {self.name}, @function", f"{self.name}:"]
+        self.emit("pushq %rbp")
+        self.emit("movq %rsp, %rbp")
+        if self.frame:
+            self.emit(f"subq ${self.frame}, %rsp")
+        for reg in self.saved:
+            self.emit(f"movq {reg}, {self.save_slots[reg]}")
+        # the incoming arguments all at once, in case their registers are also destinations
+        in_registers = proc.params[:len(ARGUMENTS)]
+        for reg in ARGUMENTS[:len(in_registers)]:
+            self.emit(f"pushq {reg}")
+        for i, param in enumerate(in_registers):
+            self.emit(f"movq {8 * (len(in_registers) - 1 - i)}(%rsp), {SCRATCH}")
+            self.move(self.loc(param), SCRATCH)
+        if in_registers:
+            self.emit(f"addq ${8 * len(in_registers)}, %rsp")
+        for i, param in enumerate(proc.params[len(ARGUMENTS):]):
+            self.move(self.loc(param), f"{16 + 8 * i}(%rbp)")
+
+        args: Dict[int, tac.Temp] = {}
+        body = proc.body
+        i = 0
+        while i < len(body):
+            instr = body[i]
+            following = body[i + 1] if i + 1 < len(body) else None
+            if instr.op in tac.COMPARISONS and following is not None and following.op in (tac.JZ, tac.JNZ) \
+                    and following.a == instr.dst and is_local(instr.dst) and self.reads[instr.dst] == 1:
+                # the comparison only decides the jump: jump on the flags, without the boolean
+                self.compare(instr)
+                condition = HOLDS[instr.op] if following.op == tac.JNZ else FAILS[instr.op]
+                self.emit(f"j{condition} {self.label(following.b)}")
+                i += 2
+                continue
+            self.instr(instr, args)
+            i += 1
+
+        self.lines.append(f".L{self.name}.return:")
+        for reg in self.saved:
+            self.emit(f"movq {self.save_slots[reg]}, {reg}")
+        self.emit("movq %rbp, %rsp")
+        self.emit("popq %rbp")
+        self.emit("ret")
+        return self.lines
+
+    def call(self, target: str, args: List[tac.Temp]):
+        on_stack = args[len(ARGUMENTS):]
+        if len(on_stack) % 2:
+            self.emit("subq $8, %rsp")
+        for temp in reversed(on_stack):
+            self.emit(f"pushq {self.loc(temp)}")
+        in_registers = args[:len(ARGUMENTS)]
+        for temp in reversed(in_registers):
+            self.emit(f"pushq {self.loc(temp)}")
+        for reg in ARGUMENTS[:len(in_registers)]:
+            self.emit(f"popq {reg}")
+        self.emit(f"call {target}")
+        if on_stack:
+            self.emit(f"addq ${8 * (len(on_stack) + len(on_stack) % 2)}, %rsp")
+
+    def compare(self, instr: tac.Instr):
+        a = self.loc(instr.a)
+        if not a.startswith("%"):
+            self.move(SCRATCH, a)
+            a = SCRATCH
+        self.emit(f"cmpq {self.loc(instr.b)}, {a}")
+
+    def instr(self, instr: tac.Instr, args: Dict[int, tac.Temp]):
+        op = instr.op
+        if op == tac.CONST:
+            dst = self.loc(instr.dst)
+            if -(1 << 31) <= instr.a < (1 << 31):
+                self.emit(f"movq ${instr.a}, {dst}")
+            else:
+                self.emit(f"movabsq ${instr.a}, {SCRATCH}")
+                self.move(dst, SCRATCH)
+        elif op == tac.COPY:
+            self.move(self.loc(instr.dst), self.loc(instr.a))
+        elif op in ARITHMETIC:
+            dst, a, b = self.loc(instr.dst), self.loc(instr.a), self.loc(instr.b)
+            if dst.startswith("%") and dst != b:
+                self.move(dst, a)
+                self.emit(f"{ARITHMETIC[op]} {b}, {dst}")
+            else:
+                self.move(SCRATCH, a)
+                self.emit(f"{ARITHMETIC[op]} {b}, {SCRATCH}")
+                self.move(dst, SCRATCH)
+        elif op in (tac.DIV, tac.MOD):
+            self.move("%rax", self.loc(instr.a))
+            self.emit("cqto")
+            self.emit(f"idivq {self.loc(instr.b)}")
+            self.move(self.loc(instr.dst), "%rax" if op == tac.DIV else "%rdx")
+        elif op in SHIFTS:
+            self.move("%rcx", self.loc(instr.b))
+            self.move(SCRATCH, self.loc(instr.a))
+            self.emit(f"{SHIFTS[op]} %cl, {SCRATCH}")
+            self.move(self.loc(instr.dst), SCRATCH)
+        elif op in HOLDS:
+            self.compare(instr)
+            self.emit(f"set{HOLDS[op]} %al")
+            self.emit("movzbq %al, %rax")
+            self.move(self.loc(instr.dst), "%rax")
+        elif op in (tac.NEG, tac.NOT):
+            self.move(SCRATCH, self.loc(instr.a))
+            self.emit(f"{'negq' if op == tac.NEG else 'notq'} {SCRATCH}")
+            self.move(self.loc(instr.dst), SCRATCH)
+        elif op == tac.PRINT:
+            self.call("bx_print_int", [instr.a])
+        elif op == tac.LABEL:
+            self.lines.append(f"{self.label(instr.a)}:")
+        elif op == tac.JMP:
+            self.emit(f"jmp {self.label(instr.a)}")
+        elif op in JCC:
+            self.emit(f"cmpq $0, {self.loc(instr.a)}")
+            self.emit(f"{JCC[op]} {self.label(instr.b)}")
+        elif op == tac.PARAM:
+            args[instr.a] = instr.b
+        elif op == tac.CALL:
+            self.call(symbol(instr.a), [args.pop(i) for i in range(1, instr.b + 1)])
+            if instr.dst is not None:
+                self.move(self.loc(instr.dst), "%rax")
+        elif op == tac.RET:
+            if instr.a is None:
+                self.emit("xorl %eax, %eax")
+            else:
+                self.move("%rax", self.loc(instr.a))
+            self.emit(f"jmp .L{self.name}.return")
+        elif op == tac.NOP:
+            pass
+        else:
+            raise CodegenError(f"{self.proc.name}: cannot generate code for {instr!r}")
+
+
+def generate(decls: List[Union[tac.GlobalVar, tac.Proc]], naive: bool = False) -> str:
+    """The assembly of a whole program."""
+    lines = ["\t.text"]
+    for decl in decls:
+        if isinstance(decl, tac.Proc):
+            lines += ProcCodegen(decl, naive).generate()
+    variables = [decl for decl in decls if isinstance(decl, tac.GlobalVar)]
+    if variables:
+        lines += ["", "\t.data"]
+        for var in variables:
+            lines += [f"\t.globl {symbol(var.name)}", "\t.align 8", f"{symbol(var.name)}:", f"\t.quad {var.init}"]
+    lines += ["", '\t.section .note.GNU-stack,"",@progbits', ""]
+    return "\n".join(lines)
+
+
+def count_asm(text: str) -> Dict[str, int]:
+    return {"asm lines": text.count("\n")}
+
+
+def build(decls: List[Union[tac.GlobalVar, tac.Proc]], exe_path: str, naive: bool = False,
+          cc: str = "gcc", timer=None) -> str:
+    """Assembles and links a program with the runtime; returns the path of the assembly.
+    timer, a passes.Passes, records code generation and linking."""
+    asm_path = exe_path + ".s"
+    if timer is None:
+        asm = generate(decls, naive)
+    else:
+        asm = timer.call("codegen", generate, decls, naive, count=count_asm)
+    with open(asm_path, "w") as f:
+        f.write(asm)
+    if timer is None:
+        subprocess.run([cc, "-o", exe_path, asm_path, RUNTIME], check=True)
+    else:
+        timer.call("link", subprocess.run, [cc, "-o", exe_path, asm_path, RUNTIME], check=True)
+    return asm_path
+
+
+def load(path: str, timer=None) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    if path.endswith(".bx"):
+        import bx2tac
+        with open(path) as f:
+            return bx2tac.compile_source(f.read(), path, timer=timer)
+    if timer is None:
+        return tacbin.load(path)
+    import passes
+    return timer.call("load", tacbin.load, path, count=passes.count_tac)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python tac2x64.py PROGRAM [-o OUTPUT.s] [--naive] [--exe EXECUTABLE] [--time-passes[=json]] "
+              "[--trace-memory]", file=sys.stderr)
+        sys.exit(1)
+    timer = None
+    if any(arg.startswith("--time-passes") for arg in sys.argv):
+        import passes
+        timer = passes.Passes(trace_memory="--trace-memory" in sys.argv)
+    decls = load(sys.argv[1], timer)
+    naive = "--naive" in sys.argv
+    if "--exe" in sys.argv:
+        build(decls, sys.argv[sys.argv.index("--exe") + 1], naive, timer=timer)
+    else:
+        output = sys.argv[sys.argv.index("-o") + 1] if "-o" in sys.argv else sys.argv[1].rsplit(".", 1)[0] + ".s"
+        with open(output, "w") as f:
+            f.write(generate(decls, naive) if timer is None else
+                    timer.call("codegen", generate, decls, naive, count=count_asm))
+    if timer is not None:
+        import bx2tac
+        bx2tac.report_passes(timer)
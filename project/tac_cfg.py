@@ -0,0 +1,225 @@
+"""Control-flow graphs and liveness over TAC procedures.
+
+A procedure is cut into basic blocks at labels and after jumps and returns;
+the label that opens a block stays its first instruction, so concatenating
+the blocks in order gives back the procedure's body.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import tac
+
+
+def is_local(temp) -> bool:
+    """Whether temp belongs to the procedure (globals are named "@x")."""
+    return temp is not None and not (isinstance(temp, str) and temp.startswith("@"))
+
+
+def defs(instr: tac.Instr) -> Optional[tac.Temp]:
+    """The local temporary written by instr, if any."""
+    return instr.dst if is_local(instr.dst) else None
+
+
+@dataclass(slots=True)
+class Block:
+    index: int
+    body: List[tac.Instr] = field(default_factory=list)
+    succs: List[int] = field(default_factory=list)
+    preds: List[int] = field(default_factory=list)
+
+    @property
+    def label(self) -> Optional[int]:
+        return self.body[0].a if self.body and self.body[0].op == tac.LABEL else None
+
+
+class CFG:
+    """The basic blocks of a procedure; blocks[0] is the entry."""
+
+    def __init__(self, proc: tac.Proc):
+        self.proc = proc
+        self.blocks: List[Block] = []
+        current = None
+        for instr in proc.body:
+            if current is None or instr.op == tac.LABEL and current.body:
+                current = Block(len(self.blocks))
+                self.blocks.append(current)
+            current.body.append(instr)
+            if instr.op in tac.JUMPS or instr.op == tac.RET:
+                current = None
+        if not self.blocks:
+            self.blocks.append(Block(0))
+        by_label: Dict[int, int] = {block.label: block.index for block in self.blocks if block.label is not None}
+        for block in self.blocks:
+            last = block.body[-1] if block.body else None
+            if last is not None and last.op == tac.JMP:
+                block.succs.append(by_label[last.a])
+            elif last is not None and last.op == tac.RET:
+                pass
+            else:
+                if last is not None and last.op in tac.CONDITIONAL_JUMPS:
+                    block.succs.append(by_label[last.b])
+                if block.index + 1 < len(self.blocks) and block.index + 1 not in block.succs:
+                    block.succs.append(block.index + 1)
+            for succ in block.succs:
+                self.blocks[succ].preds.append(block.index)
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def reverse_postorder(self) -> List[int]:
+        """Blocks reachable from the entry, each before its successors except along back edges."""
+        order: List[int] = []
+        seen = {0}
+        stack = [(0, iter(self.blocks[0].succs))]
+        while stack:
+            index, succs = stack[-1]
+            for succ in succs:
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append((succ, iter(self.blocks[succ].succs)))
+                    break
+            else:
+                stack.pop()
+                order.append(index)
+        order.reverse()
+        return order
+
+    def linearize(self) -> List[tac.Instr]:
+        return [instr for block in self.blocks for instr in block.body]
+
+    def store(self):
+        """Writes the blocks back as the procedure's body."""
+        self.proc.body = self.linearize()
+
+
+def liveness(cfg: CFG) -> Tuple[List[Set[tac.Temp]], List[Set[tac.Temp]]]:
+    """The local temporaries live at the start and at the end of every block."""
+    n = len(cfg)
+    gen: List[Set[tac.Temp]] = [set() for _ in range(n)]
+    kill: List[Set[tac.Temp]] = [set() for _ in range(n)]
+    for block in cfg:
+        g, k = gen[block.index], kill[block.index]
+        for instr in reversed(block.body):
+            dst = defs(instr)
+            if dst is not None:
+                k.add(dst)
+                g.discard(dst)
+            g.update(temp for temp in instr.uses() if is_local(temp))
+    live_in: List[Set[tac.Temp]] = [set(g) for g in gen]
+    out: List[Set[tac.Temp]] = [set() for _ in range(n)]
+    # a backwards problem: popping from the end of the reverse postorder visits successors first
+    work = cfg.reverse_postorder()
+    reachable = set(work)
+    work[:0] = [i for i in range(n) if i not in reachable]
+    pending = set(range(n))
+    while work:
+        index = work.pop()
+        pending.discard(index)
+        block = cfg.blocks[index]
+        out[index] = set().union(*(live_in[succ] for succ in block.succs))
+        new_in = gen[index] | (out[index] - kill[index])
+        if new_in != live_in[index]:
+            live_in[index] = new_in
+            for pred in block.preds:
+                if pred not in pending:
+                    pending.add(pred)
+                    work.append(pred)
+    return live_in, out
+
+
+def live_out(cfg: CFG) -> List[Set[tac.Temp]]:
+    """The local temporaries live at the end of every block."""
+    return liveness(cfg)[1]
+
+
+def interference(cfg: CFG) -> Dict[tac.Temp, Set[tac.Temp]]:
+    """The interference graph of the local temporaries: two interfere when one is written while
+    the other is live. The source of a copy does not interfere with its destination, which
+    holds the same value, and the parameters all interfere with each other."""
+    graph: Dict[tac.Temp, Set[tac.Temp]] = {}
+    for param in cfg.proc.params:
+        graph[param] = set(cfg.proc.params) - {param}
+    entry_live: Set[tac.Temp] = set()
+    for block, live in zip(cfg, live_out(cfg)):
+        for instr in reversed(block.body):
+            dst = defs(instr)
+            if dst is not None:
+                live.discard(dst)
+                edges = graph.setdefault(dst, set())
+                same = instr.a if instr.op == tac.COPY else None
+                for other in live:
+                    if other != same:
+                        edges.add(other)
+                        graph.setdefault(other, set()).add(dst)
+            for temp in instr.uses():
+                if is_local(temp):
+                    live.add(temp)
+                    graph.setdefault(temp, set())
+        if block.index == 0:
+            entry_live = live
+    # the parameters are all written on entry
+    for param in cfg.proc.params:
+        for other in entry_live:
+            if other != param:
+                graph[param].add(other)
+                graph.setdefault(other, set()).add(param)
+    return graph
+
+
+def dominators(cfg: CFG) -> List[Optional[int]]:
+    """The immediate dominator of every block (the entry is its own, unreachable blocks have None).
+
+    The iterative algorithm of Cooper, Harvey and Kennedy: in reverse postorder, a block's
+    dominator is the nearest common dominator of its processed predecessors. Structured code
+    settles in two passes, so this is linear in practice."""
+    order = cfg.reverse_postorder()
+    position = {index: i for i, index in enumerate(order)}
+    idom: List[Optional[int]] = [None] * len(cfg)
+    idom[0] = 0
+    changed = True
+    while changed:
+        changed = False
+        for index in order[1:]:
+            new = None
+            for pred in cfg.blocks[index].preds:
+                if idom[pred] is None:
+                    continue
+                if new is None:
+                    new = pred
+                    continue
+                a, b = pred, new
+                while a != b:
+                    while position[a] > position[b]:
+                        a = idom[a]
+                    while position[b] > position[a]:
+                        b = idom[b]
+                new = a
+            if idom[index] != new:
+                idom[index], changed = new, True
+    return idom
+
+
+def dominator_tree(idom: List[Optional[int]]) -> List[List[int]]:
+    """The children of every block in the dominator tree."""
+    children: List[List[int]] = [[] for _ in idom]
+    for index, parent in enumerate(idom):
+        if parent is not None and index != 0:
+            children[parent].append(index)
+    return children
+
+
+def frontiers(cfg: CFG, idom: List[Optional[int]]) -> List[Set[int]]:
+    """The dominance frontier of every block: where its dominance stops, at a join."""
+    frontier: List[Set[int]] = [set() for _ in range(len(cfg))]
+    for block in cfg:
+        if idom[block.index] is None or len(block.preds) < 2:
+            continue
+        for pred in block.preds:
+            runner = pred
+            while idom[runner] is not None and runner != idom[block.index]:
+                frontier[runner].add(block.index)
+                runner = idom[runner]
+    return frontier
@@ -0,0 +1,458 @@
+"""Runs TAC directly.
+
+Every procedure is decoded once into basic blocks of (handler, dst, a, b)
+tuples: temporaries become slots of a register list, labels become block
+numbers, and every opcode gets its own small handler, so the dispatch loop never
+looks at opcode names. The straight-line part of a block runs in a tight loop;
+its last instruction, if it transfers control, returns None to fall through, a
+block to jump to, or CALL/RETURN for the loop to switch frames. Values wrap to
+64 bits.
+
+    python tac_interp.py program.json|program.tacb [--stats]
+"""
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+import tac
+import tacbin
+from tac import MAX_INT as MAX, MIN_INT as MIN, wrap
+
+
+class TACRuntimeError(Exception):
+    pass
+
+
+class _Signal:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+CALL = _Signal("CALL")
+RETURN = _Signal("RETURN")
+
+
+Entry = Tuple[Callable, object, object, object]
+
+
+@dataclass(slots=True)
+class Code:
+    """A decoded procedure."""
+    name: str
+    params: List[int]
+    registers: int
+    blocks: List[Tuple[Tuple[Entry, ...], Optional[Entry]]]  # straight-line entries, control transfer
+    ops: List[List[int]]  # opcodes executed by each block; entries added by decoding are not counted
+
+
+@dataclass
+class Stats:
+    instructions: int = 0
+    seconds: float = 0.0
+    opcodes: Counter = field(default_factory=Counter)
+
+    @property
+    def per_second(self) -> float:
+        return self.instructions / self.seconds if self.seconds else 0.0
+
+    def report(self) -> str:
+        lines = [f"{self.instructions} instructions in {self.seconds:.3f} s ({self.per_second:,.0f}/s)"]
+        for op, count in self.opcodes.most_common():
+            lines.append(f"  {tac.OPCODE_NAMES[op]:>6} {count:>12} {100 * count / max(self.instructions, 1):6.2f}%")
+        return "\n".join(lines)
+
+
+########## Handlers ##########
+# handler(registers, dst, a, b); dst, a and b are register slots except where noted
+
+def _const(r, d, a, b):
+    r[d] = a  # a is the value
+
+
+def _copy(r, d, a, b):
+    r[d] = r[a]
+
+
+def _add(r, d, a, b):
+    v = r[a] + r[b]
+    r[d] = v if MIN <= v <= MAX else wrap(v)
+
+
+def _sub(r, d, a, b):
+    v = r[a] - r[b]
+    r[d] = v if MIN <= v <= MAX else wrap(v)
+
+
+def _mul(r, d, a, b):
+    v = r[a] * r[b]
+    r[d] = v if MIN <= v <= MAX else wrap(v)
+
+
+def _div(r, d, a, b):
+    x, y = r[a], r[b]
+    if y == 0:
+        raise TACRuntimeError("division by zero")
+    q = abs(x) // abs(y)  # truncates towards zero, like the hardware
+    r[d] = wrap(q if (x < 0) == (y < 0) else -q)
+
+
+def _mod(r, d, a, b):
+    x, y = r[a], r[b]
+    if y == 0:
+        raise TACRuntimeError("division by zero")
+    m = abs(x) % abs(y)
+    r[d] = -m if x < 0 else m
+
+
+def _and(r, d, a, b):
+    r[d] = r[a] & r[b]
+
+
+def _or(r, d, a, b):
+    r[d] = r[a] | r[b]
+
+
+def _xor(r, d, a, b):
+    r[d] = r[a] ^ r[b]
+
+
+def _shl(r, d, a, b):
+    r[d] = wrap(r[a] << (r[b] & 63))
+
+
+def _shr(r, d, a, b):
+    r[d] = r[a] >> (r[b] & 63)
+
+
+def _neg(r, d, a, b):
+    r[d] = wrap(-r[a])
+
+
+def _not(r, d, a, b):
+    r[d] = ~r[a]
+
+
+def _eq(r, d, a, b):
+    r[d] = 1 if r[a] == r[b] else 0
+
+
+def _ne(r, d, a, b):
+    r[d] = 1 if r[a] != r[b] else 0
+
+
+def _lt(r, d, a, b):
+    r[d] = 1 if r[a] < r[b] else 0
+
+
+def _le(r, d, a, b):
+    r[d] = 1 if r[a] <= r[b] else 0
+
+
+def _gt(r, d, a, b):
+    r[d] = 1 if r[a] > r[b] else 0
+
+
+def _ge(r, d, a, b):
+    r[d] = 1 if r[a] >= r[b] else 0
+
+
+def _jmp(r, d, a, b):
+    return a  # a is the block
+
+
+def _jz(r, d, a, b):
+    if r[a] == 0:
+        return b
+
+
+def _jnz(r, d, a, b):
+    if r[a] != 0:
+        return b
+
+
+def _jl(r, d, a, b):
+    if r[a] < 0:
+        return b
+
+
+def _jle(r, d, a, b):
+    if r[a] <= 0:
+        return b
+
+
+def _jnl(r, d, a, b):
+    if r[a] >= 0:
+        return b
+
+
+def _jnle(r, d, a, b):
+    if r[a] > 0:
+        return b
+
+
+def _ret(r, d, a, b):
+    return RETURN
+
+
+def _nop(r, d, a, b):
+    return None
+
+
+HANDLERS: Dict[int, Callable] = {
+    tac.NOP: _nop, tac.CONST: _const, tac.COPY: _copy,
+    tac.ADD: _add, tac.SUB: _sub, tac.MUL: _mul, tac.DIV: _div, tac.MOD: _mod,
+    tac.AND: _and, tac.OR: _or, tac.XOR: _xor, tac.SHL: _shl, tac.SHR: _shr,
+    tac.NEG: _neg, tac.NOT: _not,
+    tac.EQ: _eq, tac.NE: _ne, tac.LT: _lt, tac.LE: _le, tac.GT: _gt, tac.GE: _ge,
+    tac.JMP: _jmp, tac.JZ: _jz, tac.JNZ: _jnz, tac.JL: _jl, tac.JLE: _jle, tac.JNL: _jnl, tac.JNLE: _jnle,
+    tac.RET: _ret,
+}
+
+
+class Interpreter:
+    def __init__(self, decls: List, out: TextIO = sys.stdout):
+        self.out = out
+        self.procs: Dict[str, tac.Proc] = {}
+        self.global_slots: Dict[str, int] = {}
+        self.global_values: List[int] = []
+        for decl in decls:
+            if isinstance(decl, tac.GlobalVar):
+                self.global_slots[decl.name] = len(self.global_values)
+                self.global_values.append(decl.init)
+            else:
+                self.procs[decl.name] = decl
+        self.code: Dict[str, Code] = {}
+        self.args: Dict[int, int] = {}  # position -> value of the pending param instructions
+        self.call: Optional[Tuple[str, int, Optional[int]]] = None  # target, argument count, destination
+        self.result = None
+        self.builtins: Dict[str, Callable[[List[int]], Optional[int]]] = {
+            "@bx_print_int": self._print_int,
+            "@bx_print_bool": self._print_bool,
+        }
+
+    def _print_int(self, args: List[int]):
+        self.out.write(f"{args[0]}\n")
+
+    def _print_bool(self, args: List[int]):
+        self.out.write("true\n" if args[0] else "false\n")
+
+    ########## Decoding ##########
+
+    def _handlers(self) -> Dict[int, Callable]:
+        # handlers that need the interpreter's state
+        args, builtins, out = self.args, self.builtins, self.out
+
+        def param(r, d, a, b):
+            args[a] = r[b]
+
+        def print_(r, d, a, b):
+            out.write(f"{r[a]}\n")
+
+        def builtin(r, d, a, b):
+            values = [args.pop(i) for i in range(1, b + 1)]
+            value = builtins[a](values)
+            if d is not None:
+                r[d] = value
+
+        def call(r, d, a, b):
+            self.call = (a, b, d)
+            return CALL
+
+        def ret_value(r, d, a, b):
+            self.result = r[a]
+            return RETURN
+
+        return {tac.PARAM: param, tac.PRINT: print_, "builtin": builtin, tac.CALL: call, "ret": ret_value}
+
+    def decode(self, proc: tac.Proc) -> Code:
+        local: Dict[object, int] = {}
+        registers = max(proc.temps, max((t + 1 for t in proc.params if isinstance(t, int)), default=0))
+        scratch = []
+
+        def slot(temp) -> int:
+            nonlocal registers
+            if isinstance(temp, int):
+                return temp
+            if temp not in local:
+                local[temp] = registers
+                registers += 1
+            return local[temp]
+
+        def scratch_slot(n: int) -> int:
+            nonlocal registers
+            while len(scratch) <= n:
+                scratch.append(registers)
+                registers += 1
+            return scratch[n]
+
+        special = self._handlers()
+        gvals = self.global_values
+
+        def load(slot_, index):
+            def gload(r, d, a, b):
+                r[d] = gvals[a]
+            return gload, slot_, index, None
+
+        def store(slot_, index):
+            def gstore(r, d, a, b):
+                gvals[d] = r[a]
+            return gstore, index, slot_, None
+
+        instrs, ops, labels, fixups, control = [], [], {}, [], set()
+        for instr in proc.body:
+            op = instr.op
+            if op == tac.LABEL:
+                labels[instr.a] = len(instrs)
+                continue
+            reads = [instr.a, instr.b] if op in tac.BINARY else [instr.a] if op in (tac.COPY, tac.PRINT, tac.RET) or op in tac.UNARY or op in tac.CONDITIONAL_JUMPS else [instr.b] if op == tac.PARAM else []
+            decoded = {}
+            for n, temp in enumerate(reads):
+                if isinstance(temp, str) and temp in self.global_slots:
+                    decoded[temp] = scratch_slot(n)
+                    instrs.append(load(decoded[temp], self.global_slots[temp]))
+                    ops.append(None)
+            operand = lambda temp: decoded[temp] if temp in decoded else slot(temp)  # noqa: E731
+            dst = instr.dst
+            stored = None
+            if isinstance(dst, str) and dst in self.global_slots:
+                stored, dst = self.global_slots[dst], scratch_slot(2)
+            elif dst is not None:
+                dst = slot(dst)
+
+            if op == tac.CONST:
+                entry = (_const, dst, instr.a, None)
+            elif op == tac.JMP:
+                entry = (_jmp, None, instr.a, None)
+                fixups.append((len(instrs), 2))
+                control.add(len(instrs))
+            elif op in tac.CONDITIONAL_JUMPS:
+                entry = (HANDLERS[op], None, operand(instr.a), instr.b)
+                fixups.append((len(instrs), 3))
+                control.add(len(instrs))
+            elif op == tac.PARAM:
+                entry = (special[tac.PARAM], None, instr.a, operand(instr.b))
+            elif op == tac.PRINT:
+                entry = (special[tac.PRINT], None, operand(instr.a), None)
+            elif op == tac.CALL and instr.a in self.builtins:
+                entry = (special["builtin"], dst, instr.a, instr.b)
+            elif op == tac.CALL:
+                entry = (special[tac.CALL], dst, instr.a, instr.b)
+                control.add(len(instrs))
+            elif op == tac.RET:
+                entry = (_ret, None, None, None) if instr.a is None else (special["ret"], None, operand(instr.a), None)
+                control.add(len(instrs))
+            elif op in tac.BINARY:
+                entry = (HANDLERS[op], dst, operand(instr.a), operand(instr.b))
+            elif op in HANDLERS:
+                entry = (HANDLERS[op], dst, operand(instr.a) if instr.a is not None else None, None)
+            else:
+                raise TACRuntimeError(f"Cannot interpret {instr}")
+            instrs.append(entry)
+            ops.append(op)
+            if stored is not None:
+                instrs.append(store(dst, stored))
+                ops.append(None)
+
+        control.add(len(instrs))
+        instrs.append((_ret, None, None, None))  # falling off the end returns
+        ops.append(None)
+
+        # a block starts at every label and after every control transfer
+        starts = sorted({0, *labels.values(), *(position + 1 for position in control if position + 1 < len(instrs))})
+        block_of = {start: n for n, start in enumerate(starts)}
+        for position, field_ in fixups:
+            entry = list(instrs[position])
+            entry[field_] = block_of[labels[entry[field_]]]
+            instrs[position] = tuple(entry)
+        blocks, block_ops = [], []
+        for start, end in zip(starts, starts[1:] + [len(instrs)]):
+            last = end - 1 if end - 1 in control else end
+            blocks.append((tuple(instrs[start:last]), instrs[last] if last < end else None))
+            block_ops.append([op for op in ops[start:end] if op is not None])
+        return Code(proc.name, [slot(param) for param in proc.params], registers, blocks, block_ops)
+
+    def code_for(self, name: str) -> Code:
+        code = self.code.get(name)
+        if code is None:
+            if name not in self.procs:
+                raise TACRuntimeError(f"Call to unknown procedure {name}")
+            code = self.code[name] = self.decode(self.procs[name])
+        return code
+
+    ########## Execution ##########
+
+    def run(self, entry: str = "@main", stats: Optional[Stats] = None) -> Optional[int]:
+        """Runs the entry procedure and returns what it returned; stats, if given, receives counts."""
+        code = self.code_for(entry)
+        hits: Dict[str, List[int]] = {}
+        counts = hits.setdefault(code.name, [0] * len(code.blocks))
+        blocks = code.blocks
+        regs = [0] * code.registers
+        frames = []
+        block = 0
+        start = time.perf_counter()
+        while True:
+            straight, last = blocks[block]
+            counts[block] += 1
+            for handler, d, a, b in straight:
+                handler(regs, d, a, b)
+            block += 1
+            if last is None:
+                continue
+            handler, d, a, b = last
+            jump = handler(regs, d, a, b)
+            if jump is None:
+                continue
+            if jump is CALL:
+                name, n, d = self.call
+                callee = self.code_for(name)
+                if len(callee.params) != n:
+                    raise TACRuntimeError(f"{name} takes {len(callee.params)} arguments but was called with {n}")
+                frames.append((blocks, regs, block, counts, d))
+                args = self.args
+                regs = [0] * callee.registers
+                for i, param in enumerate(callee.params, 1):
+                    regs[param] = args.pop(i)
+                blocks, block = callee.blocks, 0
+                counts = hits.get(name)
+                if counts is None:
+                    counts = hits[name] = [0] * len(blocks)
+            elif jump is RETURN:
+                result, self.result = self.result, None
+                if not frames:
+                    break
+                blocks, regs, block, counts, d = frames.pop()
+                if d is not None:
+                    regs[d] = result if result is not None else 0
+            else:
+                block = jump
+        if stats is not None:
+            stats.seconds += time.perf_counter() - start
+            for name, counted in hits.items():
+                block_ops = self.code[name].ops
+                for ops, count in zip(block_ops, counted):
+                    if count:
+                        stats.instructions += count * len(ops)
+                        for op in ops:
+                            stats.opcodes[op] += count
+        return result
+
+
+def run(decls: List, entry: str = "@main", out: TextIO = sys.stdout, stats: Optional[Stats] = None) -> Optional[int]:
+    return Interpreter(decls, out).run(entry, stats)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python tac_interp.py PROGRAM [--stats]", file=sys.stderr)
+        sys.exit(1)
+    program = tacbin.load(sys.argv[1])
+    stats = Stats() if "--stats" in sys.argv else None
+    run(program, stats=stats)
+    if stats is not None:
+        print(stats.report(), file=sys.stderr)
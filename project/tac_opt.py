@@ -0,0 +1,168 @@
+"""Optimization passes over TAC procedures.
+
+Copy propagation replaces the reads of a temporary that holds a copy of
+another by reads of the original, as long as neither has been written since
+on every path (available copies, a forward problem over the CFG). The copies
+left without readers are then removed using liveness. Globals are neither
+propagated nor removed, since calls can read and write them.
+
+Last, the temporaries are renumbered: the lowering takes a fresh one from a
+counter for every value, and those whose lifetimes do not overlap (which do
+not interfere) can share an id. This is a greedy colouring of the interference
+graph, so the ids it hands out stay small and dense.
+
+    python tac_opt.py INPUT [OUTPUT]
+"""
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+import tac
+import tac_cfg
+import tacbin
+from tac_cfg import defs, is_local
+
+Copies = Dict[tac.Temp, tac.Temp]  # destination -> source
+
+
+def _meet(copies: List[Copies]) -> Copies:
+    if not copies:
+        return {}
+    first, *rest = copies
+    return {dst: src for dst, src in first.items() if all(other.get(dst) == src for other in rest)}
+
+
+def _transfer(block: tac_cfg.Block, available: Copies, rewrite: bool) -> Copies:
+    # sources -> the destinations copied from them, to kill those when the source is written
+    copied: Dict[tac.Temp, Set[tac.Temp]] = {}
+    for dst, src in available.items():
+        copied.setdefault(src, set()).add(dst)
+    for instr in block.body:
+        if rewrite and available:
+            instr.rename_uses(available)
+        dst = defs(instr)
+        if dst is None:
+            continue
+        src = available.pop(dst, None)
+        if src is not None:
+            copied[src].discard(dst)
+        for stale in copied.pop(dst, ()):
+            del available[stale]
+        if instr.op == tac.COPY and is_local(instr.a):
+            src = available.get(instr.a, instr.a)
+            if src != dst:
+                available[dst] = src
+                copied.setdefault(src, set()).add(dst)
+    return available
+
+
+def propagate_copies(proc: tac.Proc) -> int:
+    """Rewrites the reads of copies to read their sources; returns how many reads changed."""
+    cfg = tac_cfg.CFG(proc)
+    order = cfg.reverse_postorder()
+    outs: List[Optional[Copies]] = [None] * len(cfg)  # None until computed: every copy is available
+
+    def entry(index: int) -> Copies:
+        if index == 0:
+            return {}
+        return _meet([outs[pred] for pred in cfg.blocks[index].preds if outs[pred] is not None])
+
+    changed = True
+    while changed:
+        changed = False
+        for index in order:
+            out = _transfer(cfg.blocks[index], entry(index), False)
+            if out != outs[index]:
+                outs[index], changed = out, True
+
+    before = [instr.uses() for instr in proc.body]
+    reachable = set(order)
+    for block in cfg:
+        _transfer(block, entry(block.index) if block.index in reachable else {}, True)
+    return sum(old != instr.uses() for old, instr in zip(before, proc.body))
+
+
+def remove_dead_copies(proc: tac.Proc) -> int:
+    """Deletes the copies to local temporaries that are never read, and copies of a temporary to
+    itself; returns how many were deleted."""
+    removed = 0
+    while True:
+        cfg = tac_cfg.CFG(proc)
+        count = 0
+        for block, live in zip(cfg, tac_cfg.live_out(cfg)):
+            kept = []
+            for instr in reversed(block.body):
+                dst = defs(instr)
+                if instr.op == tac.COPY and (instr.a == instr.dst or dst is not None and dst not in live):
+                    count += 1
+                    continue
+                if dst is not None:
+                    live.discard(dst)
+                live.update(temp for temp in instr.uses() if is_local(temp))
+                kept.append(instr)
+            kept.reverse()
+            block.body = kept
+        if not count:
+            return removed
+        cfg.store()
+        removed += count
+
+
+def renumber_temps(proc: tac.Proc) -> Tuple[int, int]:
+    """Renames the local temporaries to 0, 1, ..., giving the same id to temporaries that do not
+    interfere; returns how many distinct temporaries there were before and after.
+
+    Copies whose source and destination end up sharing an id are deleted."""
+    graph = tac_cfg.interference(tac_cfg.CFG(proc))
+    # parameters first, then by first appearance, which suits the mostly straight-line lowering
+    order = dict.fromkeys(proc.params)
+    for instr in proc.body:
+        for temp in instr.uses():
+            if is_local(temp):
+                order.setdefault(temp)
+        if defs(instr) is not None:
+            order.setdefault(instr.dst)
+    ids: Dict[tac.Temp, int] = {}
+    for temp in order:
+        taken = {ids[other] for other in graph[temp] if other in ids}
+        color = 0
+        while color in taken:
+            color += 1
+        ids[temp] = color
+    body = []
+    for instr in proc.body:
+        instr.rename_uses(ids)
+        if defs(instr) is not None:
+            instr.dst = ids[instr.dst]
+        if instr.op != tac.COPY or instr.a != instr.dst:
+            body.append(instr)
+    proc.body = body
+    proc.params = [ids[param] for param in proc.params]
+    proc.temps = max(ids.values(), default=-1) + 1
+    return len(graph), proc.temps
+
+
+def optimize(proc: tac.Proc) -> Dict[str, int]:
+    """Runs the passes on proc in place and returns what each did."""
+    stats = {"propagated": propagate_copies(proc), "removed copies": remove_dead_copies(proc)}
+    stats["temps before"], stats["temps after"] = renumber_temps(proc)
+    return stats
+
+
+def optimize_program(decls: List) -> Dict[str, int]:
+    total: Dict[str, int] = {}
+    for decl in decls:
+        if isinstance(decl, tac.Proc):
+            for name, count in optimize(decl).items():
+                total[name] = total.get(name, 0) + count
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python tac_opt.py INPUT [OUTPUT]", file=sys.stderr)
+        sys.exit(1)
+    decls = tacbin.load(sys.argv[1])
+    for name, count in optimize_program(decls).items():
+        print(f"{name:>15}: {count}", file=sys.stderr)
+    if len(sys.argv) == 3:
+        tacbin.save(decls, sys.argv[2])
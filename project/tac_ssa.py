@@ -0,0 +1,163 @@
+"""Static single assignment form for TAC procedures.
+
+to_ssa places phi instructions at the iterated dominance frontiers of the
+blocks that write a temporary, where the temporary is live ("pruned" SSA),
+then walks the dominator tree giving every write a fresh temporary. Every block gets a label on the way, since phi
+operands name the predecessor they come from by its label, and unreachable
+blocks are dropped.
+
+from_ssa replaces the phis with copies at the end of the predecessors,
+splitting the edges from a block with several successors into one with
+several predecessors. The copies into the phis of one block happen at once,
+so they go through fresh temporaries when one reads another's destination.
+Copy propagation and tac_opt.renumber_temps clean up after it.
+"""
+from typing import Dict, List, Set
+
+import tac
+import tac_cfg
+from tac_cfg import defs
+
+
+def _prepare(proc: tac.Proc) -> tac_cfg.CFG:
+    cfg = tac_cfg.CFG(proc)
+    if cfg.blocks[0].preds:
+        # a fresh entry, so that the entry has no predecessors to receive phis from
+        proc.body.insert(0, tac.Instr(tac.NOP))
+        cfg = tac_cfg.CFG(proc)
+    reachable = set(cfg.reverse_postorder())
+    body = []
+    for block in cfg:
+        if block.index not in reachable:
+            continue
+        if block.label is None:
+            body.append(tac.Instr(tac.LABEL, None, proc.new_label()))
+        body += block.body
+    proc.body = body
+    return tac_cfg.CFG(proc)
+
+
+def to_ssa(proc: tac.Proc) -> int:
+    """Converts proc to SSA form in place; returns the number of phis placed."""
+    cfg = _prepare(proc)
+    idom = tac_cfg.dominators(cfg)
+    frontier = tac_cfg.frontiers(cfg, idom)
+
+    live_in, _ = tac_cfg.liveness(cfg)
+
+    # where every temporary is written
+    written: Dict[tac.Temp, List[int]] = {param: [0] for param in proc.params}
+    for block in cfg:
+        for instr in block.body:
+            dst = defs(instr)
+            if dst is not None:
+                blocks = written.setdefault(dst, [])
+                if not blocks or blocks[-1] != block.index:
+                    blocks.append(block.index)
+
+    phis: List[Dict[tac.Temp, tac.Instr]] = [{} for _ in range(len(cfg))]
+    for temp, blocks in written.items():
+        work = list(blocks)
+        placed: Set[int] = set()
+        while work:
+            for join in frontier[work.pop()]:
+                if join not in placed:
+                    placed.add(join)
+                    work.append(join)
+                    if temp in live_in[join]:
+                        phis[join][temp] = tac.Instr(tac.PHI, temp, [])
+    for block in cfg:
+        if phis[block.index]:
+            # after the label
+            block.body[1:1] = phis[block.index].values()
+
+    # renaming, along the dominator tree with an explicit stack
+    versions: Dict[tac.Temp, List[tac.Temp]] = {param: [param] for param in proc.params}
+    children = tac_cfg.dominator_tree(idom)
+    stack = [(0, True)]
+    pushed: List[List[tac.Temp]] = [[] for _ in range(len(cfg))]
+    while stack:
+        index, entering = stack.pop()
+        if not entering:
+            for temp in pushed[index]:
+                versions[temp].pop()
+            continue
+        block = cfg.blocks[index]
+        for instr in block.body:
+            if instr.op != tac.PHI:
+                current = {temp: versions[temp][-1] for temp in instr.uses() if versions.get(temp)}
+                if current:
+                    instr.rename_uses(current)
+            dst = defs(instr)
+            if dst is not None:
+                new = proc.new_temp()
+                versions.setdefault(dst, []).append(new)
+                pushed[index].append(dst)
+                instr.dst = new
+        for succ in block.succs:
+            for temp, phi in phis[succ].items():
+                version = versions.get(temp)
+                phi.a.append((block.label, version[-1] if version else temp))
+        stack.append((index, False))
+        stack += [(child, True) for child in reversed(children[index])]
+    cfg.store()
+    return sum(len(block_phis) for block_phis in phis)
+
+
+def is_ssa(proc: tac.Proc) -> bool:
+    """Whether every local temporary of proc is written once (the parameters on entry)."""
+    seen = set(proc.params)
+    for instr in proc.body:
+        dst = defs(instr)
+        if dst is not None:
+            if dst in seen:
+                return False
+            seen.add(dst)
+    return True
+
+
+def _parallel_copies(proc: tac.Proc, copies: List[tuple]) -> List[tac.Instr]:
+    # dst_i <- src_i all at once: go through fresh temporaries when a source is also a destination
+    copies = [(dst, src) for dst, src in copies if dst != src]
+    if {dst for dst, _ in copies} & {src for _, src in copies}:
+        fresh = [(proc.new_temp(), src) for _, src in copies]
+        return [tac.Instr(tac.COPY, temp, src) for temp, src in fresh] + \
+            [tac.Instr(tac.COPY, dst, temp) for (dst, _), (temp, _) in zip(copies, fresh)]
+    return [tac.Instr(tac.COPY, dst, src) for dst, src in copies]
+
+
+def from_ssa(proc: tac.Proc) -> int:
+    """Replaces the phis of proc by copies, in place; returns the number of edges split."""
+    cfg = tac_cfg.CFG(proc)
+    by_label = {block.label: block for block in cfg if block.label is not None}
+    # predecessor label -> successor label -> copies on that edge
+    edges: Dict[int, Dict[int, List[tuple]]] = {}
+    for block in cfg:
+        for phi in block.body:
+            if phi.op == tac.PHI:
+                for pred, temp in phi.a:
+                    edges.setdefault(pred, {}).setdefault(block.label, []).append((phi.dst, temp))
+        block.body = [instr for instr in block.body if instr.op != tac.PHI]
+    split = []
+    for pred_label, targets in edges.items():
+        pred = by_label[pred_label]
+        last = pred.body[-1]
+        ends_with_jump = last.op in tac.JUMPS
+        for label, copies in targets.items():
+            copies = _parallel_copies(proc, copies)
+            if len(pred.succs) == 1:
+                if ends_with_jump:
+                    pred.body[-1:-1] = copies
+                else:
+                    pred.body += copies
+                continue
+            # a critical edge: the copies get a block of their own
+            middle = proc.new_label()
+            split += [tac.Instr(tac.LABEL, None, middle), *copies, tac.Instr(tac.JMP, None, label)]
+            if last.op in tac.CONDITIONAL_JUMPS and last.b == label:
+                last.b = middle
+            else:
+                # the fall-through edge
+                pred.body.append(tac.Instr(tac.JMP, None, middle))
+    proc.body = cfg.linearize() + split
+    return sum(instr.op == tac.LABEL for instr in split)
@@ -0,0 +1,279 @@
+"""Binary TAC files that can be memory-mapped and read one procedure at a time.
+
+Layout, little-endian:
+
+    header          magic, version, then the offset and size of each section below
+    instructions    fixed-size records: opcode (u8), operand kinds (u8), dst, a, b (i64 each)
+    strings         every name (procedures, globals, call targets, named temporaries) once,
+                    as a table of u32 offsets followed by the UTF-8 data
+    procedures      per procedure: name and parameter string ids, first instruction,
+                    instruction count, temporary and label counters
+    globals         per global variable: name string id and initial value
+
+The kinds byte holds two bits per operand (dst, a, b): absent, integer, or an
+index into the string table. Records have a fixed size, so a procedure is
+decoded straight from its slice of the map without touching the others.
+
+    python tacbin.py program.json program.tacb     JSON to binary
+    python tacbin.py program.tacb program.json     and back
+"""
+import io
+import json
+import mmap
+import struct
+import sys
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import tac
+
+MAGIC = b"BXTAC\0"
+VERSION = 1
+HEADER = struct.Struct("<6sH8Q")  # magic, version, (offset, count) of instructions, strings, procedures, globals
+RECORD = struct.Struct("<BBqqq")
+PROC = struct.Struct("<IIIQIII")  # name, first param, param count, first instruction, count, temps, labels
+STRING_OFFSET = struct.Struct("<I")
+GLOBAL = struct.Struct("<Iq")
+
+NONE, INT, STRING = 0, 1, 2
+
+
+class TacWriter:
+    """Writes procedures one after the other; close() adds the tables and the header."""
+
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.strings: Dict[str, int] = {}
+        self.procs: List[tuple] = []
+        self.params: List[int] = []
+        self.globals: List[tuple] = []
+        self.count = 0
+        self._buffer = bytearray()
+        fp.write(bytes(HEADER.size))
+
+    def _string(self, text: str) -> int:
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def _operand(self, value, shift: int):
+        # returns (kinds bits, encoded value)
+        if value is None:
+            return 0, 0
+        if isinstance(value, int):
+            return INT << shift, int(value)
+        if not isinstance(value, str):
+            raise ValueError("phi instructions have no binary form, convert the procedure out of SSA first")
+        return STRING << shift, self._string(value)
+
+    def write_instrs(self, instrs) -> int:
+        """Appends instructions to the current procedure and returns how many were written."""
+        pack = RECORD.pack
+        buffer = self._buffer
+        written = 0
+        for instr in instrs:
+            dst, a, b = instr.dst, instr.a, instr.b
+            if type(dst) is int and type(a) is int and (b is None or type(b) is int):
+                kinds = INT | INT << 2 | (0 if b is None else INT << 4)
+                buffer += pack(instr.op, kinds, dst, a, b or 0)
+            else:
+                kd, dst = self._operand(dst, 0)
+                ka, a = self._operand(a, 2)
+                kb, b = self._operand(b, 4)
+                buffer += pack(instr.op, kd | ka | kb, dst, a, b)
+            written += 1
+            if len(buffer) >= 1 << 20:
+                self.fp.write(buffer)
+                buffer.clear()
+        self.count += written
+        return written
+
+    def write_proc(self, proc: tac.Proc):
+        first = self.count
+        self.write_instrs(proc.body)
+        self.end_proc(proc, first)
+
+    def end_proc(self, proc: tac.Proc, first: int):
+        """Records proc, whose body was written by write_instrs since instruction number first."""
+        params = [self._string(tac.temp_name(param)) for param in proc.params]
+        self.procs.append((self._string(proc.name), len(self.params), len(params), first,
+                           self.count - first, proc.temps, proc.labels))
+        self.params += params
+
+    def write_global(self, var: tac.GlobalVar):
+        self.globals.append((self._string(var.name), var.init))
+
+    def close(self):
+        fp = self.fp
+        fp.write(self._buffer)
+        self._buffer.clear()
+        instructions = (HEADER.size, self.count)
+
+        data = [text.encode() for text in self.strings]
+        start = HEADER.size + self.count * RECORD.size
+        table = bytearray()
+        offset = 0
+        for item in data:
+            table += STRING_OFFSET.pack(offset)
+            offset += len(item)
+        table += STRING_OFFSET.pack(offset)
+        fp.write(table)
+        fp.write(b"".join(data))
+        strings = (start, len(data))
+
+        start += len(table) + offset
+        fp.write(b"".join(PROC.pack(*entry) for entry in self.procs))
+        fp.write(b"".join(STRING_OFFSET.pack(param) for param in self.params))
+        procedures = (start, len(self.procs))
+
+        start += len(self.procs) * PROC.size + len(self.params) * STRING_OFFSET.size
+        fp.write(b"".join(GLOBAL.pack(*entry) for entry in self.globals))
+        global_vars = (start, len(self.globals))
+
+        fp.seek(0)
+        fp.write(HEADER.pack(MAGIC, VERSION, *instructions, *strings, *procedures, *global_vars))
+        fp.seek(0, 2)
+
+
+def _write(decls: List[Union[tac.GlobalVar, tac.Proc]], fp: BinaryIO):
+    writer = TacWriter(fp)
+    for decl in decls:
+        if isinstance(decl, tac.GlobalVar):
+            writer.write_global(decl)
+        else:
+            writer.write_proc(decl)
+    writer.close()
+
+
+def write(decls: List[Union[tac.GlobalVar, tac.Proc]], path: str):
+    with open(path, "wb") as fp:
+        _write(decls, fp)
+
+
+def dumps(decls: List[Union[tac.GlobalVar, tac.Proc]]) -> bytes:
+    """The binary form of decls, in memory."""
+    fp = io.BytesIO()
+    _write(decls, fp)
+    return fp.getvalue()
+
+
+class TacFile:
+    """A memory-mapped binary TAC file, or bytes from dumps(). Procedures are decoded on first access."""
+
+    def __init__(self, path: Union[str, bytes]):
+        if isinstance(path, bytes):
+            self.map = path
+            path = "<bytes>"
+        else:
+            with open(path, "rb") as fp:
+                self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, instr_offset, _, string_offset, string_count, proc_offset, proc_count, \
+            global_offset, global_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary TAC file.")
+        if version != VERSION:
+            raise ValueError(f"{path} has version {version}, expected {VERSION}.")
+        self.instr_offset = instr_offset
+
+        offsets = struct.unpack_from(f"<{string_count + 1}I", self.map, string_offset)
+        data = string_offset + STRING_OFFSET.size * (string_count + 1)
+        self.strings = [str(self.map[data + start:data + end], "utf-8") for start, end in zip(offsets, offsets[1:])]
+
+        self.entries = list(PROC.iter_unpack(self.map[proc_offset:proc_offset + proc_count * PROC.size]))
+        param_offset = proc_offset + proc_count * PROC.size
+        self.param_ids = struct.unpack_from(f"<{sum(entry[2] for entry in self.entries)}I", self.map, param_offset)
+        self.index = {self.strings[entry[0]]: i for i, entry in enumerate(self.entries)}
+        self.globals = [tac.GlobalVar(self.strings[name], init)
+                        for name, init in GLOBAL.iter_unpack(self.map[global_offset:global_offset + global_count * GLOBAL.size])]
+        self._procs: Dict[int, tac.Proc] = {}
+
+    def names(self) -> List[str]:
+        return [self.strings[entry[0]] for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _decode(self, i: int) -> tac.Proc:
+        name, first_param, param_count, first, count, temps, labels = self.entries[i]
+        strings = self.strings
+        start = self.instr_offset + first * RECORD.size
+        body = []
+        append = body.append
+        Instr = tac.Instr
+        for op, kinds, dst, a, b in RECORD.iter_unpack(self.map[start:start + count * RECORD.size]):
+            if kinds == 0b010101:
+                append(Instr(op, dst, a, b))
+            elif kinds == 0b000101:
+                append(Instr(op, dst, a))
+            else:
+                append(Instr(op,
+                             None if kinds & 3 == NONE else dst if kinds & 3 == INT else strings[dst],
+                             None if kinds >> 2 & 3 == NONE else a if kinds >> 2 & 3 == INT else strings[a],
+                             None if kinds >> 4 == NONE else b if kinds >> 4 == INT else strings[b]))
+        params = [tac.parse_temp(strings[param]) for param in self.param_ids[first_param:first_param + param_count]]
+        return tac.Proc(strings[name], params, body, temps, labels)
+
+    def proc(self, key) -> tac.Proc:
+        """The procedure with the given index or name."""
+        i = self.index[key] if isinstance(key, str) else key
+        proc = self._procs.get(i)
+        if proc is None:
+            proc = self._procs[i] = self._decode(i)
+        return proc
+
+    __getitem__ = proc
+
+    def __iter__(self) -> Iterator[tac.Proc]:
+        return (self.proc(i) for i in range(len(self.entries)))
+
+    def close(self):
+        self._procs.clear()
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+    def __enter__(self) -> "TacFile":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read(path: Union[str, bytes]) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    with TacFile(path) as tac_file:
+        return tac_file.globals + list(tac_file)
+
+
+def loads(data: bytes) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    """Global variables and procedures from the output of dumps."""
+    return read(data)
+
+
+def is_binary(path: str) -> bool:
+    with open(path, "rb") as fp:
+        return fp.read(len(MAGIC)) == MAGIC
+
+
+def load(path: str) -> List[Union[tac.GlobalVar, tac.Proc]]:
+    """Global variables and procedures of a TAC file in either format."""
+    if is_binary(path):
+        return read(path)
+    with open(path) as fp:
+        return tac.from_json(json.load(fp))
+
+
+def save(decls: List[Union[tac.GlobalVar, tac.Proc]], path: str, binary: Optional[bool] = None):
+    """Writes decls as binary TAC when path ends with .tacb (or binary is set), as JSON otherwise."""
+    if binary is None:
+        binary = path.endswith(".tacb")
+    if binary:
+        write(decls, path)
+    else:
+        with open(path, "w") as fp:
+            json.dump(tac.to_json(decls), fp)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python tacbin.py INPUT OUTPUT", file=sys.stderr)
+        sys.exit(1)
+    save(load(sys.argv[1]), sys.argv[2], binary=not is_binary(sys.argv[1]))
@@ -0,0 +1,39 @@
+import ast_types
+import bxparser
+
+
+def test_nodes_built_from_a_line_number():
+    value = ast_types.ExpressionInt(value=3, lineno=7)
+    assert (value.lineno, value.column) == (7, 0)
+    call = ast_types.ExpressionCall(target="f", args=[value], lineno=8)
+    proc = ast_types.Procedure(name="main", params=[], lineno=9,
+                               block=ast_types.StatementBlock(statements=[ast_types.StatementEval(call=call, lineno=8)],
+                                                              lineno=9))
+    assert [proc.lineno, proc.block.lineno, proc.block.statements[0].lineno] == [9, 9, 8]
+
+
+def test_nodes_built_from_an_offset():
+    program = bxparser.parse("def main() {\n  var x = 1 : int;\n  x = x + 2;\n}\n")
+    assign = program.procedures[0].block.statements[1]
+    assert (assign.lineno, assign.rvalue.lineno) == (3, 3)
+
+
+def test_blocks_built_from_a_list_of_scopes():
+    outer = {"g": ast_types.SymbolRecord(ast_types.BXTypesInt())}
+    middle = {"x": ast_types.SymbolRecord(ast_types.BXTypesBool())}
+    block = ast_types.StatementBlock(statements=[], lineno=1, scopes=[outer, middle, {}])
+    assert block.scopes == [outer, middle, {}]
+    assert block.get_type("g") is ast_types.BXTypesInt()
+    assert block.get_type("x") is ast_types.BXTypesBool()
+    assert block.root is block.parent.parent
+    block.define_type("x", ast_types.BXTypesInt())
+    assert block.get_type("x") is ast_types.BXTypesInt()
+
+    child = ast_types.StatementBlock(statements=[], lineno=2)
+    block.inherit_scopes(child)
+    assert len(child.scopes) == 4 and child.root is block.root
+    child.define_temp("g", "@g", global_def=True)
+    assert outer["g"].temp == "@g"
+
+    child.scopes = [outer, {}]
+    assert child.scopes == [outer, {}] and child.get_type("g") is ast_types.BXTypesInt()
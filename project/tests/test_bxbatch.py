@@ -0,0 +1,27 @@
+import os
+
+import bxbatch
+
+
+def test_unmatched_glob_is_reported(tmp_path):
+    good = tmp_path / "good.bx"
+    good.write_text("def main() { bx_print_int(x = 1); }\n")
+    missing = str(tmp_path / "nothere*.bx")
+    paths = bxbatch.expand([str(tmp_path / "*.bx"), missing])
+    assert paths == [str(good), missing]
+    result = bxbatch.compile_files(paths)
+    assert result.files == 2
+    assert [path for path, _ in result.failures] == [missing]
+    assert os.path.exists(tmp_path / "good.tac.json")
+
+
+def test_inputs_sharing_a_basename(tmp_path):
+    for directory, value in (("a", 1), ("b/c", 2)):
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / "x.bx").write_text(f"def main() {{ bx_print_int(x = {value}); }}\n")
+    outdir = tmp_path / "out"
+    result = bxbatch.compile_files([str(tmp_path / "a/x.bx"), str(tmp_path / "b/c/x.bx")], outdir=str(outdir))
+    assert result.files == 2 and not result.failures
+    outputs = sorted(str(path.relative_to(outdir)) for path in outdir.rglob("*.json"))
+    assert outputs == ["a/x.tac.json", "b/c/x.tac.json"]
+    assert (outdir / "a/x.tac.json").read_text() != (outdir / "b/c/x.tac.json").read_text()
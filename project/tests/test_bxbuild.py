@@ -0,0 +1,40 @@
+import bx2tac
+import bxbuild
+import tac
+
+SOURCE = """
+var scale = 3 : int;
+def inc(x : int) : int { return x + 1; }
+def twice(x : int) : int { return inc(x = inc(x = x)); }
+def scaled(x : int) : int { return x * scale; }
+def main() { bx_print_int(x = twice(x = scaled(x = 2))); }
+"""
+
+
+def build(cache, source, optimize=True):
+    cache.hits = cache.misses = 0
+    decls = cache.compile(source, optimize=optimize)
+    assert tac.to_json(decls) == tac.to_json(bx2tac.compile_source(source, optimize=optimize))
+    return cache.misses
+
+
+def test_only_what_changed_is_lowered_again(tmp_path):
+    cache = bxbuild.BuildCache(tmp_path)
+    assert build(cache, SOURCE) == 4
+    assert build(cache, SOURCE) == 0
+    assert build(cache, SOURCE.replace("{ return x + 1; }", "{  // one more\n  return x + 1; }")) == 0
+    assert build(cache, SOURCE.replace("x * scale", "x * scale + 1")) == 1
+    # the global's declaration is part of the key of the procedures that mention it
+    assert build(cache, SOURCE.replace("scale = 3", "scale = 4")) == 1
+    # a new overload of inc changes the TAC names its callers use
+    assert build(cache, SOURCE + "def inc(x : bool) : int { return 0; }\n") == 3
+    assert build(cache, SOURCE, optimize=False) == 4
+
+
+def test_unreadable_entries_are_lowered_again(tmp_path):
+    cache = bxbuild.BuildCache(tmp_path)
+    build(cache, SOURCE)
+    for entry in tmp_path.iterdir():
+        entry.write_bytes(b"garbage")
+    assert build(cache, SOURCE) == 4
+    assert build(cache, SOURCE) == 0
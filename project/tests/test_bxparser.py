@@ -0,0 +1,17 @@
+import bxparser
+
+
+def test_parser_without_a_cache_directory(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    # a directory cannot be made under a file, whoever runs the test
+    monkeypatch.setenv("BXC_CACHE_DIR", str(blocker / "cache"))
+    monkeypatch.setattr(bxparser, "_parser", None)
+    program = bxparser.parse("def main() { var x = 1 : int; }")
+    assert [proc.name for proc in program.procedures] == ["main"]
+
+
+def test_parser_tables_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("BXC_CACHE_DIR", str(tmp_path))
+    bxparser.create_parser()
+    assert [path.name for path in tmp_path.iterdir()] == [f"parsetab-{bxparser.grammar_hash()}.pickle"]
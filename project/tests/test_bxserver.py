@@ -0,0 +1,25 @@
+import threading
+
+import bxclient
+import bxserver
+
+
+def test_requests_and_malformed_requests(tmp_path):
+    path = tmp_path / "s.sock"
+    server = bxserver.CompileServer(path)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        for message in ([], "x", 3):
+            reply = bxclient.request(message, path)
+            assert reply["ok"] is False and "JSON object" in reply["error"]
+        output = tmp_path / "p.tac.json"
+        reply = bxclient.request({"source": "def main() { bx_print_int(x = 1); }", "output": str(output)}, path)
+        assert reply == {"ok": True, "procs": 1} and output.exists()
+        reply = bxclient.request({"source": "def main() { x = 1; }", "output": str(output)}, path)
+        assert reply["ok"] is False and "not defined" in reply["error"]
+        assert bxclient.request({"op": "stats"}, path)["requests"] == 2
+    finally:
+        bxclient.request({"op": "shutdown"}, path)
+        thread.join()
+        server.server_close()
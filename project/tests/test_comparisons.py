@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+import bx2tac
+import tac_interp
+
+# INT_MIN - 1 overflows: a comparison through a subtraction sees a positive difference
+OVERFLOW = """
+def main() {
+  var m = 1 << 63 : int;
+  bx_print_bool(b = (1 << 63) < 1);
+  bx_print_bool(b = m < 1);
+  bx_print_bool(b = m > 1);
+  bx_print_bool(b = 1 >= m);
+  bx_print_bool(b = m == 1 << 63);
+}
+"""
+
+
+def run(source: str, optimize: bool) -> str:
+    out = io.StringIO()
+    tac_interp.run(bx2tac.compile_source(source, optimize=optimize), out=out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("optimize", [True, False])
+def test_comparison_values_do_not_overflow(optimize):
+    assert run(OVERFLOW, optimize).split() == ["true", "true", "false", "true", "true"]
+
+
+# the same comparisons as conditions, which are lowered to jumps
+BRANCHES = """
+def main() {
+  var m = 1 << 63, n = 0, i = 0 : int;
+  if (m < 1) { n = n + 1; }
+  if (!(1 <= m) && m != 0) { n = n + 10; }
+  while (i > m && i < 3) { i = i + 1; }
+  if (~m > m || false) { n = n + 100; }
+  bx_print_int(x = n);
+  bx_print_int(x = i);
+}
+"""
+
+
+@pytest.mark.parametrize("optimize", [True, False])
+def test_conditions_do_not_overflow(optimize):
+    assert run(BRANCHES, optimize).split() == ["111", "3"]
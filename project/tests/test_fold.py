@@ -0,0 +1,79 @@
+import pytest
+
+import ast_types
+import ast_visitor
+import bxparser
+import fold
+from tac import MAX_INT, MIN_INT
+
+
+def expression(text: str) -> ast_types.Expression:
+    program = bxparser.parse("def f(x : int, b : bool) : int { var r = " + text + " : int; }\n"
+                             "def main() {}")
+    decl = next(node for node in ast_visitor.walk(program) if isinstance(node, ast_types.StatementVarDecl))
+    return decl.rvalues[0]
+
+
+IDENTITIES = [
+    ("x * 0", "0"), ("0 * x", "0"), ("x & 0", "0"), ("0 & x", "0"), ("x % 1", "0"),
+    ("x - x", "0"), ("x ^ x", "0"), ("(x + 1) - (x + 1)", "0"),
+    ("x + 0", "x"), ("0 + x", "x"), ("x - 0", "x"), ("x * 1", "x"), ("1 * x", "x"), ("x / 1", "x"),
+    ("x | 0", "x"), ("x ^ 0", "x"), ("x << 0", "x"), ("x >> 0", "x"),
+    ("-(-x)", "x"), ("~~x", "x"), ("!!b", "b"),
+    ("b && true", "b"), ("true && b", "b"), ("b || false", "b"), ("false || b", "b"),
+    ("b && false", "false"), ("false && b", "false"), ("true || b", "true"), ("b || true", "true"),
+    ("(x * 0 + 2) * x", "2 * x"),
+    # a call that would not be evaluated is dropped
+    ("false && f(x = x, b = b) > 0", "false"),
+    ("x - 1", "x - 1"), ("x * 2", "x * 2"),
+]
+
+
+@pytest.mark.parametrize("text, expected", IDENTITIES)
+def test_identities(text, expected):
+    folded = fold.fold(expression(text))
+    assert fold.same(folded, expression(expected)), ast_visitor.render(folded)
+
+
+# a call may have side effects, so its operand stays
+@pytest.mark.parametrize("text", ["f(x = x, b = b) * 0", "f(x = x, b = b) - f(x = x, b = b)",
+                                  "(f(x = x, b = b) > 0) && false"])
+def test_calls_are_kept(text):
+    folder = fold.Folder()
+    assert ast_visitor.render(folder.visit(expression(text))) == ast_visitor.render(expression(text))
+    assert folder.folded == 0
+
+
+VALUES = [
+    ("(1 << 62) + (1 << 62)", MIN_INT),
+    ("(1 << 63) + (1 << 63)", 0),
+    ("(1 << 63) - 1", MAX_INT),
+    ("(1 << 62) * 2", MIN_INT),
+    ("(1 << 62) * 4", 0),
+    ("3 * (1 << 63) + 1", MIN_INT + 1),
+    ("1 << 63", MIN_INT),
+    ("3 << 64", 3),
+    ("1 << 65", 2),
+    ("-(1 << 63)", MIN_INT),
+    ("-((1 << 63) - 1)", MIN_INT + 1),
+    ("(1 << 63) >> 63", -1),
+    ("(1 << 63) / -1", MIN_INT),
+    ("-7 / 2", -3),
+    ("7 / -2", -3),
+    ("-7 % 2", -1),
+    ("7 % -2", 1),
+    ("~0", -1),
+]
+
+
+@pytest.mark.parametrize("text, value", VALUES)
+def test_wraps_to_64_bits(text, value):
+    folded = fold.fold(expression(text))
+    assert isinstance(folded, ast_types.ExpressionInt) and folded.value == value
+
+
+@pytest.mark.parametrize("text", ["7 / 0", "7 % 0", "x / 0", "x % 0", "0 / 0", "x % (1 - 1)"])
+def test_division_by_zero_is_not_folded(text):
+    folded = fold.fold(expression(text))
+    assert isinstance(folded, ast_types.ExpressionBinOp) and folded.op in ("division", "modulus")
+    assert isinstance(folded.right, ast_types.ExpressionInt) and folded.right.value == 0
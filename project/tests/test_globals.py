@@ -0,0 +1,24 @@
+import io
+
+import pytest
+
+import bx2tac
+import tac_interp
+
+SOURCE = """
+var g = 1 + 2, h = -(4 << 1) * 3, m = (1 << 63) - 1 : int;
+var b = !(3 < 2) && true : bool;
+def main() { bx_print_int(x = g); bx_print_int(x = h); bx_print_int(x = m); bx_print_bool(b = b); }
+"""
+
+
+@pytest.mark.parametrize("optimize,workers", [(False, 0), (True, 0), (False, 2), (True, 2)])
+def test_constant_expressions_initialize_globals(optimize, workers):
+    out = io.StringIO()
+    tac_interp.run(bx2tac.compile_source(SOURCE, optimize=optimize, workers=workers), out=out)
+    assert out.getvalue().split() == ["3", "-24", "9223372036854775807", "true"]
+
+
+def test_globals_need_constant_initializers():
+    with pytest.raises(bx2tac.LoweringError, match="constant"):
+        bx2tac.compile_source("var g = f() : int; def f() : int { return 1; } def main() { }", optimize=False)
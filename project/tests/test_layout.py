@@ -0,0 +1,80 @@
+import pytest
+
+import ast_types
+import ast_visitor
+import bxparser
+import layout
+from ast_types import BXTypesBool, BXTypesInt, BXTypesListType, BXTypesPointer, BXTypesStruct, StructField
+
+INT, BOOL = BXTypesInt(), BXTypesBool()
+
+
+def struct(**fields) -> BXTypesStruct:
+    return BXTypesStruct([StructField(name, ty) for name, ty in fields.items()])
+
+
+POINT = struct(x=INT, next=BXTypesPointer(INT))
+CELL = struct(p=INT, q=BXTypesListType(2, INT))
+NESTED = struct(a=INT, b=BXTypesListType(2, BOOL), c=POINT, d=BXTypesListType(3, CELL))
+
+
+@pytest.mark.parametrize("ty, size, align", [
+    (INT, 8, 8), (BOOL, 8, 8), (BXTypesPointer(NESTED), 8, 8),
+    (BXTypesListType(3, INT), 24, 8), (BXTypesListType(0, INT), 0, 8),
+    (POINT, 16, 8), (CELL, 24, 8), (BXTypesListType(3, CELL), 72, 8), (NESTED, 112, 8),
+    (BXTypesListType(2, BXTypesListType(3, POINT)), 96, 8),
+    (struct(), 0, 1), (BXTypesListType(4, struct()), 0, 1), (struct(e=struct(), a=INT), 8, 8),
+])
+def test_sizes_and_alignment(ty, size, align):
+    assert (layout.sizeof(ty), layout.layout(ty).align) == (size, align)
+    assert layout.sizeof(ty) % align == 0
+
+
+def test_field_offsets():
+    assert {name: slot.offset for name, slot in layout.layout(NESTED).fields.items()} == \
+        {"a": 0, "b": 8, "c": 24, "d": 40}
+    assert layout.field(NESTED, "d").ty is BXTypesListType(3, CELL)
+    assert layout.field(struct(e=struct(), a=INT), "a").offset == 0
+
+
+@pytest.mark.parametrize("path, offset, ty", [
+    ((), 0, NESTED),
+    (("c", "next"), 32, BXTypesPointer(INT)),
+    (("b", 1), 16, BOOL),
+    (("d", 0), 40, CELL),
+    (("d", 2, "q", 1), 40 + 2 * 24 + 8 + 8, INT),
+])
+def test_offset_of_a_path(path, offset, ty):
+    assert layout.offset(NESTED, path) == (offset, ty)
+
+
+def test_strides():
+    assert layout.stride(BXTypesListType(3, CELL)) == 24
+    assert layout.stride(BXTypesPointer(NESTED)) == 112
+    with pytest.raises(TypeError):
+        layout.stride(NESTED)
+
+
+def test_errors():
+    with pytest.raises(TypeError):
+        layout.layout(BXTypesStruct([StructField("a", INT), StructField("a", BOOL)]))
+    with pytest.raises(TypeError):
+        layout.field(NESTED, "e")
+    with pytest.raises(IndexError):
+        layout.offset(NESTED, ("d", 3))
+    with pytest.raises(TypeError):
+        layout.offset(NESTED, ("a", 0))
+    with pytest.raises(TypeError):
+        layout.layout(ast_types.BXTypesVoid())
+
+
+def test_layouts_are_shared_by_equal_types():
+    assert layout.layout(struct(x=INT, next=BXTypesPointer(INT))) is layout.layout(POINT)
+
+
+def test_declared_struct():
+    program = bxparser.parse("def main() { type t = struct {a : int, b : bool[2], c : struct {x : int, next : int*},"
+                             " d : struct {p : int, q : int[2]}[3]}; }")
+    decl = next(node for node in ast_visitor.walk(program) if isinstance(node, ast_types.StatementTyDecl))
+    assert decl.ty is NESTED
+    assert layout.sizeof(decl.ty) == 112
@@ -0,0 +1,46 @@
+import io
+import re
+
+import pytest
+
+import bx2tac
+import bxparser
+import tac
+import tac_interp
+
+OVERLOADS = """
+def f(x : int) : int { return x + 1; }
+def f(x : int, b : bool) : int { if (b) { return x * 2; } return x; }
+def f(p : int*) : int { return 7; }
+def f(a : int[3]) : int { return 8; }
+def g(y : int) : int { return f(x = y) + f(x = y, b = true); }
+def main() { bx_print_int(x = g(y = 5)); }
+"""
+
+
+def test_overloads_resolve_and_get_symbol_names():
+    decls = bx2tac.program_to_tac(bxparser.parse(OVERLOADS))
+    names = [decl.name for decl in decls if isinstance(decl, tac.Proc)]
+    assert names == ["@f.int", "@f.int.bool", "@f.Pint", "@f.A3_int", "@g", "@main"]
+    assert all(re.fullmatch(r"@[A-Za-z0-9_.]+", name) for name in names)
+    out = io.StringIO()
+    tac_interp.run(decls, out=out)
+    assert out.getvalue() == "16\n"
+
+
+def test_mangled_types_are_distinct():
+    program = bxparser.parse("def main() { type s = struct {x : int, y : bool*}; type t = struct {xi : int[2]}; }")
+    types = [statement.ty for statement in program.procedures[0].block.statements]
+    assert [bx2tac.mangle(ty) for ty in types] == ["S1xint1yPbool_E", "S2xiA2_int_E"]
+
+
+def test_duplicate_overload():
+    program = bxparser.parse("def f(x : int) { } def f(y : int) { } def main() { }")
+    with pytest.raises(bx2tac.LoweringError, match="already defined"):
+        bx2tac.Signatures(program)
+
+
+def test_no_matching_overload():
+    program = bxparser.parse("def f(x : int) { } def main() { f(x = true); }")
+    with pytest.raises(bx2tac.LoweringError, match="Candidates are: f"):
+        bx2tac.program_to_tac(program)
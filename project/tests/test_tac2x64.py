@@ -0,0 +1,69 @@
+import io
+import itertools
+import shutil
+import subprocess
+
+import pytest
+
+import bx2tac
+import tac
+import tac2x64
+import tac_interp
+
+# 20 values live at once, across calls: more than the 10 allocatable registers
+PRESSURE = """
+def id(x : int) : int { return x; }
+def main() {
+  var {decls} : int;
+  var i = 0 : int;
+  while (i < 3) {
+    {updates}
+    i = i + 1;
+  }
+  bx_print_int(x = {total});
+}
+""".replace("{decls}", ", ".join(f"v{k} = {k}" for k in range(20))) \
+   .replace("{updates}", " ".join(f"v{k} = id(x = v{k} + v{(k + 1) % 20} + i);" for k in range(20))) \
+   .replace("{total}", " + ".join(f"v{k}" for k in range(20)))
+
+
+def procs(source):
+    return [decl for decl in bx2tac.compile_source(source) if isinstance(decl, tac.Proc)]
+
+
+def test_linear_scan_under_pressure():
+    main = procs(PRESSURE)[-1]
+    intervals = tac2x64.intervals(main)
+    assigned = tac2x64.linear_scan(main)
+    assert None in assigned.values(), "20 live values must spill"
+    for interval in intervals:
+        if interval.crosses_call and assigned[interval.temp] is not None:
+            assert assigned[interval.temp] in tac2x64.CALLEE_SAVED
+    for a, b in itertools.combinations(intervals, 2):
+        if a.start < b.end and b.start < a.end and assigned[a.temp] is not None:
+            assert assigned[a.temp] != assigned[b.temp], f"{a} and {b} share a register"
+
+
+def interpret(source) -> str:
+    out = io.StringIO()
+    tac_interp.run(bx2tac.compile_source(source), out=out)
+    return out.getvalue()
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="needs gcc to assemble and link")
+@pytest.mark.parametrize("naive", [False, True])
+def test_native_code_matches_the_interpreter(tmp_path, naive):
+    for n, source in enumerate([PRESSURE, """
+def f(a : int, b : int, c : int, d : int, e : int, f : int, g : int, h : int) : int {
+  return a - b * c + d / e - f % g + h;
+}
+def main() {
+  var m = 1 << 63 : int;
+  bx_print_int(x = f(a = 1, b = 2, c = 3, d = 40, e = 5, f = 17, g = 6, h = 8));
+  bx_print_bool(b = m < 1);
+  if (m - 1 > m) { bx_print_int(x = m - 1); }
+}
+"""]):
+        exe = str(tmp_path / f"p{n}")
+        tac2x64.build(bx2tac.compile_source(source), exe, naive)
+        assert subprocess.run([exe], capture_output=True, text=True, check=True).stdout == interpret(source)
@@ -0,0 +1,97 @@
+import pytest
+
+import tac
+import tac_cfg
+from tac import Instr
+
+
+def proc(*blocks, params=()) -> tac.Proc:
+    """A procedure whose block i opens with label i; each block is (instructions, successors).
+
+    Two successors must be a label to jump to and the next block, which is fallen into."""
+    body = []
+    for index, (instrs, succs) in enumerate(blocks):
+        body.append(Instr(tac.LABEL, None, index))
+        body += instrs
+        if not succs:
+            body.append(Instr(tac.RET))
+        elif len(succs) == 2:
+            target, = set(succs) - {index + 1}
+            body.append(Instr(tac.JZ, None, 0, target))
+        elif succs[0] != index + 1:
+            body.append(Instr(tac.JMP, None, succs[0]))
+    return tac.Proc("@f", list(params), body, temps=8, labels=len(blocks))
+
+
+def shape(*succs):
+    return tac_cfg.CFG(proc(*(([], s) for s in succs), params=[0]))
+
+
+SHAPES = {
+    # 0 -> 1, 2 -> 3
+    "diamond": (shape([1, 2], [3], [3], []),
+                [0, 0, 0, 0],
+                [set(), {3}, {3}, set()]),
+    # 1 is the outer loop's header, 2 the inner one's, 3 and 4 their latches
+    "nested loop": (shape([1], [2, 5], [3, 4], [2], [1], []),
+                    [0, 0, 1, 2, 2, 1],
+                    [set(), {1}, {1, 2}, {2}, {1}, set()]),
+    # the loop 1 <-> 2 is entered at both blocks, so neither dominates the other
+    "irreducible": (shape([1, 2], [2], [1, 3], []),
+                    [0, 0, 0, 2],
+                    [set(), {2}, {1}, set()]),
+    # 1 is unreachable but falls into 2
+    "unreachable": (shape([2], [2], []),
+                    [0, None, 0],
+                    [set(), set(), set()]),
+}
+
+
+@pytest.mark.parametrize("cfg, idom, frontier", SHAPES.values(), ids=SHAPES.keys())
+def test_dominators_and_frontiers(cfg, idom, frontier):
+    assert tac_cfg.dominators(cfg) == idom
+    assert tac_cfg.frontiers(cfg, idom) == frontier
+
+
+def test_shapes_are_as_drawn():
+    assert [block.succs for block in SHAPES["irreducible"][0]] == [[2, 1], [2], [1, 3], []]
+    assert sorted(SHAPES["unreachable"][0].reverse_postorder()) == [0, 2]
+    assert tac_cfg.dominator_tree(SHAPES["nested loop"][1]) == [[1], [2, 5], [3, 4], [], [], []]
+
+
+def nested_loop() -> tac_cfg.CFG:
+    """i (%0) counts up to n (%1) around an inner loop that prints copies of i."""
+    return tac_cfg.CFG(proc(
+        ([Instr(tac.CONST, 0, 0), Instr(tac.CONST, 1, 3)], [1]),
+        ([Instr(tac.LT, 2, 0, 1)], [2, 5]),  # jz %0 stands in for jz %2
+        ([], [3, 4]),
+        ([Instr(tac.COPY, 4, 0), Instr(tac.PRINT, None, 4)], [2]),
+        ([Instr(tac.ADD, 0, 0, 1)], [1]),
+        ([Instr(tac.PRINT, None, 0)], []),
+    ))
+
+
+def test_liveness():
+    live_in, live_out = tac_cfg.liveness(nested_loop())
+    assert live_in == [set(), {0, 1}, {0, 1}, {0, 1}, {0, 1}, {0}]
+    assert live_out == [{0, 1}, {0, 1}, {0, 1}, {0, 1}, {0, 1}, set()]
+
+
+def test_liveness_of_an_unreachable_block():
+    cfg = tac_cfg.CFG(proc(([Instr(tac.CONST, 0, 1)], [2]), ([Instr(tac.PRINT, None, 3)], [2]),
+                           ([Instr(tac.PRINT, None, 0)], [])))
+    assert tac_cfg.liveness(cfg) == ([set(), {0, 3}, {0}], [{0}, {0}, set()])
+
+
+def test_interference():
+    graph = tac_cfg.interference(nested_loop())
+    # %4 is a copy of %0, so they do not interfere although %0 is live when %4 is written
+    assert graph == {0: {1, 2}, 1: {0, 2, 4}, 2: {0, 1}, 4: {1}}
+
+
+def test_parameters_interfere_with_each_other():
+    cfg = tac_cfg.CFG(proc(([Instr(tac.CONST, 3, 1), Instr(tac.ADD, 4, 0, 3), Instr(tac.PRINT, None, 4)], []),
+                           params=[0, 1, 2]))
+    graph = tac_cfg.interference(cfg)
+    assert graph[0] == {1, 2, 3} and graph[1] == {0, 2} and graph[2] == {0, 1}
+    assert graph[4] == set()
@@ -0,0 +1,152 @@
+import copy
+import io
+
+import pytest
+
+import bx2tac
+import tac
+import tac_interp
+import tac_opt
+from tac import Instr
+
+LOOPS = """
+def fib(n : int) : int {
+  var a = 0, b = 1, i = 0 : int;
+  while (i < n) {
+    var t = a : int;
+    a = b;
+    b = t + b;
+    i = i + 1;
+  }
+  return a;
+}
+def main() {
+  var i = 0, total = 0 : int;
+  while (i < 10) {
+    var j = i, k = 0 : int;
+    while (k < j) {
+      total = total + k * j;
+      if (total % 3 == 0) { j = j - 1; } else { k = k + 1; }
+    }
+    bx_print_int(x = total);
+    i = i + 1;
+  }
+  bx_print_int(x = fib(n = 40));
+}
+"""
+
+# values kept across calls, and copies of them made before and after
+CALLS = """
+def twice(x : int) : int { return x + x; }
+def main() {
+  var a = 3, b = 4, c = 5 : int;
+  var d = a : int;
+  var e = twice(x = b) : int;
+  var f = c : int;
+  c = twice(x = e);
+  bx_print_int(x = a + b + c + d + e + f);
+  bx_print_int(x = twice(x = d) + twice(x = f));
+}
+"""
+
+
+def const(dst, value):
+    return Instr(tac.CONST, dst, value)
+
+
+def redefined_source() -> tac.Proc:
+    """y is a copy of x, taken before and inside a loop that doubles x; y must keep the old value."""
+    return tac.Proc("@main", [], [
+        const(0, 1), const(3, 3), const(4, 1), const(5, 0),
+        Instr(tac.COPY, 1, 0),
+        Instr(tac.LABEL, None, 0),
+        Instr(tac.PRINT, None, 1),
+        Instr(tac.COPY, 1, 0),
+        Instr(tac.ADD, 0, 0, 0),
+        Instr(tac.PRINT, None, 1),
+        Instr(tac.ADD, 5, 5, 4),
+        Instr(tac.LT, 6, 5, 3),
+        Instr(tac.JNZ, None, 6, 0),
+        Instr(tac.PRINT, None, 0),
+        Instr(tac.PRINT, None, 1),
+        Instr(tac.RET),
+    ], temps=7, labels=1)
+
+
+def live_across_call() -> list:
+    """%1 is a copy of a parameter kept over a call whose result lands in a fresh temporary."""
+    inc = tac.Proc("@inc", [0], [const(1, 1), Instr(tac.ADD, 2, 0, 1), Instr(tac.RET, None, 2)], temps=3)
+    main = tac.Proc("@main", [], [
+        const(0, 10),
+        Instr(tac.COPY, 1, 0),
+        Instr(tac.PARAM, None, 1, 1),
+        Instr(tac.CALL, 2, "@inc", 1),
+        Instr(tac.COPY, 3, 2),
+        Instr(tac.PARAM, None, 1, 3),
+        Instr(tac.CALL, 4, "@inc", 1),
+        Instr(tac.SUB, 5, 4, 1),
+        Instr(tac.PRINT, None, 5),
+        Instr(tac.PRINT, None, 1),
+        Instr(tac.RET),
+    ], temps=6)
+    return [inc, main]
+
+
+def output(decls) -> str:
+    out = io.StringIO()
+    tac_interp.run(decls, out=out)
+    return out.getvalue()
+
+
+PASSES = {
+    "propagate": [tac_opt.propagate_copies],
+    "propagate, remove": [tac_opt.propagate_copies, tac_opt.remove_dead_copies],
+    "renumber": [tac_opt.renumber_temps],
+    "all": [tac_opt.optimize],
+}
+
+
+def programs():
+    yield "loops", bx2tac.compile_source(LOOPS, optimize=False)
+    yield "calls", bx2tac.compile_source(CALLS, optimize=False)
+    yield "redefined source", [redefined_source()]
+    yield "live across call", live_across_call()
+
+
+@pytest.mark.parametrize("passes", PASSES.values(), ids=PASSES.keys())
+def test_passes_keep_the_output(passes):
+    for name, decls in programs():
+        expected = output(decls)
+        optimized = copy.deepcopy(decls)
+        for decl in optimized:
+            if isinstance(decl, tac.Proc):
+                for run_pass in passes:
+                    run_pass(decl)
+        assert output(optimized) == expected, name
+
+
+def test_redefined_source_is_not_propagated():
+    proc = redefined_source()
+    assert output([proc]).split() == ["1", "1", "1", "2", "2", "4", "8", "4"]
+    tac_opt.propagate_copies(proc)
+    # the prints of y read y still: x has been doubled by the time either runs
+    assert [instr.a for instr in proc.body if instr.op == tac.PRINT] == [1, 1, 0, 1]
+
+
+def test_passes_do_something():
+    main = live_across_call()[1]
+    assert tac_opt.propagate_copies(main) == 4
+    assert tac_opt.remove_dead_copies(main) == 2
+    assert not any(instr.op == tac.COPY for instr in main.body)
+    decls = bx2tac.compile_source(LOOPS, optimize=False)
+    stats = tac_opt.optimize_program(decls)
+    assert stats["temps after"] < stats["temps before"]
+
+
+def test_renumbering_keeps_values_live_across_calls_apart():
+    main = live_across_call()[1]
+    tac_opt.renumber_temps(main)
+    kept = main.body[0].dst
+    results = [instr.dst for instr in main.body if instr.op == tac.CALL]
+    assert kept not in results
+    assert output(live_across_call()) == output([live_across_call()[0], main])
@@ -0,0 +1,136 @@
+import io
+
+import pytest
+
+import bx2tac
+import tac
+import tac_interp
+import tac_opt
+import tac_ssa
+from tac import Instr
+
+# copy propagation on the SSA form turns these loops into the swap and lost-copy shapes
+SWAP = """
+def main() {
+  var a = 1, b = 2, i = 0 : int;
+  while (i < 5) {
+    var t = a : int;
+    a = b;
+    b = t;
+    bx_print_int(x = a);
+    i = i + 1;
+  }
+  bx_print_int(x = a * 10 + b);
+}
+"""
+
+LOST_COPY = """
+def main() {
+  var x = 1, y = 0 : int;
+  while (x < 4) {
+    y = x;
+    x = x + 1;
+  }
+  bx_print_int(x = y);
+  bx_print_int(x = x);
+}
+"""
+
+CALLS = """
+def fib(n : int) : int {
+  if (n < 2) { return n; }
+  return fib(n = n - 1) + fib(n = n - 2);
+}
+def main() {
+  var i = 0 : int;
+  while (i < 10) {
+    var j = i : int;
+    while (j > 0) {
+      if (j % 2 == 0) { j = j / 2; } else { j = j - 1; }
+    }
+    bx_print_int(x = fib(n = i) + j);
+    i = i + 1;
+  }
+}
+"""
+
+
+def output(decls) -> str:
+    out = io.StringIO()
+    tac_interp.run(decls, out=out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+@pytest.mark.parametrize("source", [SWAP, LOST_COPY, CALLS], ids=["swap", "lost copy", "calls"])
+def test_round_trip_keeps_the_output(source, optimize):
+    decls = bx2tac.compile_source(source, optimize=optimize)
+    expected = output(decls)
+    phis = 0
+    for proc in decls:
+        if isinstance(proc, tac.Proc):
+            phis += tac_ssa.to_ssa(proc)
+            assert tac_ssa.is_ssa(proc)
+            tac_opt.propagate_copies(proc)
+            tac_ssa.from_ssa(proc)
+            assert not any(instr.op == tac.PHI for instr in proc.body)
+    assert phis
+    assert output(decls) == expected
+
+
+def swap() -> tac.Proc:
+    """a (%3) and b (%4) swap every time round the loop: each phi reads the other's destination,
+    on an edge from a block with two successors to one with two predecessors."""
+    return tac.Proc("@main", [], [
+        Instr(tac.LABEL, None, 0),
+        Instr(tac.CONST, 0, 1), Instr(tac.CONST, 1, 2), Instr(tac.CONST, 2, 0),
+        Instr(tac.CONST, 8, 1), Instr(tac.CONST, 9, 3),
+        Instr(tac.LABEL, None, 1),
+        Instr(tac.PHI, 3, [(0, 0), (1, 4)]),
+        Instr(tac.PHI, 4, [(0, 1), (1, 3)]),
+        Instr(tac.PHI, 5, [(0, 2), (1, 6)]),
+        Instr(tac.PRINT, None, 3),
+        Instr(tac.ADD, 6, 5, 8),
+        Instr(tac.LT, 7, 6, 9),
+        Instr(tac.JNZ, None, 7, 1),
+        Instr(tac.LABEL, None, 2),
+        Instr(tac.PRINT, None, 3),
+        Instr(tac.PRINT, None, 4),
+        Instr(tac.RET),
+    ], temps=10, labels=3)
+
+
+def lost_copy() -> tac.Proc:
+    """x (%1) is read after the loop, where the value for the next round (%2) has been computed:
+    a copy into %1 at the end of the loop body would be seen."""
+    return tac.Proc("@main", [], [
+        Instr(tac.LABEL, None, 0),
+        Instr(tac.CONST, 0, 1), Instr(tac.CONST, 8, 1), Instr(tac.CONST, 9, 4),
+        Instr(tac.LABEL, None, 1),
+        Instr(tac.PHI, 1, [(0, 0), (1, 2)]),
+        Instr(tac.ADD, 2, 1, 8),
+        Instr(tac.LT, 3, 2, 9),
+        Instr(tac.JNZ, None, 3, 1),
+        Instr(tac.LABEL, None, 2),
+        Instr(tac.PRINT, None, 1),
+        Instr(tac.RET),
+    ], temps=10, labels=3)
+
+
+@pytest.mark.parametrize("make, expected", [(swap, ["1", "2", "1", "1", "2"]), (lost_copy, ["3"])],
+                         ids=["swap", "lost copy"])
+def test_from_ssa_splits_the_critical_edge(make, expected):
+    proc = make()
+    assert tac_ssa.is_ssa(proc)
+    assert tac_ssa.from_ssa(proc) == 1
+    assert output([proc]).split() == expected
+
+
+def test_from_ssa_copies_in_parallel():
+    proc = swap()
+    temps = proc.temps
+    tac_ssa.from_ssa(proc)
+    # the swap needs somewhere to keep one value: fresh temporaries hold the sources
+    assert proc.temps > temps
+    tac_opt.optimize(proc)
+    assert output([proc]).split() == ["1", "2", "1", "1", "2"]
@@ -0,0 +1,55 @@
+import pytest
+
+import bx2tac
+import tac
+import tacbin
+from tac import Instr
+
+SOURCE = """
+var g = -5 : int;
+var flag = true : bool;
+def f(x : int, b : bool) : int { if (b && x < g) { return x * 2; } return x - 1; }
+def main() {
+  var i = 0 : int;
+  while (i < 4) { g = f(x = i, b = flag); i = i + 1; }
+  bx_print_int(x = g);
+}
+"""
+
+
+def program():
+    # every kind of operand: named temporaries, globals, the extreme ints, no result, no operands
+    special = tac.Proc("@special", ["%p", 0], [
+        Instr(tac.CONST, 1, tac.MIN_INT), Instr(tac.CONST, "%max", tac.MAX_INT),
+        Instr(tac.COPY, "@g", "%p"), Instr(tac.LT, 2, "%max", 1), Instr(tac.LABEL, None, 3),
+        Instr(tac.JNZ, None, 2, 3), Instr(tac.PARAM, None, 1, "@g"), Instr(tac.CALL, None, "@f", 1),
+        Instr(tac.NOP), Instr(tac.RET)], temps=3, labels=4)
+    return bx2tac.compile_source(SOURCE) + [special]
+
+
+def test_round_trip(tmp_path):
+    decls = program()
+    for path in (tmp_path / "p.tacb", tmp_path / "p.json"):
+        tacbin.save(decls, str(path))
+        assert tacbin.is_binary(str(path)) == path.name.endswith(".tacb")
+        assert tac.to_json(tacbin.load(str(path))) == tac.to_json(decls)
+    assert tac.to_json(tacbin.loads(tacbin.dumps(decls))) == tac.to_json(decls)
+
+
+def test_procedures_are_read_one_at_a_time(tmp_path):
+    decls = program()
+    procs = [decl for decl in decls if isinstance(decl, tac.Proc)]
+    path = str(tmp_path / "p.tacb")
+    tacbin.write(decls, path)
+    with tacbin.TacFile(path) as tac_file:
+        assert tac_file.names() == [proc.name for proc in procs]
+        assert [var.to_json() for var in tac_file.globals] == [decl.to_json() for decl in decls[:2]]
+        last = tac_file["@special"]
+        assert last.to_json() == procs[-1].to_json() and (last.temps, last.labels) == (3, 4)
+        assert tac_file[0].to_json() == procs[0].to_json()
+
+
+def test_phi_has_no_binary_form():
+    proc = tac.Proc("@p", [], [Instr(tac.PHI, 0, [(1, 2)]), Instr(tac.RET)])
+    with pytest.raises(ValueError, match="phi"):
+        tacbin.dumps([proc])
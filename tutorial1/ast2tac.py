@@ -1,84 +1,140 @@
 import functions
 import classes
 import json
+import json_stream
+import os
 import sys
 
-ops_dict = {"addition": "add", "substraction": "sub", "multiplication": "mul", "division": "div",
-            "modulus": "mod", "bitwise-xor": "xor", "bitwise-or": "or", "bitwise-and": "and",
-            "opposite": "neg", "bitwise-negation": "not", "left-shift": "shl", "right-shift": "shr",
-            "double-equals": "eqeq"}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "project"))
+import tac  # noqa: E402
+import tac_opt  # noqa: E402
+import tacbin  # noqa: E402
 
 
-def expr_to_tac(expr, tac, counter, variables):
-    if isinstance(expr, classes.ExpressionVar):
-        if expr.name in variables:
-            tac[0]["body"].append({"opcode": "copy", "args": [variables[expr.name]], "result": f'%{counter}'})
+def expr_to_tac(expr, proc, variables):
+    """Lowers expr at the end of proc and returns the temporary holding its value."""
+    # post-order walk with an explicit stack; results holds the temporary of every finished subexpression
+    stack = [(expr, False)]
+    results = []
+    while stack:
+        expr, children_done = stack.pop()
+        if isinstance(expr, classes.ExpressionVar):
+            result = proc.new_temp()
+            if expr.name not in variables:
+                variables[expr.name] = result
+            proc.emit(tac.COPY, result, variables[expr.name])
+        elif isinstance(expr, classes.ExpressionInt):
+            result = proc.emit(tac.CONST, proc.new_temp(), expr.value)
+        elif isinstance(expr, classes.ExpressionUniOp):
+            if not children_done:
+                stack.append((expr, True))
+                stack.append((expr.argument, False))
+                continue
+            argument = results.pop()
+            result = proc.emit(tac.AST_OPERATORS[expr.operator], proc.new_temp(), argument)
+        elif isinstance(expr, classes.ExpressionBinOp):
+            if not children_done:
+                stack.append((expr, True))
+                stack.append((expr.right_argument, False))
+                stack.append((expr.left_argument, False))
+                continue
+            right = results.pop()
+            left = results.pop()
+            result = proc.emit(tac.AST_OPERATORS[expr.operator], proc.new_temp(), left, right)
         else:
-            variables[expr.name] = f'%{counter}'
-            tac[0]["body"].append({"opcode": "copy", "args": [variables[expr.name]], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionInt):
-        tac[0]["body"].append({"opcode": "copy", "args": [expr.value], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionUniOp):
-        tac, counter, variables = expr_to_tac(expr.argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": ops_dict[expr.operator], "args": [f'%{counter - 1}'], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionBinOp):
-        tac, counter, variables = expr_to_tac(expr.left_argument, tac, counter, variables)
-        c = counter
-        tac, counter, variables = expr_to_tac(expr.right_argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": ops_dict[expr.operator], "args": [f'%{c - 1}, %{counter - 1}'], "result": f'%{counter}'})
-        counter += 1
-    return tac, counter, variables
-
-
-def stmt_to_tac(stmt, tac, counter, variables):
+            raise ValueError(f'Cannot lower expression {expr}')
+        results.append(result)
+    return results[0]
+
+
+def stmt_to_tac(stmt, proc, variables):
     if isinstance(stmt, classes.StatementVarDecl):
         # in this tutorial variables are always initialized to a constant
-        tac[0]["body"].append({"opcode": "copy", "args": [stmt.init], "result": f'%{counter}'})
-        variables[stmt.name] = f'%{counter}'
-        counter += 1
+        variables[stmt.name] = proc.emit(tac.CONST, proc.new_temp(), stmt.init)
     elif isinstance(stmt, classes.StatementAssign):
         # we assume that lvalue is a variable
-        tac, counter, variables = expr_to_tac(stmt.rvalue, tac, counter, variables)
+        value = expr_to_tac(stmt.rvalue, proc, variables)
         if stmt.lvalue.name not in variables:
             print(f"Assigning a non-declared variable {stmt.lvalue.name}!")
         else:
-            variables[stmt.lvalue.name] = f'%{counter}'
-            tac[0]["body"].append({"opcode": "copy", "args": [f'%{counter - 1}'], "result": f'%{counter}'})
-            counter += 1
+            variables[stmt.lvalue.name] = proc.emit(tac.COPY, proc.new_temp(), value)
     elif isinstance(stmt, classes.StatementPrint):
-        tac, counter, variables = expr_to_tac(stmt.argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": "print", "args": [f'%{counter - 1}'], "result": None})
-    return tac, counter, variables
+        proc.emit(tac.PRINT, None, expr_to_tac(stmt.argument, proc, variables))
 
 
-def compiler(json_file_path):
+def compiler(json_file_path, tac_file_path="tac_file.json"):
     """json_file is the .json file representing the BX program to compile
     The AST is in the 'ast' filed of the first json object in this file.
     For this tutorial, the whole program is written within a single function
-    main() which takes no arguments."""
+    main() which takes no arguments.
+    The TAC is written in binary when tac_file_path ends with .tacb."""
     # getting the AST
     with open(json_file_path, 'r') as fp:
         js_obj = json.load(fp)
     ast = js_obj["ast"][0][1]["body"]
 
-    counter = 0  # to keep track of the first register that is surely free
     variables = dict()
-    tac = [{"proc": "@main", "body": []}]
+    proc = tac.Proc("@main")
 
     for stmt in ast:
         stmt_obj = functions.json_to_stmt(stmt)
         print(stmt[0])
-        tac, counter, variables = stmt_to_tac(stmt_obj, tac, counter, variables)
+        stmt_to_tac(stmt_obj, proc, variables)
 
-    with open("tac_file.json", 'w') as f:
-        json.dump(tac, f)
+    tac_opt.optimize(proc)
+    tacbin.save([proc], tac_file_path)
 
     print(variables)
 
 
-print(sys.argv)
-json_file = sys.argv[1]
-compiler(json_file)
+def compiler_stream(json_file_path, tac_file_path="tac_file.json"):
+    """Same as compiler, but the statements are decoded, lowered and written
+    one at a time, so only the current statement and its TAC are in memory.
+    The output file is compiler's without the tac_opt passes, which need the
+    whole procedure."""
+    if tac_file_path.endswith(".tacb"):
+        return compiler_stream_binary(json_file_path, tac_file_path)
+    variables = dict()
+    proc = tac.Proc("@main")
+
+    with open(json_file_path, 'r') as fp, open(tac_file_path, 'w') as out:
+        out.write('[{"proc": "@main", "args": [], "body": [')
+        first = True
+        for stmt in json_stream.iter_array(fp, ["ast", 0, 1, "body"]):
+            stmt_obj = functions.json_to_stmt(stmt)
+            stmt_to_tac(stmt_obj, proc, variables)
+            for instr in proc.body:
+                if not first:
+                    out.write(", ")
+                first = False
+                out.write(json.dumps(instr.to_json()))
+            proc.body.clear()
+        out.write("]}]")
+
+    print(variables, file=sys.stderr)
+
+
+def compiler_stream_binary(json_file_path, tac_file_path):
+    variables = dict()
+    proc = tac.Proc("@main")
+
+    with open(json_file_path, 'r') as fp, open(tac_file_path, 'wb') as out:
+        writer = tacbin.TacWriter(out)
+        for stmt in json_stream.iter_array(fp, ["ast", 0, 1, "body"]):
+            stmt_obj = functions.json_to_stmt(stmt)
+            stmt_to_tac(stmt_obj, proc, variables)
+            writer.write_instrs(proc.body)
+            proc.body.clear()
+        writer.end_proc(proc, 0)
+        writer.close()
+
+    print(variables, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    print(sys.argv)
+    if "--stream" in sys.argv:
+        sys.argv.remove("--stream")
+        compiler_stream(*sys.argv[1:3])
+    else:
+        compiler(*sys.argv[1:3])
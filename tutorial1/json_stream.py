@@ -0,0 +1,162 @@
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+NESTED = re.compile(r'["\[\]{}]')
+STRING_END = re.compile(r'"|\\.?', re.DOTALL)
+SCALAR_END = re.compile(r'[\s,:\]}]')
+NUMBER_GOES_ON = set("0123456789.eE+-")
+DECODER = json.JSONDecoder()
+
+
+class JSONStream:
+    """Reads one JSON document from a file a chunk at a time.
+
+    Only the part of the document being decoded is kept in memory: values that
+    are not on the requested path are scanned over without being built, and the
+    elements of the target array are decoded one by one."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=0):
+        # read at least one more chunk, dropping what was already consumed
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def _error(self, message):
+        return ValueError(f"Malformed JSON: {message}")
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise self._error("unexpected end of file")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise self._error(f"expected '{char}' but found '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def _value_end(self):
+        """Offset just after the value starting at self.pos, found without decoding it."""
+        first = self._peek()
+        if first == '"':
+            depth, pattern = 0, STRING_END
+        elif first in "[{":
+            depth, pattern = 1, NESTED
+        else:
+            depth, pattern = 0, SCALAR_END
+        end = self.pos + 1
+        while True:
+            match = pattern.search(self.buf, end)
+            if match is None:
+                start = self.pos
+                if not self._fill():
+                    if pattern is SCALAR_END:
+                        return len(self.buf)  # a number at the very end of the document
+                    raise self._error("unexpected end of file")
+                end -= start
+                continue
+            char = match.group()
+            end = match.end()
+            if pattern is SCALAR_END:
+                return end - 1
+            if char == '"':
+                if pattern is STRING_END:
+                    if depth == 0:
+                        return end
+                    pattern = NESTED
+                else:
+                    pattern = STRING_END
+            elif char[0] == "\\":
+                if len(char) == 1:
+                    end -= 1  # escape at the end of the buffer, read on
+                    start = self.pos
+                    if not self._fill():
+                        raise self._error("unexpected end of file")
+                    end -= start
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return end
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buf, self.pos)
+                # a value ending with the buffer may go on in the next chunk, and so may a number
+                # followed by what can continue it (decoded as 1 from "1." or "1e", say)
+                goes_on = end == len(self.buf) or type(value) in (int, float) and self.buf[end] in NUMBER_GOES_ON
+                if self.eof or not goes_on:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise self._error(error.msg) from None
+            # doubling what is buffered keeps retries linear in the size of the value
+            self._fill(len(self.buf) - self.pos)
+
+    def skip(self):
+        self.pos = self._value_end()
+
+    def _enter(self, step):
+        if isinstance(step, int):
+            self._expect("[")
+            for _ in range(step):
+                if self._peek() == "]":
+                    raise IndexError(f"array index {step} out of range")
+                self.skip()
+                self._expect(",")
+            if self._peek() == "]":
+                raise IndexError(f"array index {step} out of range")
+            return
+        self._expect("{")
+        while self._peek() != "}":
+            key = self.value()
+            self._expect(":")
+            if key == step:
+                return
+            self.skip()
+            if self._peek() == ",":
+                self.pos += 1
+        raise KeyError(step)
+
+    def items(self, path):
+        """Decodes the elements of the array found by following path (keys and indices) one at a time."""
+        for step in path:
+            self._enter(step)
+        self._expect("[")
+        if self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._peek() == "]":
+                self.pos += 1
+                return
+            self._expect(",")
+
+
+def iter_array(fp, path, chunk_size=CHUNK_SIZE):
+    return JSONStream(fp, chunk_size).items(path)
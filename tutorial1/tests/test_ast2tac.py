@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+import ast2tac
+import tac_interp
+import tacbin
+
+
+def var(name):
+    return ["<expression:var>", {"name": ["<name>", {"value": name}]}]
+
+
+def integer(value):
+    return ["<expression:int>", {"value": value}]
+
+
+BODY = [
+    ["<statement:vardecl>", {"name": ["<name>", {"value": "x"}], "type": ["<type:int>", {}], "init": integer(3)}],
+    ["<statement:assign>", {"lvalue": ["<lvalue:var>", {"name": ["<name>", {"value": "x"}]}],
+                            "rvalue": ["<expression:binop>", {"operator": ["<operator>", {"value": "addition"}],
+                                                              "left": var("x"), "right": integer(4)}]}],
+    ["<statement:eval>", {"expression": ["<expression:call>", {"arguments": [var("x")]}]}],
+]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".tacb"])
+def test_streaming_prints_nothing_on_stdout(tmp_path, capsys, suffix):
+    source = tmp_path / "prog.json"
+    source.write_text(json.dumps({"ast": [["<decl:proc>", {"name": "main", "body": BODY}]]}))
+    output = str(tmp_path / ("prog.tac" + suffix))
+    ast2tac.compiler_stream(str(source), output)
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "'x'" in captured.err
+    out = io.StringIO()
+    tac_interp.run(tacbin.load(output), out=out)
+    assert out.getvalue() == "7\n"
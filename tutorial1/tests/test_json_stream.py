@@ -0,0 +1,20 @@
+import io
+import json
+
+import pytest
+
+import json_stream
+
+DOCUMENT = {"ast": [[1.5e3, 22], -0.25, 1E-7, 12345678901234567890, True, None, "x\\\"y", {"k": [3.0e+2]}, []]}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 9, 27, 29, 1 << 16])
+def test_items_at_every_chunk_size(chunk_size):
+    text = json.dumps(DOCUMENT)
+    assert list(json_stream.iter_array(io.StringIO(text), ["ast"], chunk_size)) == DOCUMENT["ast"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 9, 27, 29])
+def test_numbers_cut_after_dot_or_exponent(chunk_size):
+    text = '{"skip": [0.5, {"a": "]"}], "ast": [1.5e3, 22, 7.25, 1e10, -3]}'
+    assert list(json_stream.iter_array(io.StringIO(text), ["ast"], chunk_size)) == [1500.0, 22, 7.25, 1e10, -3]
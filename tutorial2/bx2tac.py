@@ -1,82 +1,91 @@
 import functions
 import classes
-import json
+import os
 import sys
 import lexer
 import parser
 
-ops_dict = {"addition": "add", "subtraction": "sub", "multiplication": "mul", "division": "div",
-            "modulus": "mod", "bitwise-xor": "xor", "bitwise-or": "or", "bitwise-and": "and",
-            "opposite": "neg", "bitwise-negation": "not", "left-shift": "shl", "right-shift": "shr",
-            "double-equals": "eqeq"}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "project"))
+import tac  # noqa: E402
+import tac_opt  # noqa: E402
+import tacbin  # noqa: E402
 
 temp_map = dict()
 
 
-def expr_to_tac(expr, tac, counter, variables):
-    if isinstance(expr, classes.ExpressionVar):
-        if expr.name in variables:
-            tac[0]["body"].append({"opcode": "copy", "args": [variables[expr.name]], "result": f'%{counter}'})
+def expr_to_tac(expr, proc, variables):
+    """Lowers expr at the end of proc and returns the temporary holding its value."""
+    # post-order walk with an explicit stack; results holds the temporary of every finished subexpression
+    stack = [(expr, False)]
+    results = []
+    while stack:
+        expr, children_done = stack.pop()
+        if isinstance(expr, classes.ExpressionVar):
+            result = proc.new_temp()
+            if expr.name not in variables:
+                variables[expr.name] = result
+            proc.emit(tac.COPY, result, variables[expr.name])
+        elif isinstance(expr, classes.ExpressionInt):
+            result = proc.emit(tac.CONST, proc.new_temp(), expr.value)
+        elif isinstance(expr, classes.ExpressionUniOp):
+            if not children_done:
+                stack.append((expr, True))
+                stack.append((expr.argument, False))
+                continue
+            argument = results.pop()
+            result = proc.emit(tac.AST_OPERATORS[expr.operator], proc.new_temp(), argument)
+        elif isinstance(expr, classes.ExpressionBinOp):
+            if not children_done:
+                stack.append((expr, True))
+                stack.append((expr.right_argument, False))
+                stack.append((expr.left_argument, False))
+                continue
+            right = results.pop()
+            left = results.pop()
+            result = proc.emit(tac.AST_OPERATORS[expr.operator], proc.new_temp(), left, right)
         else:
-            variables[expr.name] = f'%{counter}'
-            tac[0]["body"].append({"opcode": "copy", "args": [variables[expr.name]], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionInt):
-        tac[0]["body"].append({"opcode": "copy", "args": [expr.value], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionUniOp):
-        tac, counter, variables = expr_to_tac(expr.argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": ops_dict[expr.operator], "args": [f'%{counter - 1}'], "result": f'%{counter}'})
-        counter += 1
-    elif isinstance(expr, classes.ExpressionBinOp):
-        tac, counter, variables = expr_to_tac(expr.left_argument, tac, counter, variables)
-        c = counter
-        tac, counter, variables = expr_to_tac(expr.right_argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": ops_dict[expr.operator], "args": [f'%{c - 1}, %{counter - 1}'], "result": f'%{counter}'})
-        counter += 1
-    return tac, counter, variables
+            raise ValueError(f'Cannot lower expression {expr}')
+        results.append(result)
+    return results[0]
 
 
-def stmt_to_tac(stmt, tac, counter, variables):
+def stmt_to_tac(stmt, proc, variables):
     if isinstance(stmt, classes.StatementVarDecl):
         # in this tutorial variables are always initialized to a constant
-        tac[0]["body"].append({"opcode": "copy", "args": [stmt.init], "result": f'%{counter}'})
-        variables[stmt.variable.name] = f'%{counter}'
-        counter += 1
+        variables[stmt.variable.name] = proc.emit(tac.CONST, proc.new_temp(), stmt.init)
     elif isinstance(stmt, classes.StatementAssign):
         # we assume that lvalue is a variable
-        tac, counter, variables = expr_to_tac(stmt.rvalue, tac, counter, variables)
+        value = expr_to_tac(stmt.rvalue, proc, variables)
         if stmt.lvalue.name not in variables:
             print(f"Line {stmt.lineno}: Error: Assigning to a non-declared variable {stmt.lvalue.name}.")
         else:
-            tac[0]["body"].append({"opcode": "copy", "args": [f'%{counter - 1}'], "result": f'{variables[stmt.lvalue.name]}'})
+            proc.emit(tac.COPY, variables[stmt.lvalue.name], value)
     elif isinstance(stmt, classes.StatementPrint):
-        tac, counter, variables = expr_to_tac(stmt.argument, tac, counter, variables)
-        tac[0]["body"].append({"opcode": "print", "args": [f'%{counter - 1}'], "result": None})
-    return tac, counter, variables
+        proc.emit(tac.PRINT, None, expr_to_tac(stmt.argument, proc, variables))
 
 
-def compiler(bx_file_path):
+def compiler(bx_file_path, tac_file_path="tac_file.json"):
     """json_file is the .json file representing the BX program to compile
     The AST is in the 'ast' filed of the first json object in this file.
     For this tutorial, the whole program is written within a single function
-    main() which takes no arguments."""
+    main() which takes no arguments.
+    The TAC is written in binary when tac_file_path ends with .tacb."""
     # getting the AST
     with open(bx_file_path, 'r') as f:
         code = f.read()
     ast = parser.parser.parse(code, lexer=lexer.lexer)
 
-    counter = 0  # to keep track of the first register that is surely free
-    tac = [{"proc": "@main", "body": []}]
+    variables = dict()
+    proc = tac.Proc("@main")
 
     for stmt in ast.stmts:
-        tac, counter, variables = stmt_to_tac(stmt, tac, counter, variables)
+        stmt_to_tac(stmt, proc, variables)
 
-    with open("tac_file.json", 'w') as f:
-        json.dump(tac, f)
+    tac_opt.optimize(proc)
+    tacbin.save([proc], tac_file_path)
 
     print(variables)
 
 
-bx_file = sys.argv[1]
-compiler(bx_file)
+if __name__ == "__main__":
+    compiler(*sys.argv[1:3])
@@ -2,24 +2,38 @@ import classes
 
 
 def json_to_expr(js_obj):
-    if js_obj[0] == '<expression:var>':
-        return classes.ExpressionVar(js_obj[1]['name'][1]['value'])
-    if js_obj[0] == '<expression:int>':
-        return classes.ExpressionInt(js_obj[1]['value'])
-    if js_obj[0] == '<expression:uniop>':
-        operator = js_obj[1]['operator'][1]['value']
-        argument = json_to_expr(js_obj[1]['argument'])  # recursive call
-        return classes.ExpressionUniOp(operator, argument)
-    if js_obj[0] == '<expression:binop>':
-        operator = js_obj[1]['operator'][1]['value']
-        left = json_to_expr(js_obj[1]['left'])
-        right = json_to_expr(js_obj[1]['right'])
-        return classes.ExpressionBinOp(operator, left, right)
-    if js_obj[0] == "<expression:eval>":
-        return json_to_expr(js_obj[1]["arguments"])
-    if js_obj[0] == "<expression:call>":
-        return json_to_expr(js_obj[1]['arguments'][0])
-    raise ValueError(f'Unrecognized <expression>: {js_obj[0]}')
+    # explicit stack instead of recursion, so deeply nested expressions do not hit the recursion limit
+    stack = [(js_obj, False)]
+    built = []
+    while stack:
+        js_obj, children_built = stack.pop()
+        if js_obj[0] == '<expression:var>':
+            built.append(classes.ExpressionVar(js_obj[1]['name'][1]['value']))
+        elif js_obj[0] == '<expression:int>':
+            built.append(classes.ExpressionInt(js_obj[1]['value']))
+        elif js_obj[0] == '<expression:uniop>':
+            if children_built:
+                argument = built.pop()
+                built.append(classes.ExpressionUniOp(js_obj[1]['operator'][1]['value'], argument))
+            else:
+                stack.append((js_obj, True))
+                stack.append((js_obj[1]['argument'], False))
+        elif js_obj[0] == '<expression:binop>':
+            if children_built:
+                right = built.pop()
+                left = built.pop()
+                built.append(classes.ExpressionBinOp(js_obj[1]['operator'][1]['value'], left, right))
+            else:
+                stack.append((js_obj, True))
+                stack.append((js_obj[1]['right'], False))
+                stack.append((js_obj[1]['left'], False))
+        elif js_obj[0] == "<expression:eval>":
+            stack.append((js_obj[1]["arguments"], False))
+        elif js_obj[0] == "<expression:call>":
+            stack.append((js_obj[1]['arguments'][0], False))
+        else:
+            raise ValueError(f'Unrecognized <expression>: {js_obj[0]}')
+    return built[0]
 
 
 def json_to_stmt(js_obj):